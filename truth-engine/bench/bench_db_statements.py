@@ -0,0 +1,177 @@
+"""
+bench_db_statements.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — per-statement latency under each db.py pool mode
+
+Calls the workers' own query functions (so the SQL is exactly what runs
+nightly) on one connection per mode and reports mean / p50 / p95 per
+statement as JSON:
+
+  transaction  statement_cache_size=0 — what the Transaction Pooler forces
+  session      statement cache on — DB_SESSION_URL / direct connection
+
+    python bench/bench_db_statements.py --dsn $DATABASE_URL --session-dsn $DB_SESSION_URL
+    python bench/bench_db_statements.py --dsn postgresql:///scratch --scratch   # seeds synthetic panel data
+
+With one DSN for both modes the difference is parse + plan cost alone;
+with the real pooler DSNs it includes the pooler hop. Writes
+(upsert_panel_rows) run inside a transaction that is rolled back.
+--scratch creates and fills market.plaid_merchant_observations_v1 /
+merchant_spend_panel_v1 — only ever point it at a throwaway database.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+WORKERS = Path(__file__).resolve().parent.parent / "workers"
+sys.path.insert(0, str(WORKERS))
+
+import asyncpg                                   # noqa: E402
+
+import db                                        # noqa: E402
+import earnings_nowcast_worker as nowcast        # noqa: E402
+from columnar import RecordBatch                 # noqa: E402
+import panel_aggregation_worker as panel         # noqa: E402
+
+SCRATCH_DDL = """
+CREATE SCHEMA IF NOT EXISTS market;
+CREATE TABLE IF NOT EXISTS market.plaid_merchant_observations_v1 (
+    canonical_symbol text, user_token text, transaction_date date, amount_usd numeric
+);
+CREATE INDEX IF NOT EXISTS plaid_obs_symbol_date
+    ON market.plaid_merchant_observations_v1 (canonical_symbol, transaction_date);
+CREATE TABLE IF NOT EXISTS market.merchant_spend_panel_v1 (
+    canonical_symbol text, week_start date, fiscal_quarter text,
+    user_count int, transaction_count int, total_spend_usd numeric,
+    avg_ticket_usd numeric, prior_year_spend_usd numeric, yoy_growth_pct numeric,
+    qtd_spend_usd numeric, qtd_user_count int, qtd_transaction_count int,
+    panel_coverage_score numeric, min_user_threshold_met boolean, computed_at timestamptz,
+    PRIMARY KEY (canonical_symbol, week_start)
+);
+"""
+
+
+async def seed_scratch(conn, symbols: int, rows_per_symbol: int, seed: int):
+    await conn.execute(SCRATCH_DDL)
+    if await conn.fetchval("SELECT count(*) FROM market.plaid_merchant_observations_v1"):
+        return
+    rng = random.Random(seed)
+    start = date.today() - timedelta(weeks=panel.LOOKBACK_WEEKS + 52)
+    span = (date.today() - start).days
+    records = [
+        (f"SYM{s:03d}", f"u{rng.randrange(2000)}", start + timedelta(days=rng.randrange(span)),
+         round(rng.lognormvariate(3.5, 0.8), 2))
+        for s in range(symbols) for _ in range(rows_per_symbol)
+    ]
+    await conn.copy_records_to_table(
+        "plaid_merchant_observations_v1", schema_name="market", records=records,
+        columns=["canonical_symbol", "user_token", "transaction_date", "amount_usd"],
+    )
+    await conn.execute("ANALYZE market.plaid_merchant_observations_v1")
+    await db.register_numeric_float(conn)           # after the COPY: binary COPY needs the default codec
+    for sym in {r[0] for r in records}:
+        await panel.upsert_panel_rows(conn, await panel.build_panel_rows(conn, sym))
+
+
+async def timed(samples: dict, name: str, coro):
+    t0 = time.perf_counter()
+    result = await coro
+    samples.setdefault(name, []).append((time.perf_counter() - t0) * 1000)
+    return result
+
+
+async def bench_mode(dsn: str, mode: str, iters: int, symbols: list[str]) -> dict:
+    cfg = db.PoolConfig("bench", dsn, mode)
+    conn = await asyncpg.connect(dsn, statement_cache_size=cfg.statement_cache_size)
+    await db.register_numeric_float(conn)           # as the worker pools do
+    samples: dict[str, list[float]] = {}
+    ws = panel.week_start(date.today() - timedelta(weeks=4))
+    fq = panel.fiscal_quarter(ws)
+    weeks = [ws - timedelta(weeks=i) for i in range(panel.LOOKBACK_WEEKS - 1, -1, -1)]
+    fqs = [panel.fiscal_quarter(w) for w in weeks]
+    cutoff = date.today() - timedelta(weeks=panel.LOOKBACK_WEEKS)
+    try:
+        warm = {}
+        for i in range(iters + 5):
+            s = symbols[i % len(symbols)]
+            rec = warm if i < 5 else samples       # first calls prepare; not counted
+            await timed(rec, "fetch_prior_year_spend", panel.fetch_prior_year_spend(conn, s, weeks))
+            await timed(rec, "fetch_qtd_aggregates", panel.fetch_qtd_aggregates(conn, s, weeks, fqs))
+            await timed(rec, "fetch_weekly_aggregates", panel.fetch_weekly_aggregates(conn, s, cutoff))
+            await timed(rec, "fetch_panel_summaries", nowcast.fetch_panel_summaries(
+                conn, RecordBatch({"symbol": [s], "fiscal_quarter": [fq]})))
+
+        rows = await panel.build_panel_rows(conn, symbols[0])
+        tx = conn.transaction()
+        await tx.start()
+        try:
+            for _ in range(max(1, iters // max(len(rows), 1))):
+                for i in range(len(rows)):
+                    await timed(samples, "upsert_panel_rows (per row)", panel.upsert_panel_rows(conn, rows[i:i + 1]))
+                await timed(samples, f"upsert_panel_rows (batch of {len(rows)})", panel.upsert_panel_rows(conn, rows))
+        finally:
+            await tx.rollback()
+    finally:
+        await conn.close()
+
+    return {
+        name: {
+            "calls": len(v),
+            "mean_ms": round(statistics.fmean(v), 3),
+            "p50_ms": round(statistics.median(v), 3),
+            "p95_ms": round(sorted(v)[int(len(v) * 0.95) - 1], 3),
+        }
+        for name, v in samples.items()
+    }
+
+
+async def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="transaction-mode DSN")
+    ap.add_argument("--session-dsn", default=os.getenv("DB_SESSION_URL"),
+                    help="session-mode DSN (default: --dsn)")
+    ap.add_argument("--iters", type=int, default=300)
+    ap.add_argument("--symbols", type=int, default=20)
+    ap.add_argument("--scratch", action="store_true", help="create + seed synthetic tables first")
+    ap.add_argument("--rows-per-symbol", type=int, default=5000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    if not args.dsn:
+        ap.error("--dsn or DATABASE_URL required")
+
+    if args.scratch:
+        conn = await asyncpg.connect(args.dsn)
+        try:
+            await seed_scratch(conn, args.symbols, args.rows_per_symbol, args.seed)
+        finally:
+            await conn.close()
+
+    conn = await asyncpg.connect(args.dsn, statement_cache_size=0)
+    try:
+        symbols = (await panel.fetch_symbols(conn))[:args.symbols]
+    finally:
+        await conn.close()
+    if not symbols:
+        sys.exit("no symbols in market.plaid_merchant_observations_v1 (use --scratch on a scratch DB)")
+
+    results = {
+        "transaction": await bench_mode(args.dsn, "transaction", args.iters, symbols),
+        "session": await bench_mode(args.session_dsn or args.dsn, "session", args.iters, symbols),
+    }
+    results["speedup_mean"] = {
+        name: round(results["transaction"][name]["mean_ms"] / max(results["session"][name]["mean_ms"], 1e-9), 2)
+        for name in results["transaction"]
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+bench_ops_decode.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — ops_worker per-message cost benchmark
+
+Compares the original market_loop decode (json.loads + 2× Decimal +
+datetime.fromtimestamp) against trade_decode.decode_trade, then times the
+full per-message hot path (decode → slot lookup → last value → ring →
+bars → latency histogram).
+
+    python bench/bench_ops_decode.py [--n 200000] [--symbols 200]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "workers"))
+
+from bar_aggregator import BarAggregator            # noqa: E402
+from latency_histogram import LatencyHistogram      # noqa: E402
+from symbol_registry import LastValueState, SymbolRegistry   # noqa: E402
+from tick_buffer import TradeRing                   # noqa: E402
+from trade_decode import decode_trade               # noqa: E402
+
+
+def make_frames(n: int, symbols: list[str], seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    ts = 1_700_000_000_000
+    frames = []
+    for i in range(n):
+        sym = rng.choice(symbols)
+        ts += rng.randint(0, 3)
+        frames.append(json.dumps({
+            "stream": f"{sym}@trade",
+            "data": {
+                "e": "trade", "E": ts + 2, "s": sym.upper(), "t": i,
+                "p": f"{rng.uniform(10, 70000):.2f}", "q": f"{rng.uniform(0.0001, 5):.8f}",
+                "T": ts, "m": rng.random() < 0.5, "M": True,
+            },
+        }, separators=(",", ":")))
+    return frames
+
+
+def original_decode(msg: str):
+    trade = json.loads(msg)["data"]
+    return (Decimal(trade["p"]), Decimal(trade["q"]),
+            datetime.fromtimestamp(trade["T"] / 1000, tz=timezone.utc))
+
+
+def per_msg_ns(fn, frames) -> float:
+    t0 = time.perf_counter_ns()
+    for msg in frames:
+        fn(msg)
+    return (time.perf_counter_ns() - t0) / len(frames)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--symbols", type=int, default=200)
+    args = ap.parse_args()
+
+    symbols = [f"sym{i}usdt" for i in range(args.symbols)]
+    frames = make_frames(args.n, symbols)
+
+    registry = SymbolRegistry({s: f"00000000-0000-0000-0000-{i:012d}" for i, s in enumerate(symbols)})
+    last = LastValueState(len(registry))
+    ring = TradeRing(1 << 18)
+    bars = BarAggregator(len(registry))
+    hist = LatencyHistogram("exchange_to_receive")
+
+    def hot_path(msg: str):
+        recv_us = time.time_ns() // 1000
+        symbol, trade_id, price, size, trade_ms, _, maker = decode_trade(msg)
+        slot = registry.slot(symbol)
+        hist.record(recv_us - trade_ms * 1000)
+        last.update(slot, price, size, trade_ms)
+        ring.push(slot, trade_id, trade_ms, price, size, maker, recv_us)
+        if len(ring) > ring.capacity // 2:
+            ring.commit(ring.take(len(ring)))
+        bars.on_trade(slot, trade_ms, price, size)
+
+    results = {
+        "messages": args.n,
+        "symbols": args.symbols,
+        "original_decode_ns": round(per_msg_ns(original_decode, frames)),
+        "fast_decode_ns": round(per_msg_ns(decode_trade, frames)),
+        "full_hot_path_ns": round(per_msg_ns(hot_path, frames)),
+    }
+    results["decode_speedup"] = round(results["original_decode_ns"] / results["fast_decode_ns"], 2)
+    results["hot_path_msgs_per_sec"] = round(1e9 / results["full_hot_path_ns"])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
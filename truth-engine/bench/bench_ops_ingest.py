@@ -0,0 +1,149 @@
+"""
+bench_ops_ingest.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — ops_worker end-to-end ingestion benchmark
+
+Starts bench/ws_replay.py as a subprocess, points OpsWorker at it
+(OPS_WS_URL) with the in-memory pg_standin pool, and runs market_loop +
+flusher until the capture is exhausted. Reports sustained msg/s, flush
+and receive→commit latency, and peak RSS as JSON.
+
+    python bench/bench_ops_ingest.py --file cap.gz --speed 0
+    python bench/bench_ops_ingest.py --n 500000 --symbols 200   # synthesizes a capture
+
+--row-us / --rtt-ms model database cost per COPY row and per round trip.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH   = Path(__file__).resolve().parent
+WORKERS = BENCH.parent / "workers"
+sys.path.insert(0, str(WORKERS))
+sys.path.insert(0, str(BENCH))
+
+from pg_standin import StandinPool                  # noqa: E402
+from ws_replay import capture_symbols, synth        # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def start_server(path: str, port: int, speed: float) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, str(BENCH / "ws_replay.py"), "serve", "--file", path,
+         "--port", str(port), "--speed", str(speed), "--once"],
+        stdout=subprocess.PIPE, text=True,
+    )
+    for line in proc.stdout:
+        if line.startswith("READY"):
+            return proc
+    raise RuntimeError("replay server exited before READY")
+
+
+async def run(args, capture: str, symbols: list[str]) -> dict:
+    from latency_histogram import LatencyHistogram
+    from ops_worker import OpsWorker
+    from symbol_registry import SymbolRegistry
+
+    registry = SymbolRegistry({s: f"00000000-0000-0000-0000-{i:012d}" for i, s in enumerate(symbols)})
+    worker = OpsWorker(registry)
+    worker.pool = StandinPool(row_us=args.row_us, rtt_ms=args.rtt_ms)
+
+    flush_lat = LatencyHistogram("flush")
+    flush = worker.flush
+    in_flush = asyncio.Lock()
+
+    async def timed_flush():
+        async with in_flush:
+            t0 = time.perf_counter_ns()
+            await flush()
+            flush_lat.record((time.perf_counter_ns() - t0) // 1000)
+
+    worker.flush = timed_flush
+    rss_before = peak_rss_mb()
+
+    flusher = asyncio.create_task(worker.flusher())
+    publisher = asyncio.create_task(worker.board_publisher()) if worker.board else None
+    t0 = time.perf_counter()
+    await worker.market_loop()
+    elapsed = time.perf_counter() - t0
+    async with in_flush:
+        flusher.cancel()    # never mid-COPY, or the final flush rewrites that batch
+    await timed_flush()
+    drained = time.perf_counter() - t0
+    if worker.board:
+        publisher.cancel()
+        worker.board.close()
+
+    messages = worker.ring.head
+    return {
+        "capture": capture,
+        "symbols": len(symbols),
+        "speed": args.speed or "max",
+        "messages": messages,
+        "trades_written": worker.pool.rows["market.trades_v1"],
+        "bars_written": worker.pool.rows["market.bars_v1"],
+        "ring_dropped": worker.ring.dropped,
+        "elapsed_s": round(elapsed, 2),
+        "msgs_per_sec": round(messages / elapsed),
+        "drain_s": round(drained - elapsed, 3),
+        "flush_latency": flush_lat.summary(),
+        "receive_to_commit": worker.lat_commit.summary(),
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--file", help="capture from ws_replay.py record/synth")
+    ap.add_argument("--n", type=int, default=500_000, help="frames to synthesize when --file is omitted")
+    ap.add_argument("--symbols", type=int, default=200)
+    ap.add_argument("--speed", type=float, default=0, help="replay pace, 0 = max")
+    ap.add_argument("--port", type=int, default=9765)
+    ap.add_argument("--row-us", type=float, default=0.5)
+    ap.add_argument("--rtt-ms", type=float, default=2.0)
+    ap.add_argument("--out", help="also write the JSON report here")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="ops_ingest_")
+    capture = args.file
+    if not capture:
+        capture = os.path.join(tmp, "synthetic.gz")
+        synth(args.n, args.symbols, 20_000, capture)
+    with gzip.open(capture, "rt") as f:
+        symbols = capture_symbols(f)
+
+    os.environ.setdefault("FUND_ID", "bench")
+    os.environ.setdefault("PG_CONN", "postgresql://bench@localhost/bench")
+    os.environ["OPS_WS_URL"] = f"ws://127.0.0.1:{args.port}/stream"
+    os.environ["OPS_SPILL_PATH"] = os.path.join(tmp, "spill.journal")
+    os.environ["MARKET_BOARD_NAME"] = f"noterminal_bench_board_{os.getpid()}"
+    os.environ.setdefault("OPS_SPILL_MAX_MB", "64")
+
+    server = start_server(capture, args.port, args.speed)
+    try:
+        results = asyncio.run(run(args, capture, symbols))
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.out:
+        Path(args.out).write_text(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+bench_risk_parity.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — risk_parity.allocate() at 2,000+ names
+
+Simulates daily returns from a seeded market + sector factor model, then
+walks --days consecutive dates the way risk_parity.py does: a shrunk
+covariance over a rolling --lookback window, and every portfolio's slate
+solved in one batch — once cold, once warm-started from the previous
+day's weights. Scores are long/short (--short-frac of names negative, a
+few flipping each day), which is the hard case for CCD.
+
+Reports per-portfolio solve time (p50 / p95 / max), solver iterations
+and the worst risk-contribution error as JSON, and exits 1 if any slate
+failed to converge or the warm p95 is over --budget-ms.
+
+    python bench/bench_risk_parity.py
+    python bench/bench_risk_parity.py --assets 500 2000 3000 --portfolios 4 --days 10
+    python bench/bench_risk_parity.py --short-frac 0 --out runs/rp_long_only.json
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+BENCH   = Path(__file__).resolve().parent
+WORKERS = BENCH.parent / "workers"
+sys.path.insert(0, str(WORKERS))
+sys.path.insert(0, str(BENCH))
+
+import numpy as np                                  # noqa: E402
+
+import risk_parity as rp                            # noqa: E402
+from bench_workers import git_rev, peak_rss_mb      # noqa: E402
+
+
+def simulate_returns(rng, days: int, names: int, sectors: int = 10) -> np.ndarray:
+    """days × names daily returns: market beta + one sector each + idiosyncratic."""
+    market = rng.normal(0.0003, 0.011, days)
+    sector = rng.normal(0.0, 0.007, (days, sectors))
+    beta = rng.uniform(0.4, 1.6, names)
+    member = rng.integers(0, sectors, names)
+    idio = rng.normal(0.0, 1.0, (days, names)) * rng.uniform(0.008, 0.03, names)
+    return market[:, None] * beta + sector[:, member] + idio
+
+
+def percentiles(ms: list[float]) -> dict:
+    ordered = sorted(ms)
+    return {"p50": round(statistics.median(ordered), 2),
+            "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 2),
+            "max": round(ordered[-1], 2)}
+
+
+def max_rc_error(cov: np.ndarray, col: dict, slate: rp.Slate, weights: dict) -> float:
+    """max_i |RC_i / b_i − 1| for an equal-budget slate (signed weights)."""
+    idx = np.array([col[s] for s in slate.symbol_ids])
+    w = np.array([weights[s] for s in slate.symbol_ids])
+    rc = w * (cov[np.ix_(idx, idx)] @ w)
+    return float(np.abs(rc / rc.sum() * len(w) - 1.0).max())
+
+
+def bench_size(rng, assets: int, args) -> dict:
+    universe = int(assets * 1.25)
+    returns = simulate_returns(rng, args.lookback + args.days, universe)
+    symbols = [uuid.UUID(int=int(i) + 1) for i in range(universe)]
+    col = {s: i for i, s in enumerate(symbols)}
+
+    books = []
+    for p in range(args.portfolios):
+        names = rng.choice(universe, assets, replace=False)
+        scores = rng.normal(1.0, 0.5, assets)
+        scores[rng.random(assets) < args.short_frac] *= -1
+        books.append((uuid.UUID(int=10_000 + p), [symbols[i] for i in names], scores))
+
+    cov_ms, cold_ms, warm_ms, worst = [], [], [], 0.0
+    cold_iters, warm_iters, unconverged = [], [], 0
+    previous = None
+    start = date(2026, 1, 2)
+    for d in range(args.days):
+        day = start + timedelta(days=d)
+        t0 = time.perf_counter()
+        cov = rp.shrunk_covariance(returns[d:d + args.lookback])
+        cov_ms.append((time.perf_counter() - t0) * 1000)
+
+        slates = []
+        for pid, names, scores in books:
+            flip = rng.random(len(scores)) < args.flip_frac
+            scores[flip] *= -1
+            slates.append(rp.Slate(pid, day, names, scores.tolist()))
+
+        t0 = time.perf_counter()
+        _, cold = rp.allocate(slates, cov, col)
+        cold_ms.append((time.perf_counter() - t0) * 1000 / len(slates))
+        t0 = time.perf_counter()
+        weights, warm = rp.allocate(slates, cov, col, previous=previous)
+        warm_ms.append((time.perf_counter() - t0) * 1000 / len(slates))
+
+        cold_iters.append((cold["ccd_sweeps"], cold["newton_iters"]))
+        warm_iters.append((warm["ccd_sweeps"], warm["newton_iters"]))
+        unconverged += cold["unconverged"] + warm["unconverged"]
+        worst = max(worst, *(max_rc_error(cov, col, s, w) for s, w in zip(slates, weights)))
+        previous = {s.portfolio_id: w for s, w in zip(slates, weights)}
+
+    def iters(pairs):
+        return {"ccd_sweeps": round(statistics.fmean(p[0] for p in pairs), 1),
+                "newton_iters": round(statistics.fmean(p[1] for p in pairs), 1)}
+
+    return {
+        "assets": assets,
+        "portfolios": args.portfolios,
+        "days": args.days,
+        "covariance_ms": percentiles(cov_ms),
+        "cold_ms_per_portfolio": percentiles(cold_ms[1:] or cold_ms),   # first day pays numpy warmup
+        "warm_ms_per_portfolio": percentiles(warm_ms[1:] or warm_ms),   # day 0 has no previous weights
+        "cold_iterations": iters(cold_iters),
+        "warm_iterations": iters(warm_iters[1:] or warm_iters),
+        "max_rc_error": worst,
+        "unconverged": unconverged,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--assets", type=int, nargs="+", default=[2000])
+    ap.add_argument("--portfolios", type=int, default=4, help="slates solved per date (one batch)")
+    ap.add_argument("--days", type=int, default=8)
+    ap.add_argument("--lookback", type=int, default=rp.LOOKBACK_DAYS)
+    ap.add_argument("--short-frac", type=float, default=0.3, help="share of names with a negative score")
+    ap.add_argument("--flip-frac", type=float, default=0.02, help="share of scores changing sign each day")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--budget-ms", type=float, default=1000.0, help="warm p95 per portfolio that fails the run")
+    ap.add_argument("--out", help="also write the JSON report here")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    results = {}
+    for assets in args.assets:
+        results[str(assets)] = r = bench_size(rng, assets, args)
+        print(f"{assets:>6} names  cold p50 {r['cold_ms_per_portfolio']['p50']:>8.1f} ms  "
+              f"warm p50 {r['warm_ms_per_portfolio']['p50']:>8.1f} ms / portfolio  "
+              f"(rc error {r['max_rc_error']:.1e})", file=sys.stderr)
+
+    report = json.dumps({
+        "meta": {
+            "git_rev": git_rev(),
+            "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out",)},
+            "tolerance": rp.CCD_TOL,
+            "peak_rss_mb": peak_rss_mb(),
+        },
+        "sizes": results,
+    }, indent=2)
+    print(report)
+    if args.out:
+        Path(args.out).write_text(report + "\n")
+    if any(r["unconverged"] or r["warm_ms_per_portfolio"]["p95"] > args.budget_ms
+           for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+"""
+bench_workers.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — worker run_once benchmarks on seeded synthetic data
+
+Runs each worker's real run_once — fetch, model and write code unchanged —
+against data from bench/synth.py at a configurable universe size, and
+reports wall / CPU time per run and per unit of work as JSON:
+
+  panel      panel_aggregation_worker   units = symbols
+  nowcast    earnings_nowcast_worker    units = consensus rows
+  accuracy   earnings_accuracy_worker   units = actuals
+  trace      trace_worker               units = CUSIP prefixes
+  comtrade   cot_worker                 units = reporter × commodity × period tuples
+
+The asyncpg workers get the in-memory pg_standin pool by default: reads
+are answered from the synthetic data by SQL route, writes are counted,
+and --rtt-ms / --row-us model the database. With --dsn and --scratch
+they run on a real Postgres instead; that creates the tables it needs
+and TRUNCATEs the earnings tables between runs, so only ever point it at
+a throwaway database. trace / comtrade use the StubSupabase store and a
+StubSession for FINRA / Comtrade (--supabase-ms / --http-ms latency).
+
+    python bench/bench_workers.py --out runs/base.json
+    python bench/bench_workers.py --compare runs/base.json --tolerance 0.10
+    python bench/bench_workers.py --symbols 500 --only panel nowcast
+    python bench/bench_workers.py --dsn postgresql:///scratch --scratch
+
+--compare matches scenarios by name on p50 wall time and exits 1 if any
+is slower than the baseline by more than --tolerance. Compare runs of the
+same sizes and backend; the report flags a config mismatch.
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import types
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+BENCH   = Path(__file__).resolve().parent
+WORKERS = BENCH.parent / "workers"
+sys.path.insert(0, str(WORKERS))
+sys.path.insert(0, str(BENCH))
+
+import synth                                        # noqa: E402
+from pg_standin import StandinPool                  # noqa: E402
+from stubs import StubSession, StubSupabase         # noqa: E402
+
+import cot_worker                                   # noqa: E402
+import earnings_accuracy_worker as accuracy         # noqa: E402
+import earnings_nowcast_worker as nowcast           # noqa: E402
+import panel_aggregation_worker as panel            # noqa: E402
+import trace_worker                                 # noqa: E402
+
+SCENARIOS = ("panel", "nowcast", "accuracy", "trace", "comtrade")
+
+
+@dataclass
+class Scenario:
+    name: str
+    units: int
+    run: Callable[[], Awaitable]                       # one timed run_once
+    reset: Optional[Callable[[], Awaitable]] = None    # untimed, before every run
+    counters: Callable[[], dict] = dict
+
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ── Stand-in reads ───────────────────────────────────────────────────────
+
+class PlaidIndex:
+    """Per-symbol date-sorted observations; answers the panel worker's aggregates."""
+
+    def __init__(self, observations: list[tuple]):
+        by_symbol = defaultdict(list)
+        for sym, user, d, amount in observations:
+            by_symbol[sym].append((d, user, amount))
+        self.rows = {s: sorted(rows) for s, rows in by_symbol.items()}
+        self.dates = {s: [r[0] for r in rows] for s, rows in self.rows.items()}
+
+    def _between(self, symbol: str, lo: date, hi: Optional[date] = None) -> list[tuple]:
+        dates = self.dates.get(symbol, [])
+        i = bisect.bisect_left(dates, lo)
+        j = bisect.bisect_right(dates, hi) if hi else len(dates)
+        return self.rows[symbol][i:j]
+
+    def symbols(self) -> list[dict]:
+        return [{"canonical_symbol": s} for s in sorted(self.rows)]
+
+    def weekly(self, symbol: str, cutoff: date) -> list[dict]:
+        weeks = defaultdict(list)
+        for d, user, amount in self._between(symbol, cutoff):
+            weeks[panel.week_start(d)].append((user, amount))
+        return [
+            {"week_start": ws,
+             "user_count": len({u for u, _ in obs}),
+             "transaction_count": len(obs),
+             "total_spend_usd": sum(a for _, a in obs),
+             "avg_ticket_usd": sum(a for _, a in obs) / len(obs)}
+            for ws, obs in sorted(weeks.items())
+        ]
+
+    def prior_spend(self, symbol: str, los: tuple, his: tuple) -> list[dict]:
+        out = []
+        for lo, hi in zip(los, his):
+            rows = self._between(symbol, lo, hi)
+            out.append({"prior_year_spend_usd": sum(r[2] for r in rows) if rows else None})
+        return out
+
+    def qtd(self, symbol: str, los: tuple, his: tuple) -> list[dict]:
+        out = []
+        for lo, hi in zip(los, his):
+            rows = self._between(symbol, lo, hi)
+            out.append({"qtd_spend_usd": sum(r[2] for r in rows) if rows else None,
+                        "qtd_user_count": len({r[1] for r in rows}),
+                        "qtd_transaction_count": len(rows)})
+        return out
+
+
+def standin_scenario(name: str, units: int, run_once, pool: StandinPool) -> Scenario:
+    async def reset():
+        pool.calls.clear()
+        pool.rows.clear()
+
+    def counters() -> dict:
+        calls = dict(pool.calls)
+        return {"db_calls": calls, "db_rows_written": dict(pool.rows),
+                "unrouted": calls.pop("unrouted", 0)}
+
+    return Scenario(name, units, lambda: run_once(pool), reset, counters)
+
+
+def standin_scenarios(u: synth.Universe, today: date, args) -> dict[str, Scenario]:
+    pool_kw = {"row_us": args.row_us, "rtt_ms": args.rtt_ms}
+    plaid = PlaidIndex(synth.plaid_observations(u, today))
+    consensus = synth.consensus_rows(u, today)
+    summaries = synth.panel_summaries(u, consensus)
+    preds = synth.predictions(u, consensus)
+    actuals = sorted(synth.actuals(u, preds, consensus), key=lambda a: a["report_date"])
+
+    def upcoming(max_days: int) -> list[dict]:
+        horizon = today + timedelta(days=max_days)
+        return [{k: v for k, v in c.items() if k != "as_of_date"}
+                for c in consensus if today <= c["earnings_date"] <= horizon]
+
+    no_panel = {"weeks_used": 0, "qtd_spend_usd": None, "yoy_growth_pct": None,
+                "user_count": None, "coverage_score": None, "latest_week_start": None}
+
+    def panel_summary(symbols: tuple, fqs: tuple) -> list[dict]:
+        return [summaries.get(key, no_panel) for key in zip(symbols, fqs)]
+
+    pred_cols = ("prediction_id", "nowcast_id", "symbol", "fiscal_quarter", "prediction",
+                 "predicted_revenue_usd", "surprise_pct", "confidence_score", "status", "created_at")
+    preds_by_key = defaultdict(list)
+    for p in preds:
+        preds_by_key[(p["symbol"], p["fiscal_quarter"])].append({c: p[c] for c in pred_cols})
+    revenue = {(c["symbol"], c["fiscal_quarter"]): c["consensus_revenue_usd"] for c in consensus}
+    meta = {p["nowcast_id"]: {"panel_weeks_used": p["panel_weeks_used"],
+                              "panel_coverage_score": p["panel_coverage_score"]} for p in preds}
+    no_meta = {"panel_weeks_used": None, "panel_coverage_score": None}
+
+    return {
+        "panel": standin_scenario("panel", u.symbols, panel.run_once, StandinPool(**pool_kw, routes=[
+            ("SELECT DISTINCT canonical_symbol", plaid.symbols),
+            ("date_trunc('week'", plaid.weekly),
+            ("AS prior_year_spend_usd", plaid.prior_spend),
+            ("AS qtd_user_count", plaid.qtd),
+        ])),
+        "nowcast": standin_scenario("nowcast", len(upcoming(nowcast.MAX_DAYS_TO_EARNINGS)),
+                                    nowcast.run_once, StandinPool(**pool_kw, routes=[
+            ("DISTINCT ON (symbol, fiscal_quarter)", upcoming),
+            ("unnest($1::text[], $2::text[])", panel_summary),
+            ("intel.vol_regime_log_v1", lambda: [{"regime_label": "NORMAL"}]),
+        ])),
+        "accuracy": standin_scenario("accuracy", len(actuals), accuracy.run_once, StandinPool(**pool_kw, routes=[
+            ("FROM market.earnings_actuals_v1 a", lambda: actuals),
+            ("confidence_score, status, created_at::date", lambda s, q: preds_by_key[(s, q)]),
+            ("SELECT consensus_revenue_usd",
+             lambda s, q: [{"consensus_revenue_usd": revenue[(s, q)]}] if (s, q) in revenue else []),
+            ("unnest($1::uuid[])", lambda ids: [meta.get(i, no_meta) for i in ids]),
+        ])),
+    }
+
+
+# ── Scratch Postgres ─────────────────────────────────────────────────────
+
+EARNINGS_DDL = """
+CREATE SCHEMA IF NOT EXISTS intel;
+CREATE SCHEMA IF NOT EXISTS truth;
+CREATE TABLE IF NOT EXISTS intel.vol_regime_log_v1 (regime_label text, evaluated_at timestamptz DEFAULT now());
+CREATE TABLE IF NOT EXISTS truth.signals_v1 (
+    signal_id uuid PRIMARY KEY, strategy_name text, symbol text, session_date date,
+    signal_ts timestamptz, side text, signal_type text, entry_trigger_price numeric,
+    stop_price numeric, target_price numeric, confidence_score numeric, meta jsonb
+);
+CREATE TABLE IF NOT EXISTS market.ingest_run_log_v1 (
+    ingest_run_id uuid PRIMARY KEY, source_name text, run_status text, meta jsonb, completed_at timestamptz
+);
+CREATE TABLE IF NOT EXISTS market.earnings_consensus_v1 (
+    consensus_id uuid, symbol text, fiscal_quarter text, fiscal_quarter_end date,
+    earnings_date date, consensus_revenue_usd numeric, consensus_revenue_growth_pct numeric,
+    analyst_count int, as_of_date date
+);
+CREATE TABLE IF NOT EXISTS market.earnings_nowcast_runs_v1 (
+    nowcast_id uuid PRIMARY KEY, symbol text, fiscal_quarter text, run_ts timestamptz,
+    model_version text, panel_weeks_used int, panel_qtd_spend_usd numeric, panel_yoy_growth_pct numeric,
+    panel_user_count int, panel_coverage_score numeric, consensus_id uuid, consensus_revenue_usd numeric,
+    consensus_growth_pct numeric, nowcast_revenue_usd numeric, nowcast_growth_pct numeric,
+    nowcast_surprise_pct numeric, nowcast_revenue_low numeric, nowcast_revenue_high numeric,
+    extrapolation_method text, quarter_completion_pct numeric, weeks_remaining int,
+    inputs_hash text, outputs_hash text, raw_inputs jsonb
+);
+CREATE TABLE IF NOT EXISTS market.earnings_predictions_v1 (
+    prediction_id uuid PRIMARY KEY, nowcast_id uuid, symbol text, fiscal_quarter text,
+    earnings_date date, prediction text, predicted_revenue_usd numeric, surprise_pct numeric,
+    confidence_score numeric, confidence_label text, status text, days_to_earnings int, meta jsonb,
+    superseded_by uuid, resolved_at timestamptz, signal_id uuid, created_at timestamptz DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS market.earnings_actuals_v1 (
+    actual_id uuid PRIMARY KEY, symbol text, fiscal_quarter text, report_date date,
+    actual_revenue_usd numeric, actual_eps numeric, vs_consensus_revenue_pct numeric,
+    beat_miss_label text, actual_revenue_growth_pct numeric
+);
+CREATE TABLE IF NOT EXISTS market.earnings_model_accuracy_v1 (
+    accuracy_id uuid, prediction_id uuid, actual_id uuid, symbol text, fiscal_quarter text,
+    model_version text, predicted_revenue_usd numeric, actual_revenue_usd numeric,
+    revenue_error_usd numeric, revenue_error_pct numeric, revenue_mape numeric,
+    predicted_direction text, actual_direction text, direction_correct boolean,
+    predicted_surprise_pct numeric, actual_surprise_pct numeric, surprise_error_pct numeric,
+    panel_weeks_used int, panel_coverage_score numeric, days_before_earnings int, meta jsonb,
+    PRIMARY KEY (prediction_id, actual_id)
+);
+"""
+
+
+async def copy_dicts(conn, table: str, rows: list[dict], columns: tuple):
+    schema, name = table.split(".")
+    await conn.copy_records_to_table(
+        name, schema_name=schema, columns=list(columns),
+        records=[tuple(r[c] for c in columns) for r in rows],
+    )
+
+
+async def postgres_scenarios(u: synth.Universe, today: date, args) -> tuple[dict[str, Scenario], Callable]:
+    import asyncpg
+    import db
+    from bench_db_statements import SCRATCH_DDL
+
+    consensus = synth.consensus_rows(u, today)
+    preds = synth.predictions(u, consensus)
+    actuals = synth.actuals(u, preds, consensus)
+    for p in preds:                                 # created_at is timestamptz in the table
+        p["created_at"] = datetime.combine(p["created_at"], dtime(12), timezone.utc)
+
+    # Seed on a plain connection: binary COPY needs the default numeric codec.
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        await conn.execute(SCRATCH_DDL + EARNINGS_DDL)
+        if not await conn.fetchval("SELECT count(*) FROM market.plaid_merchant_observations_v1"):
+            await conn.copy_records_to_table(
+                "plaid_merchant_observations_v1", schema_name="market",
+                records=synth.plaid_observations(u, today),
+                columns=["canonical_symbol", "user_token", "transaction_date", "amount_usd"],
+            )
+            await conn.execute("ANALYZE market.plaid_merchant_observations_v1")
+        await conn.execute("TRUNCATE market.earnings_consensus_v1")
+        await copy_dicts(conn, "market.earnings_consensus_v1", consensus, tuple(consensus[0]))
+        if not await conn.fetchval("SELECT count(*) FROM intel.vol_regime_log_v1"):
+            await conn.execute("INSERT INTO intel.vol_regime_log_v1 (regime_label) VALUES ('NORMAL')")
+    finally:
+        await conn.close()
+
+    pool = await db.create_pool("bench_workers", args.dsn, numeric_as_float=True, max_size=2)
+    symbols = len(await panel.fetch_symbols(pool))
+
+    async def reset_nowcast():
+        async with pool.acquire() as c:
+            if not await c.fetchval("SELECT count(*) FROM market.merchant_spend_panel_v1"):
+                await panel.run_once(pool)
+            await c.execute("TRUNCATE market.earnings_nowcast_runs_v1, "
+                            "market.earnings_predictions_v1, truth.signals_v1")
+
+    async def reset_accuracy():
+        async with pool.acquire() as c:
+            await c.execute("TRUNCATE market.earnings_model_accuracy_v1, market.earnings_actuals_v1, "
+                            "market.earnings_nowcast_runs_v1, market.earnings_predictions_v1")
+            await c.reset_type_codec("numeric", schema="pg_catalog")   # binary COPY
+            try:
+                await copy_dicts(c, "market.earnings_predictions_v1", preds, (
+                    "prediction_id", "nowcast_id", "symbol", "fiscal_quarter", "prediction",
+                    "predicted_revenue_usd", "surprise_pct", "confidence_score", "status", "created_at"))
+                await copy_dicts(c, "market.earnings_nowcast_runs_v1", preds, (
+                    "nowcast_id", "symbol", "fiscal_quarter", "panel_weeks_used", "panel_coverage_score"))
+                await copy_dicts(c, "market.earnings_actuals_v1", actuals, tuple(actuals[0]))
+            finally:
+                await db.register_numeric_float(c)
+
+    upcoming = sum(today <= c["earnings_date"] <= today + timedelta(days=nowcast.MAX_DAYS_TO_EARNINGS)
+                   for c in consensus)
+    scenarios = {
+        "panel":    Scenario("panel", symbols, lambda: panel.run_once(pool)),
+        "nowcast":  Scenario("nowcast", upcoming, lambda: nowcast.run_once(pool), reset_nowcast),
+        "accuracy": Scenario("accuracy", len(actuals), lambda: accuracy.run_once(pool), reset_accuracy),
+    }
+    return scenarios, pool.close
+
+
+# ── Supabase + HTTP workers ──────────────────────────────────────────────
+
+def last_weekday(today: date) -> str:
+    d = today - timedelta(days=1)
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d.isoformat()
+
+
+def trace_scenario(u: synth.Universe, today: date, args) -> Scenario:
+    trade_date = last_weekday(today)
+    cusips = synth.trace_cusip_map(u)
+    history = synth.trace_history(u, trade_date, days=trace_worker.WINDOW_DAYS)
+
+    def finra(params: dict):
+        prefix = json.loads(params["compareFilters"])[0]["fieldValue"]
+        day = json.loads(params["dateRangeFilters"])[0]["startDate"]
+        rows = synth.trace_response(u.seed, prefix, day)
+        return (404, None) if rows is None else (200, rows)
+
+    session = StubSession({trace_worker.FINRA_BASE: finra}, latency_ms=args.http_ms)
+    state = {}
+
+    async def reset():
+        session.calls.clear()
+        state["supabase"] = supabase = StubSupabase(latency_ms=args.supabase_ms)
+        supabase.seed("credit", "trace_cusip_map", cusips)
+        supabase.seed("credit", "trace_bond_signals", history)
+
+    async def run():
+        trace_worker.run_once(state["supabase"], session, trade_date)
+
+    def counters() -> dict:
+        return {"http_calls": sum(session.calls.values()),
+                "supabase_calls": dict(state["supabase"].calls)}
+
+    return Scenario("trace", len(cusips), run, reset, counters)
+
+
+def comtrade_scenario(u: synth.Universe, today: date, args) -> Scenario:
+    reporters = u.reporter_codes()
+    commodities = [c["hs_code"] for c in cot_worker.COMMODITY_TARGETS]
+    periods = cot_worker.get_periods(lookback_months=cot_worker.LOOKBACK_MONTHS)
+    first = datetime.strptime(min(periods), "%Y%m")
+    baseline = [f"{(first.year * 12 + first.month - 1 - k) // 12}{(first.month - 1 - k) % 12 + 1:02d}"
+                for k in range(1, cot_worker.BASELINE_MONTHS + 1)]
+    history = synth.comtrade_history(u.seed, reporters, commodities, baseline)
+    for row in history:
+        flow = row.pop("flow")
+        row["record_id"] = cot_worker.make_record_id(
+            row["reporter_country"], "0", row["commodity_code"], row["period"], flow)
+
+    session = StubSession(
+        {cot_worker.BASE_URL: lambda params: (200, {"data": synth.comtrade_response(u.seed, params)})},
+        latency_ms=args.http_ms,
+    )
+    cot_worker.requests = types.SimpleNamespace(Session=lambda: session)
+    cot_worker.RATE_LIMIT_MIN_INTERVAL = 0.0
+    cot_worker.REPORTER_COUNTRIES = reporters
+    state = {}
+
+    async def reset():
+        session.calls.clear()
+        state["supabase"] = supabase = StubSupabase(latency_ms=args.supabase_ms)
+        supabase.seed("macro", "trade_flows_v1", history, key="record_id")
+
+    async def run():
+        cot_worker.run_once(state["supabase"])
+
+    def counters() -> dict:
+        return {"http_calls": sum(session.calls.values()),
+                "supabase_calls": dict(state["supabase"].calls)}
+
+    return Scenario("comtrade", len(reporters) * len(commodities) * len(periods), run, reset, counters)
+
+
+# ── Measurement / comparison ─────────────────────────────────────────────
+
+async def measure(sc: Scenario, runs: int, warmup: int) -> dict:
+    wall, cpu = [], []
+    for i in range(warmup + runs):
+        if sc.reset:
+            await sc.reset()
+        t0, c0 = time.perf_counter(), time.process_time()
+        await sc.run()
+        t1, c1 = time.perf_counter(), time.process_time()
+        if i >= warmup:
+            wall.append((t1 - t0) * 1000)
+            cpu.append((c1 - c0) * 1000)
+    p50 = statistics.median(wall)
+    return {
+        "units": sc.units,
+        "runs": runs,
+        "wall_ms": {"mean": round(statistics.fmean(wall), 3), "p50": round(p50, 3),
+                    "min": round(min(wall), 3), "max": round(max(wall), 3)},
+        "cpu_ms": round(statistics.fmean(cpu), 3),
+        "us_per_unit": round(p50 * 1000 / sc.units, 2) if sc.units else None,
+        **sc.counters(),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> dict:
+    def sizing(cfg: dict) -> dict:
+        return {k: v for k, v in cfg.items() if k not in ("runs", "warmup")}
+
+    out = {"baseline_rev": baseline.get("meta", {}).get("git_rev"),
+           "config_match": sizing(baseline.get("meta", {}).get("config", {})) == sizing(current["meta"]["config"]),
+           "tolerance": tolerance, "scenarios": {}}
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            out["scenarios"][name] = {"status": "NEW"}
+            continue
+        b, c = base["wall_ms"]["p50"], cur["wall_ms"]["p50"]
+        change = (c - b) / b if b else 0.0
+        status = "REGRESSION" if change > tolerance else "IMPROVED" if change < -tolerance else "OK"
+        out["scenarios"][name] = {"baseline_p50_ms": b, "current_p50_ms": c,
+                                  "change_pct": round(change * 100, 1), "status": status}
+    return out
+
+
+async def run(args) -> dict:
+    u = synth.Universe(symbols=args.symbols, obs_per_week=args.obs_per_week,
+                       cusips_per_symbol=args.cusips_per_symbol,
+                       reporters=args.reporters, seed=args.seed)
+    today = date.today()
+    wanted = args.only or SCENARIOS
+    close = None
+
+    scenarios: dict[str, Scenario] = {}
+    if {"panel", "nowcast", "accuracy"} & set(wanted):
+        if args.dsn:
+            scenarios, close = await postgres_scenarios(u, today, args)
+        else:
+            scenarios = standin_scenarios(u, today, args)
+    if "trace" in wanted:
+        scenarios["trace"] = trace_scenario(u, today, args)
+    if "comtrade" in wanted:
+        scenarios["comtrade"] = comtrade_scenario(u, today, args)
+
+    results = {}
+    try:
+        for name in SCENARIOS:
+            if name in wanted:
+                results[name] = await measure(scenarios[name], args.runs, args.warmup)
+                print(f"{name:<9} p50 {results[name]['wall_ms']['p50']:>10.1f} ms  "
+                      f"({results[name]['us_per_unit']} µs/unit)", file=sys.stderr)
+    finally:
+        if close:
+            await close()
+
+    return {
+        "meta": {
+            "git_rev": git_rev(),
+            "python": platform.python_version(),
+            "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "config": {
+                **asdict(u),
+                "backend": "postgres" if args.dsn else "standin",
+                "rtt_ms": args.rtt_ms, "row_us": args.row_us,
+                "http_ms": args.http_ms, "supabase_ms": args.supabase_ms,
+                "runs": args.runs, "warmup": args.warmup,
+            },
+            "peak_rss_mb": peak_rss_mb(),
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", nargs="+", choices=SCENARIOS)
+    ap.add_argument("--symbols", type=int, default=50)
+    ap.add_argument("--obs-per-week", type=int, default=30)
+    ap.add_argument("--cusips-per-symbol", type=int, default=3)
+    ap.add_argument("--reporters", type=int, default=18)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument("--rtt-ms", type=float, default=0.0, help="stand-in pool round trip")
+    ap.add_argument("--row-us", type=float, default=0.0, help="stand-in pool cost per written row")
+    ap.add_argument("--http-ms", type=float, default=0.0, help="FINRA / Comtrade latency per call")
+    ap.add_argument("--supabase-ms", type=float, default=0.0, help="Supabase latency per call")
+    ap.add_argument("--dsn", help="run the asyncpg workers on this Postgres (requires --scratch)")
+    ap.add_argument("--scratch", action="store_true", help="allow creating / truncating tables at --dsn")
+    ap.add_argument("--out", help="also write the JSON report here")
+    ap.add_argument("--compare", help="baseline JSON from an earlier --out")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="p50 slowdown that counts as a regression")
+    ap.add_argument("--verbose", action="store_true", help="keep the workers' INFO logs")
+    args = ap.parse_args()
+    if args.dsn and not args.scratch:
+        ap.error("--dsn seeds and truncates tables; pass --scratch to confirm it is a throwaway database")
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    results = asyncio.run(run(args))
+    if args.compare:
+        results["comparison"] = compare(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+
+    report = json.dumps(results, indent=2, default=str)
+    print(report)
+    if args.out:
+        Path(args.out).write_text(report + "\n")
+    if args.compare and any(s["status"] == "REGRESSION"
+                            for s in results["comparison"]["scenarios"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
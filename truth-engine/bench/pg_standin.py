@@ -0,0 +1,172 @@
+"""
+pg_standin.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — in-memory asyncpg pool stand-in for benchmarks
+
+Implements the slice of the asyncpg Pool/Connection API the workers use
+(acquire, fetch / fetchrow / fetchval, execute / executemany,
+copy_records_to_table, transaction, set_type_codec) without a server.
+Rows are counted, not stored, unless keep_rows=True. An optional per-row
+cost (µs) and per-call round trip (ms) model a real database so flush
+latency is not flattered to zero.
+
+Reads are answered by routes: (substring of the SQL, handler(*args) →
+list of dicts). Answers are memoised per (handler, args) so a warm-up
+run pays for building them and timed runs see dictionary lookups only;
+a fetch no route matches returns no rows and is counted under
+calls["unrouted"].
+
+    pool = StandinPool(routes=[("FROM intel.vol_regime_log_v1",
+                                lambda: [{"regime_label": "NORMAL"}])])
+"""
+
+import asyncio
+import re
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+_WRITE_TARGET = re.compile(r"\b(?:INSERT\s+INTO|UPDATE)\s+([\w.]+)", re.IGNORECASE)
+
+
+class StandinRecord:
+    """asyncpg.Record look-alike: r["col"], r[0], keys(), iteration over values."""
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self, keys: tuple, values: tuple):
+        self._keys = keys
+        self._values = values
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._values[self._keys.index(key)]
+        return self._values[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self._keys else default
+
+    def keys(self):
+        return iter(self._keys)
+
+    def values(self):
+        return iter(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return "<StandinRecord " + " ".join(f"{k}={v!r}" for k, v in zip(self._keys, self._values)) + ">"
+
+
+def _hashable(args: tuple) -> tuple:
+    return tuple(tuple(a) if isinstance(a, list) else a for a in args)
+
+
+class StandinConnection:
+    def __init__(self, pool: "StandinPool"):
+        self.pool = pool
+
+    async def _cost(self, rows: int):
+        delay = self.pool.rtt_ms / 1000 + rows * self.pool.row_us / 1e6
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def execute(self, query: str, *args):
+        self.pool.calls["execute"] += 1
+        rows = max((len(a) for a in args if isinstance(a, list)), default=1)
+        self.pool.count_write(query, rows)
+        await self._cost(rows)
+        return "OK"
+
+    async def executemany(self, query: str, args):
+        args = list(args)
+        self.pool.calls["executemany"] += 1
+        self.pool.count_write(query, len(args))
+        await self._cost(len(args))
+
+    async def fetch(self, query: str, *args):
+        self.pool.calls["fetch"] += 1
+        rows = self.pool.answer(query, args)
+        await self._cost(len(rows))
+        return rows
+
+    async def fetchrow(self, query: str, *args):
+        rows = await self.fetch(query, *args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: str, *args):
+        row = await self.fetchrow(query, *args)
+        return row[0] if row is not None else None
+
+    async def set_type_codec(self, *args, **kwargs):
+        pass
+
+    async def copy_records_to_table(self, table, *, records, columns=None, schema_name=None):
+        records = list(records)
+        key = f"{schema_name}.{table}" if schema_name else table
+        self.pool.calls["copy"] += 1
+        self.pool.rows[key] += len(records)
+        if self.pool.keep_rows:
+            self.pool.tables[key].extend(records)
+        await self._cost(len(records))
+        return f"COPY {len(records)}"
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class StandinPool:
+    def __init__(self, row_us: float = 0.0, rtt_ms: float = 0.0, keep_rows: bool = False,
+                 routes: Optional[list[tuple[str, Callable]]] = None):
+        self.row_us    = row_us
+        self.rtt_ms    = rtt_ms
+        self.keep_rows = keep_rows
+        self.routes    = routes or []
+        self.rows: dict[str, int]    = defaultdict(int)
+        self.calls: dict[str, int]   = defaultdict(int)
+        self.tables: dict[str, list] = defaultdict(list)
+        self.created = time.monotonic()
+        self._answers: dict[tuple, list] = {}
+
+    def answer(self, query: str, args: tuple) -> list:
+        for needle, handler in self.routes:
+            if needle in query:
+                break
+        else:
+            self.calls["unrouted"] += 1
+            return []
+        key = (needle, _hashable(args))
+        rows = self._answers.get(key)
+        if rows is None:
+            dicts = handler(*args)
+            rows = self._answers[key] = [
+                StandinRecord(tuple(d), tuple(d.values())) for d in dicts
+            ]
+        return rows
+
+    def count_write(self, query: str, rows: int):
+        m = _WRITE_TARGET.search(query)
+        if m:
+            self.rows[m.group(1)] += rows
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield StandinConnection(self)
+
+    async def execute(self, query: str, *args):
+        return await StandinConnection(self).execute(query, *args)
+
+    async def fetch(self, query: str, *args):
+        return await StandinConnection(self).fetch(query, *args)
+
+    async def fetchval(self, query: str, *args):
+        return await StandinConnection(self).fetchval(query, *args)
+
+    async def close(self):
+        pass
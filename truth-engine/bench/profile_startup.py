@@ -0,0 +1,99 @@
+"""
+profile_startup.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — worker cold-start profiler
+
+Imports each worker module in a fresh interpreter under `-X importtime`
+and reports total import time, interpreter wall time, and the heaviest
+top-level dependencies. Placeholder values are supplied for required
+environment variables so only import cost is measured — worker modules
+must not read config or build clients at import time (see workers/lazy.py).
+
+    python bench/profile_startup.py                   # every worker
+    python bench/profile_startup.py trace_worker cot_worker --top 10 --json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+WORKERS = Path(__file__).resolve().parents[1] / "workers"
+
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://localhost:54321",
+    "SUPABASE_SERVICE_ROLE_KEY": "profile",
+    "DATABASE_URL": "postgresql://profile@localhost/profile",
+    "PG_CONN": "postgresql://profile@localhost/profile",
+    "FUND_ID": "profile",
+}
+
+
+def default_modules() -> list[str]:
+    names = sorted(p.stem for p in WORKERS.glob("*_worker.py"))
+    return names + ["supervisor"]
+
+
+def profile(module: str) -> dict:
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=WORKERS, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+
+    by_package: dict[str, int] = defaultdict(int)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue                       # header row
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        us = int(cumulative)
+        if depth == 0:
+            total_us += us
+        if depth <= 1:
+            package = name.strip().split(".")[0]
+            by_package[package] = max(by_package[package], us)
+
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "import_ms": round(total_us / 1000, 1),
+        "wall_ms": round(wall_ms, 1),
+        "heaviest": sorted(((k, round(v / 1000, 1)) for k, v in by_package.items()),
+                           key=lambda kv: -kv[1]),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("modules", nargs="*", help="worker modules (default: all)")
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    results = [profile(m) for m in args.modules or default_modules()]
+    for r in results:
+        r["heaviest"] = r["heaviest"][:args.top]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'worker':32} {'import ms':>10} {'wall ms':>9}  heaviest")
+    for r in sorted(results, key=lambda r: -r["import_ms"]):
+        heavy = ", ".join(f"{k} {v}" for k, v in r["heaviest"] if k != r["module"])
+        status = "" if r["ok"] else f"  ✖ {r['error']}"
+        print(f"{r['module']:32} {r['import_ms']:>10} {r['wall_ms']:>9}  {heavy}{status}")
+
+
+if __name__ == "__main__":
+    main()
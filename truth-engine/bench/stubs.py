@@ -0,0 +1,219 @@
+"""
+stubs.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — HTTP and Supabase stand-ins for benchmarks
+
+StubSession answers requests.Session.get() from a URL → handler map, so
+trace_worker / cot_worker run their real fetch, retry and parse code
+without the network. StubSupabase is an in-memory table store behind the
+slice of the supabase-py query builder the workers use (select / eq /
+neq / lt / lte / gt / gte / in_ / order / limit / range, insert / upsert
+with on_conflict). Both count calls and can add a fixed latency per call
+so a run is not flattered to zero I/O cost.
+
+    session = StubSession({FINRA_BASE: lambda params: (200, rows)}, latency_ms=5)
+    supabase = StubSupabase(latency_ms=20)
+    supabase.seed("credit", "trace_cusip_map", rows)
+"""
+
+import copy
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Iterable, Optional, Union
+
+
+class StubHTTPError(Exception):
+    pass
+
+
+class StubResponse:
+    def __init__(self, status_code: int, payload: Any = None, headers: Optional[dict] = None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise StubHTTPError(f"{self.status_code} from stub")
+
+
+class StubSession:
+    """
+    handlers: url → fn(params) → (status, payload). Unknown URLs are 404.
+    throttle_every=N answers every Nth call with 429 (Retry-After: 0).
+    """
+
+    def __init__(self, handlers: dict[str, Callable[[dict], tuple[int, Any]]],
+                 latency_ms: float = 0.0, throttle_every: int = 0):
+        self.handlers = handlers
+        self.latency_ms = latency_ms
+        self.throttle_every = throttle_every
+        self.headers: dict[str, str] = {}
+        self.calls: Counter = Counter()
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None,
+            headers: Optional[dict] = None) -> StubResponse:
+        self.calls[url] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.throttle_every and sum(self.calls.values()) % self.throttle_every == 0:
+            return StubResponse(429, None, {"Retry-After": "0"})
+        handler = self.handlers.get(url)
+        if handler is None:
+            return StubResponse(404)
+        status, payload = handler(params or {})
+        return StubResponse(status, payload)
+
+    def close(self):
+        pass
+
+
+# ── Supabase ─────────────────────────────────────────────────────────────
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, store: "StubSupabase", name: str):
+        self.store = store
+        self.name = name
+        self.filters: list[Callable[[dict], bool]] = []
+        self.eqs: list[tuple[str, Any]] = []
+        self.order_by: list[tuple[str, bool]] = []
+        self.window: Optional[tuple[int, int]] = None
+        self.columns: Optional[list[str]] = None
+        self.write: Optional[tuple[str, list[dict], Optional[str]]] = None
+
+    # -- reads
+    def select(self, columns: str = "*"):
+        if columns.strip() != "*":
+            self.columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def _filter(self, fn):
+        self.filters.append(fn)
+        return self
+
+    def eq(self, col, v):
+        self.eqs.append((col, v))
+        return self
+
+    def neq(self, col, v):  return self._filter(lambda r: r.get(col) != v)
+    def lt(self, col, v):   return self._filter(lambda r: r.get(col) is not None and r[col] < v)
+    def lte(self, col, v):  return self._filter(lambda r: r.get(col) is not None and r[col] <= v)
+    def gt(self, col, v):   return self._filter(lambda r: r.get(col) is not None and r[col] > v)
+    def gte(self, col, v):  return self._filter(lambda r: r.get(col) is not None and r[col] >= v)
+
+    def in_(self, col, values):
+        values = set(values)
+        return self._filter(lambda r: r.get(col) in values)
+
+    def order(self, col: str, desc: bool = False):
+        self.order_by.append((col, desc))
+        return self
+
+    def limit(self, n: int):
+        self.window = (0, n - 1)
+        return self
+
+    def range(self, start: int, end: int):
+        self.window = (start, end)
+        return self
+
+    # -- writes
+    def insert(self, rows: Union[dict, list[dict]]):
+        self.write = ("insert", rows if isinstance(rows, list) else [rows], None)
+        return self
+
+    def upsert(self, rows: Union[dict, list[dict]], on_conflict: Optional[str] = None):
+        self.write = ("upsert", rows if isinstance(rows, list) else [rows], on_conflict)
+        return self
+
+    def execute(self) -> _Result:
+        store = self.store
+        if store.latency_ms:
+            time.sleep(store.latency_ms / 1000)
+        if self.write:
+            mode, rows, on_conflict = self.write
+            store.calls[f"{mode} {self.name}"] += 1
+            store._write(self.name, rows, on_conflict)
+            return _Result(rows)
+
+        store.calls[f"select {self.name}"] += 1
+        if self.eqs:                                     # hash lookup on the first eq
+            col, v = self.eqs[0]
+            rows = store._index(self.name, col).get(v, [])
+            filters = [(lambda r, c=c, v=v: r.get(c) == v) for c, v in self.eqs[1:]] + self.filters
+        else:
+            rows = store.tables[self.name].values()
+            filters = self.filters
+        rows = [r for r in rows if all(f(r) for f in filters)]
+        for col, desc in reversed(self.order_by):
+            rows.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        if self.window:
+            rows = rows[self.window[0]:self.window[1] + 1]
+        if self.columns:
+            rows = [{c: r.get(c) for c in self.columns} for r in rows]
+        else:
+            rows = [dict(r) for r in rows]
+        return _Result(rows)
+
+
+class _Schema:
+    def __init__(self, store: "StubSupabase", schema: str):
+        self.store = store
+        self.schema = schema
+
+    def table(self, table: str) -> _Query:
+        return _Query(self.store, f"{self.schema}.{table}")
+
+
+class StubSupabase:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.tables: dict[str, dict[Any, dict]] = defaultdict(dict)
+        self.calls: Counter = Counter()
+        self._serial = 0
+        self._indexes: dict[tuple[str, str], dict[Any, list[dict]]] = {}
+
+    def schema(self, schema: str) -> _Schema:
+        return _Schema(self, schema)
+
+    def table(self, table: str) -> _Query:
+        return _Query(self, f"public.{table}")
+
+    def seed(self, schema: str, table: str, rows: Iterable[dict], key: Optional[str] = None):
+        """Load rows without counting a call; key = on_conflict columns they are upserted by."""
+        self._write(f"{schema}.{table}", [copy.deepcopy(r) for r in rows], key)
+
+    def rows(self, schema: str, table: str) -> list[dict]:
+        return list(self.tables[f"{schema}.{table}"].values())
+
+    def _index(self, name: str, col: str) -> dict[Any, list[dict]]:
+        index = self._indexes.get((name, col))
+        if index is None:
+            index = self._indexes[(name, col)] = defaultdict(list)
+            for row in self.tables[name].values():
+                index[row.get(col)].append(row)
+        return index
+
+    def _write(self, name: str, rows: list[dict], on_conflict: Optional[str]):
+        table = self.tables[name]
+        for key in [k for k in self._indexes if k[0] == name]:
+            del self._indexes[key]
+        cols = [c.strip() for c in on_conflict.split(",")] if on_conflict else None
+        for row in rows:
+            if cols:
+                table[tuple(row.get(c) for c in cols)] = row
+            else:
+                self._serial += 1
+                table[self._serial] = row
@@ -0,0 +1,255 @@
+"""
+synth.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — seeded synthetic data for worker benchmarks
+
+Every generator is a pure function of a Universe (sizes + seed), so two
+runs with the same arguments see the same data and run-over-run timings
+are comparable. Shapes follow what the workers read:
+
+  plaid_observations   market.plaid_merchant_observations_v1 tuples
+  consensus_rows       market.earnings_consensus_v1 (current quarter)
+  panel_summaries      nowcast panel state per consensus row (no-panel /
+                       thin / full mix) — for the in-memory stand-in
+  predictions          market.earnings_predictions_v1 (ACTIVE + SUPERSEDED)
+  actuals              market.earnings_actuals_v1 for those predictions
+  trace_cusip_map      credit.trace_cusip_map
+  trace_history        credit.trace_bond_signals baseline window
+  trace_response       FINRA tradesAgg JSON for one prefix + date
+  comtrade_response    Comtrade preview JSON for one request's params
+  comtrade_history     macro.trade_flows_v1 baseline months
+
+HTTP payloads are seeded per key (prefix + date, reporter + commodity +
+period + flow), so they do not depend on request order or batching.
+"""
+
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+QUARTER_START_MONTH = {"Q1": 1, "Q2": 4, "Q3": 7, "Q4": 10}
+
+
+@dataclass(frozen=True)
+class Universe:
+    symbols:            int = 50
+    obs_per_week:       int = 30        # Plaid observations per symbol per week
+    users_per_symbol:   int = 300
+    weeks:              int = 108       # panel lookback (56) + prior year (52)
+    predictions_per_symbol: int = 3
+    cusips_per_symbol:  int = 3
+    reporters:          int = 18
+    seed:               int = 7
+
+    def rng(self, stream: str) -> random.Random:
+        return random.Random(f"{self.seed}:{stream}")
+
+    def symbol_names(self) -> list[str]:
+        return [f"SYM{i:04d}" for i in range(self.symbols)]
+
+    def reporter_codes(self) -> list[str]:
+        return [f"{100 + i:03d}" for i in range(self.reporters)]
+
+
+def current_quarter(today: date) -> tuple[str, date, date]:
+    """(fiscal_quarter, start, end) of the calendar quarter containing today."""
+    q = (today.month - 1) // 3
+    start = date(today.year, 3 * q + 1, 1)
+    nxt = date(today.year + (q == 3), (3 * q + 3) % 12 + 1, 1)
+    return f"Q{q + 1}-{today.year}", start, nxt - timedelta(days=1)
+
+
+# ── Plaid / earnings ─────────────────────────────────────────────────────
+
+def plaid_observations(u: Universe, today: Optional[date] = None) -> list[tuple]:
+    """(canonical_symbol, user_token, transaction_date, amount_usd) with a yearly trend per symbol."""
+    today = today or date.today()
+    rng = u.rng("plaid")
+    start = today - timedelta(weeks=u.weeks)
+    out = []
+    for sym in u.symbol_names():
+        base = rng.uniform(2.5, 4.5)
+        growth = rng.gauss(0.08, 0.15)                     # YoY
+        for w in range(u.weeks):
+            mu = base + growth * (w - u.weeks) / 52
+            for _ in range(u.obs_per_week):
+                out.append((
+                    sym, f"u{rng.randrange(u.users_per_symbol)}",
+                    start + timedelta(days=7 * w + rng.randrange(7)),
+                    round(rng.lognormvariate(mu, 0.8), 2),
+                ))
+    return out
+
+
+def consensus_rows(u: Universe, today: Optional[date] = None) -> list[dict]:
+    today = today or date.today()
+    rng = u.rng("consensus")
+    fq, _, fq_end = current_quarter(today)
+    rows = []
+    for sym in u.symbol_names():
+        rows.append({
+            "consensus_id": uuid.UUID(int=rng.getrandbits(128)),
+            "symbol": sym,
+            "fiscal_quarter": fq,
+            "fiscal_quarter_end": fq_end,
+            "earnings_date": today + timedelta(days=rng.randrange(1, 90)),
+            "consensus_revenue_usd": round(rng.uniform(5e5, 5e7), 2),
+            "consensus_revenue_growth_pct": None if rng.random() < 0.1 else round(rng.gauss(6, 8), 4),
+            "analyst_count": rng.randrange(2, 30),
+            "as_of_date": today,
+        })
+    return rows
+
+
+def panel_summaries(u: Universe, consensus: list[dict]) -> dict[tuple[str, str], dict]:
+    """(symbol, fiscal_quarter) → nowcast panel state; ~10% no panel, ~10% thin."""
+    rng = u.rng("panel_summary")
+    out = {}
+    for c in consensus:
+        r = rng.random()
+        if r < 0.1:
+            continue
+        weeks = 1 if r < 0.2 else rng.randrange(2, 13)
+        out[(c["symbol"], c["fiscal_quarter"])] = {
+            "weeks_used": weeks,
+            "qtd_spend_usd": round(c["consensus_revenue_usd"] * rng.uniform(0.002, 0.02) * weeks, 2),
+            "yoy_growth_pct": None if rng.random() < 0.3 else round(rng.gauss(8, 15), 4),
+            "user_count": rng.randrange(10, 800),
+            "coverage_score": round(rng.uniform(0.1, 0.95), 4),
+            "latest_week_start": c["as_of_date"] - timedelta(days=7),
+        }
+    return out
+
+
+def predictions(u: Universe, consensus: list[dict]) -> list[dict]:
+    rng = u.rng("predictions")
+    labels = ("STRONG_BEAT", "BEAT", "IN_LINE", "MISS", "STRONG_MISS")
+    out = []
+    for c in consensus:
+        n = u.predictions_per_symbol
+        for k in range(n):
+            out.append({
+                "prediction_id": uuid.UUID(int=rng.getrandbits(128)),
+                "nowcast_id": uuid.UUID(int=rng.getrandbits(128)),
+                "symbol": c["symbol"],
+                "fiscal_quarter": c["fiscal_quarter"],
+                "prediction": rng.choice(labels),
+                "predicted_revenue_usd": (None if rng.random() < 0.05 else
+                                          round(c["consensus_revenue_usd"] * rng.gauss(1, 0.05), 2)),
+                "surprise_pct": round(rng.gauss(0, 4), 4),
+                "confidence_score": round(rng.uniform(0.5, 0.95), 4),
+                "status": "ACTIVE" if k == n - 1 else "SUPERSEDED",
+                "created_at": c["as_of_date"] - timedelta(days=7 * (n - k)),
+                "panel_weeks_used": rng.randrange(2, 13),
+                "panel_coverage_score": round(rng.uniform(0.15, 0.95), 4),
+            })
+    return out
+
+
+def actuals(u: Universe, preds: list[dict], consensus: list[dict]) -> list[dict]:
+    """One actual per symbol+quarter that has predictions, ±4% around consensus."""
+    rng = u.rng("actuals")
+    by_key = {(c["symbol"], c["fiscal_quarter"]): c for c in consensus}
+    out, seen = [], set()
+    for p in preds:
+        key = (p["symbol"], p["fiscal_quarter"])
+        if key in seen or key not in by_key:
+            continue
+        seen.add(key)
+        c = by_key[key]
+        out.append({
+            "actual_id": uuid.UUID(int=rng.getrandbits(128)),
+            "symbol": key[0],
+            "fiscal_quarter": key[1],
+            "report_date": c["earnings_date"],
+            "actual_revenue_usd": round(c["consensus_revenue_usd"] * rng.gauss(1.0, 0.04), 2),
+            "actual_eps": round(rng.gauss(1.2, 0.6), 2),
+        })
+    return out
+
+
+# ── FINRA TRACE ──────────────────────────────────────────────────────────
+
+def trace_cusip_map(u: Universe) -> list[dict]:
+    rng = u.rng("cusips")
+    return [
+        {"cusip_prefix": f"{rng.getrandbits(24):06X}", "equity_symbol": sym,
+         "issuer_name": f"{sym} Corp", "active": True}
+        for sym in u.symbol_names() for _ in range(u.cusips_per_symbol)
+    ]
+
+
+def trace_history(u: Universe, trade_date: str, days: int = 20) -> list[dict]:
+    rng = u.rng("trace_history")
+    end = date.fromisoformat(trade_date)
+    rows = []
+    for sym in u.symbol_names():
+        par = rng.uniform(5e6, 2e8)
+        count = rng.randrange(20, 400)
+        yld = rng.uniform(3.5, 7.5)
+        for d in range(1, days + 1):
+            rows.append({
+                "equity_symbol": sym,
+                "signal_date": (end - timedelta(days=d)).isoformat(),
+                "par_volume_usd": round(par * rng.lognormvariate(0, 0.3), 2),
+                "meta": {"trade_count": max(1, int(count * rng.lognormvariate(0, 0.25))),
+                         "weighted_yield": round(yld + rng.gauss(0, 0.15), 4)},
+            })
+    return rows
+
+
+def trace_response(seed: int, cusip_prefix: str, trade_date: str) -> Optional[list[dict]]:
+    """FINRA tradesAgg rows for prefix + date; None = 404 (no trades)."""
+    rng = random.Random(f"{seed}:trace:{cusip_prefix}:{trade_date}")
+    if rng.random() < 0.1:
+        return None
+    return [
+        {"cusip": f"{cusip_prefix}{k:03d}", "tradeDate": trade_date,
+         "totalParAmt": round(rng.lognormvariate(15, 1.2), 2),
+         "tradeCount": rng.randrange(1, 120),
+         "avgPrice": round(rng.gauss(98, 4), 4),
+         "highPrice": None, "lowPrice": None,
+         "avgYield": None if rng.random() < 0.1 else round(rng.gauss(5.5, 1.0), 4)}
+        for k in range(rng.randrange(1, 12))
+    ]
+
+
+# ── UN Comtrade ──────────────────────────────────────────────────────────
+
+def _flow_value(seed: int, reporter: str, commodity: str, period: str, flow: str) -> float:
+    rng = random.Random(f"{seed}:comtrade:{reporter}:{commodity}:{flow}")
+    level = rng.lognormvariate(19, 1.5)
+    month = int(period[:4]) * 12 + int(period[4:6])
+    noise = random.Random(f"{seed}:comtrade:{reporter}:{commodity}:{period}:{flow}")
+    shock = 2.5 if noise.random() < 0.02 else 1.0
+    return round(level * (1 + 0.1 * ((month % 12) - 6) / 6) * noise.lognormvariate(0, 0.08) * shock, 2)
+
+
+def comtrade_response(seed: int, params: dict) -> list[dict]:
+    """Preview-endpoint rows for one request: reporters × commodities × periods × flows."""
+    rows = []
+    for reporter in params["reporterCode"].split(","):
+        for commodity in params["cmdCode"].split(","):
+            for period in params["period"].split(","):
+                for flow in params["flowCode"].split(","):
+                    rows.append({
+                        "reporterCode": int(reporter), "partnerCode": 0,
+                        "cmdCode": commodity, "period": period, "flowCode": flow,
+                        "primaryValue": _flow_value(seed, reporter, commodity, period, flow),
+                        "reporterDesc": f"R{reporter}", "partnerDesc": "World",
+                        "qtyUnitCode": -1, "qty": None,
+                    })
+    return rows
+
+
+def comtrade_history(seed: int, reporters: list[str], commodities: list[str],
+                     periods: list[str]) -> list[dict]:
+    """macro.trade_flows_v1 rows for baseline months (record_id is filled by the caller)."""
+    return [
+        {"source": "UN_COMTRADE", "reporter_country": r, "partner_country": "0",
+         "commodity_code": c, "trade_flow": "EXPORT" if f == "X" else "IMPORT",
+         "period": p, "value_usd": _flow_value(seed, r, c, p, f), "flow": f}
+        for r in reporters for c in commodities for p in periods for f in ("X", "M")
+    ]
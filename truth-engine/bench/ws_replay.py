@@ -0,0 +1,170 @@
+"""
+ws_replay.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Binance trade stream recorder / local replay server
+
+Captures are gzip text, one frame per line: "<recv_us>\t<raw frame>".
+
+    # record live frames (combined stream, same URL ops_worker uses)
+    python bench/ws_replay.py record --symbols btcusdt,ethusdt --seconds 600 --out cap.gz
+
+    # synthesize a capture without network access
+    python bench/ws_replay.py synth --n 1000000 --symbols 200 --rate 20000 --out cap.gz
+
+    # replay at 10× recorded pace (0 = as fast as possible)
+    python bench/ws_replay.py serve --file cap.gz --speed 10 --port 9765
+
+The server speaks just enough of the Binance protocol for ops_worker:
+SUBSCRIBE frames are acked, replay starts on the first SUBSCRIBE, and the
+connection is closed when the capture ends (after --loops passes).
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+
+import websockets
+from websockets.asyncio.server import serve as ws_serve
+
+BINANCE_WS_URL = "wss://stream.binance.us:9443/stream"
+SEND_BATCH     = 256      # frames sent between pacing checks
+
+
+def read_capture(path: str) -> tuple[list[int], list[str]]:
+    recv_us, frames = [], []
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            t, _, msg = line.rstrip("\n").partition("\t")
+            recv_us.append(int(t))
+            frames.append(msg)
+    return recv_us, frames
+
+
+def capture_symbols(frames: list[str]) -> list[str]:
+    seen = {}
+    for msg in frames:
+        i = msg.find('"stream":"')
+        if i >= 0:
+            seen.setdefault(msg[i + 10:msg.index("@", i)], None)
+    return list(seen)
+
+
+# ── Record ───────────────────────────────────────────────────────────────
+
+async def record(url: str, symbols: list[str], seconds: float, out: str):
+    n, deadline = 0, time.monotonic() + seconds
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({
+            "method": "SUBSCRIBE", "params": [f"{s}@trade" for s in symbols], "id": 1,
+        }))
+        with gzip.open(out, "wt") as f:
+            while time.monotonic() < deadline:
+                try:
+                    msg = await asyncio.wait_for(ws.recv(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if '"result"' in msg:
+                    continue    # SUBSCRIBE ack
+                f.write(f"{time.time_ns() // 1000}\t{msg}\n")
+                n += 1
+    print(f"recorded {n} frames → {out}")
+
+
+def synth(n: int, n_symbols: int, rate: float, out: str):
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from bench_ops_decode import make_frames
+
+    frames = make_frames(n, [f"sym{i}usdt" for i in range(n_symbols)])
+    t0 = 1_700_000_000_000_000
+    step = 1e6 / rate
+    with gzip.open(out, "wt") as f:
+        for i, msg in enumerate(frames):
+            f.write(f"{t0 + int(i * step)}\t{msg}\n")
+    print(f"synthesized {n} frames over {n_symbols} symbols → {out}")
+
+
+# ── Serve ────────────────────────────────────────────────────────────────
+
+async def _replay(ws, recv_us: list[int], frames: list[str], speed: float, loops: int):
+    t_start = time.monotonic()
+    origin = recv_us[0]
+    for _ in range(loops):
+        base = time.monotonic()
+        for i in range(0, len(frames), SEND_BATCH):
+            if speed > 0:
+                due = (recv_us[i] - origin) / 1e6 / speed
+                ahead = due - (time.monotonic() - base)
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+            for msg in frames[i:i + SEND_BATCH]:
+                await ws.send(msg)
+    elapsed = time.monotonic() - t_start
+    sent = len(frames) * loops
+    print(f"replayed {sent} frames in {elapsed:.2f}s ({sent / elapsed:,.0f} msg/s)", flush=True)
+
+
+async def serve(path: str, host: str, port: int, speed: float, loops: int, once: bool):
+    recv_us, frames = read_capture(path)
+    print(f"loaded {len(frames)} frames, symbols={len(capture_symbols(frames))}", flush=True)
+    done = asyncio.Event()
+
+    async def handler(ws):
+        replay = None
+        async for msg in ws:
+            req = json.loads(msg)
+            await ws.send(json.dumps({"result": None, "id": req.get("id")}))
+            if req.get("method") == "SUBSCRIBE" and replay is None:
+                replay = asyncio.create_task(_replay(ws, recv_us, frames, speed, loops))
+                replay.add_done_callback(lambda _: asyncio.create_task(ws.close()))
+        if replay is not None:
+            await replay
+        if once:
+            done.set()
+
+    async with ws_serve(handler, host, port, max_size=None, compression=None):
+        print(f"READY ws://{host}:{port}/stream", flush=True)
+        if once:
+            await done.wait()
+        else:
+            await asyncio.Future()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("record")
+    r.add_argument("--url", default=BINANCE_WS_URL)
+    r.add_argument("--symbols", default="btcusdt")
+    r.add_argument("--seconds", type=float, default=300)
+    r.add_argument("--out", required=True)
+
+    g = sub.add_parser("synth")
+    g.add_argument("--n", type=int, default=1_000_000)
+    g.add_argument("--symbols", type=int, default=200)
+    g.add_argument("--rate", type=float, default=20_000, help="frames per second of capture time")
+    g.add_argument("--out", required=True)
+
+    s = sub.add_parser("serve")
+    s.add_argument("--file", required=True)
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=9765)
+    s.add_argument("--speed", type=float, default=1.0, help="1–100× recorded pace, 0 = max")
+    s.add_argument("--loops", type=int, default=1)
+    s.add_argument("--once", action="store_true", help="exit after the first client finishes")
+    args = ap.parse_args()
+
+    if args.cmd == "record":
+        asyncio.run(record(args.url, args.symbols.split(","), args.seconds, args.out))
+    elif args.cmd == "synth":
+        synth(args.n, args.symbols, args.rate, args.out)
+    else:
+        asyncio.run(serve(args.file, args.host, args.port, args.speed, args.loops, args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+test_sizing_engine.py
+─────────────────────────────────────────────────────────────────────────────
+sizing_engine.size_batch against an independent reference, and --parity
+against the live risk.size_weights_basic when a database is configured.
+
+The reference is Dykstra's alternating projection onto the three caps,
+each projected the textbook way (clip, sort-based l1 ball, uniform shift),
+so it shares no code with the Newton / regula falsi solver under test.
+
+    python -m pytest -q tests/
+    DATABASE_URL=postgresql://... python -m pytest -q tests/    # + SQL parity
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "workers"))
+
+import sizing_engine as se                          # noqa: E402
+
+DYKSTRA_SWEEPS = 200_000
+DYKSTRA_TOL    = 1e-15
+PARITY_TOL     = 1e-9
+
+
+def make_batch(rng, slates: int, names: int, max_position, gross_cap, net_cap,
+               lengths=None, bias: float = 0.3) -> se.SizingBatch:
+    scores = rng.normal(bias, 1.0, (slates, names))
+    mask = np.ones((slates, names), dtype=bool)
+    if lengths is not None:
+        mask = np.arange(names) < np.asarray(lengths)[:, None]
+        scores = np.where(mask, scores, 0.0)
+    full = lambda v: np.broadcast_to(np.asarray(v, dtype=float), (slates,)).copy()   # noqa: E731
+    return se.SizingBatch(
+        portfolio_ids=[uuid.UUID(int=i + 1) for i in range(slates)],
+        asof_dates=[date(2026, 10, 16)] * slates,
+        symbol_ids=[[uuid.UUID(int=1000 + j) for j in range(names)] for _ in range(slates)],
+        scores=scores, mask=mask,
+        max_position=full(max_position), gross_cap=full(gross_cap), net_cap=full(net_cap),
+    )
+
+
+def project_l1(y: np.ndarray, radius: np.ndarray) -> np.ndarray:
+    """Row-wise projection onto {Σ|w| ≤ radius} (sort and threshold)."""
+    a = np.abs(y)
+    u = -np.sort(-a, axis=1)
+    css = np.cumsum(u, axis=1)
+    j = np.arange(1, y.shape[1] + 1)
+    rho = (u - (css - radius[:, None]) / j > 0).sum(axis=1)
+    theta = (css[np.arange(len(y)), rho - 1] - radius) / rho
+    theta = np.where(a.sum(axis=1) > radius, theta, 0.0)
+    return np.sign(y) * np.maximum(a - theta[:, None], 0.0)
+
+
+def dykstra(v: np.ndarray, batch: se.SizingBatch) -> np.ndarray:
+    """Least-squares projection of v onto box ∩ gross ball ∩ net slab (full rows only)."""
+    m, G, N = batch.max_position[:, None], batch.gross_cap, batch.net_cap
+    n = v.shape[1]
+    projections = (
+        lambda y: np.clip(y, -m, m),
+        lambda y: project_l1(y, G),
+        lambda y: y - ((y.sum(axis=1) - np.clip(y.sum(axis=1), -N, N)) / n)[:, None],
+    )
+    x = v.copy()
+    incr = [np.zeros_like(v) for _ in projections]
+    for _ in range(DYKSTRA_SWEEPS):
+        start = x
+        for k, project in enumerate(projections):
+            y = x + incr[k]
+            x = project(y)
+            incr[k] = y - x
+        if np.abs(x - start).max() <= DYKSTRA_TOL:
+            break
+    return x
+
+
+@pytest.mark.parametrize("bias", [0.3, -0.3, 0.0])
+def test_size_batch_matches_dykstra(bias):
+    rng = np.random.default_rng(49)
+    batch = make_batch(rng, 40, 12, max_position=rng.uniform(0.1, 0.3, 40),
+                       gross_cap=rng.uniform(0.8, 1.5, 40), net_cap=rng.uniform(0.05, 0.4, 40),
+                       bias=bias)
+    w, _ = se.size_batch(batch)
+    ref = dykstra(se.initial_weights(batch), batch)
+    assert np.abs(w - ref).max() < 1e-10
+    assert not se.cap_violations(batch, w).any()
+
+
+def test_slack_caps_keep_scaled_scores():
+    batch = make_batch(np.random.default_rng(1), 10, 8, max_position=1.0, gross_cap=1.0, net_cap=1.0)
+    w, iters = se.size_batch(batch)
+    assert iters == 0
+    np.testing.assert_allclose(w, se.initial_weights(batch), atol=1e-15)
+
+
+def test_padding_is_ignored():
+    rng = np.random.default_rng(7)
+    lengths = [12, 5, 9, 1]
+    padded = make_batch(rng, 4, 12, 0.25, 1.0, 0.1, lengths=lengths)
+    w, _ = se.size_batch(padded)
+    assert not w[~padded.mask].any()
+    for b, n in enumerate(lengths):
+        row = make_batch(rng, 1, n, 0.25, 1.0, 0.1)
+        row.scores[0] = padded.scores[b, :n]
+        np.testing.assert_allclose(se.size_batch(row)[0][0], w[b, :n], atol=1e-12)
+
+
+def test_parity_refuses_what_if_caps():
+    argv = ["--start", "2026-10-01", "--end", "2026-10-16", "--parity", "5"]
+    assert se.main(argv + ["--max-position", "0.03"]) == 2
+    assert se.main(argv + ["--net-cap", "0"]) == 2
+
+
+@pytest.mark.skipif(not (os.getenv("DB_SESSION_URL") or os.getenv("DATABASE_URL")),
+                    reason="no DATABASE_URL — SQL parity skipped")
+def test_parity_with_size_weights_basic():
+    asyncpg = pytest.importorskip("asyncpg")
+
+    async def check():
+        conn = await asyncpg.connect(os.getenv("DB_SESSION_URL") or os.environ["DATABASE_URL"])
+        try:
+            if not await conn.fetchval("SELECT to_regproc('risk.size_weights_basic') IS NOT NULL"):
+                pytest.skip("risk.size_weights_basic not defined in this database")
+            end = await conn.fetchval(
+                "SELECT max(asof_date) FROM portfolio.target_weights WHERE model_version = $1",
+                se.MODEL_VERSION,
+            )
+            if end is None:
+                pytest.skip(f"no {se.MODEL_VERSION} target_weights to compare")
+            batch = await se.load_batch(conn, se.MODEL_VERSION, end - timedelta(days=30), end)
+            w, _ = se.size_batch(batch)
+            return await se.parity(conn, batch, w, se.MODEL_VERSION, 50)
+        finally:
+            await conn.close()
+
+    result = asyncio.run(check())
+    assert result["mismatched"] == 0, result
+    assert result["max_abs_diff"] <= PARITY_TOL
@@ -0,0 +1,109 @@
+"""
+bar_aggregator.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Streaming OHLCV / VWAP Bar Builder
+
+Builds time bars for every (symbol slot, timeframe) pair straight off the
+trade stream. Live bar state is slot-based: index = symbol_slot * n_tf + tf,
+with one flat array per field (~90 bytes per pair — 500 symbols × 3
+timeframes ≈ 135 KB).
+
+  on_trade()   O(1) per timeframe: extends the open bar, or closes it and
+               opens the next one when the trade lands in a new bucket
+  sweep(now)   closes bars whose interval has ended without a closing trade
+  drain()      hands closed bars to the writer
+
+Trades older than the open bar (or an already-closed bucket) are counted
+in `late` and ignored, so a bar key is never emitted twice.
+"""
+
+from array import array
+from collections import deque
+from typing import NamedTuple
+
+TIMEFRAMES_S = (1, 60, 300)
+SWEEP_GRACE_MS = 2000        # wait this long past bar end for stragglers
+
+
+class Bar(NamedTuple):
+    slot:        int
+    timeframe_s: int
+    bucket_ms:   int
+    open:        float
+    high:        float
+    low:         float
+    close:       float
+    volume:      float
+    vwap:        float
+    trade_count: int
+
+
+class BarAggregator:
+    def __init__(self, n_symbols: int, timeframes: tuple[int, ...] = TIMEFRAMES_S,
+                 max_pending: int = 200_000):
+        n = n_symbols * len(timeframes)
+        self.timeframes  = timeframes
+        self.n_tf        = len(timeframes)
+        self.tf_ms       = [tf * 1000 for tf in timeframes]
+        self.bucket      = array("q", [-1]) * n     # open bar start, -1 = none
+        self.last_closed = array("q", [-1]) * n
+        self.open        = array("d", bytes(8 * n))
+        self.high        = array("d", bytes(8 * n))
+        self.low         = array("d", bytes(8 * n))
+        self.close       = array("d", bytes(8 * n))
+        self.volume      = array("d", bytes(8 * n))
+        self.pv          = array("d", bytes(8 * n))
+        self.count       = array("q", bytes(8 * n))
+        self.closed: deque[Bar] = deque(maxlen=max_pending)
+        self.late    = 0
+        self.dropped = 0
+
+    def on_trade(self, slot: int, ts_ms: int, price: float, size: float):
+        bucket, high, low, close = self.bucket, self.high, self.low, self.close
+        volume, pv, count = self.volume, self.pv, self.count
+        i = slot * self.n_tf
+        for tf in self.tf_ms:
+            b = ts_ms - ts_ms % tf
+            cur = bucket[i]
+            if b == cur:
+                if price > high[i]:
+                    high[i] = price
+                elif price < low[i]:
+                    low[i] = price
+                close[i] = price
+                volume[i] += size
+                pv[i] += price * size
+                count[i] += 1
+            elif b < cur or b <= self.last_closed[i]:
+                self.late += 1
+            else:
+                if cur >= 0:
+                    self._close(i)
+                bucket[i] = b
+                self.open[i] = high[i] = low[i] = close[i] = price
+                volume[i] = size
+                pv[i] = price * size
+                count[i] = 1
+            i += 1
+
+    def sweep(self, now_ms: int):
+        for i, cur in enumerate(self.bucket):
+            if cur >= 0 and cur + self.tf_ms[i % self.n_tf] + SWEEP_GRACE_MS <= now_ms:
+                self._close(i)
+
+    def drain(self) -> list[Bar]:
+        bars = list(self.closed)
+        self.closed.clear()
+        return bars
+
+    def _close(self, i: int):
+        vol = self.volume[i]
+        if len(self.closed) == self.closed.maxlen:
+            self.dropped += 1
+        self.closed.append(Bar(
+            i // self.n_tf, self.timeframes[i % self.n_tf], self.bucket[i],
+            self.open[i], self.high[i], self.low[i], self.close[i], vol,
+            self.pv[i] / vol if vol else self.close[i], self.count[i],
+        ))
+        self.last_closed[i] = self.bucket[i]
+        self.bucket[i] = -1
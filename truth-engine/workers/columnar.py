@@ -0,0 +1,197 @@
+"""
+columnar.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Columnar Record Batches
+
+The analytics workers move result sets as RecordBatches — equal-length
+named NumPy columns plus a null mask per column — from fetch through the
+model to the write, instead of one dataclass per Record:
+
+    batch = RecordBatch(await db.fetch_columns(conn, sql, ...))
+    live  = batch.filter(batch["weeks_used"] >= MIN_PANEL_WEEKS)
+    out   = live.with_columns(surprise_pct=growth - live["consensus_growth_pct"])
+    await conn.executemany(INSERT_SQL, out.to_records(INSERT_COLUMNS))
+    for row in out:                      # Row view: row.symbol, row.surprise_pct
+        log.info("%s → %.2f", row.symbol, row.surprise_pct)
+
+Column types, from the Python values:
+
+  float (or float + int)   float64; NULL → NaN
+  int                      int64;   NULL → 0
+  bool                     bool;    NULL → False
+  anything else            object   (str, date, UUID, ...; NULL stays None)
+
+The mask is the source of truth for NULL; a float64 column passed in as
+an array gets its mask from NaN. Slicing and filtering share column
+storage where NumPy does (slices are views), and row()/to_records() hand
+back plain Python values with None for NULL, ready for asyncpg.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator, Optional
+
+from lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+def _column(values) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """A list (None = NULL) or an array → (column, null mask or None)."""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == "f":
+            mask = np.isnan(values)
+            return values, (mask if mask.any() else None)
+        return values, None
+
+    values = list(values)
+    null = [v is None for v in values]
+    mask = np.array(null, dtype=bool) if any(null) else None
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds or (float in kinds and kinds <= {float, int}):
+        col = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    elif kinds == {int}:
+        col = np.array([0 if v is None else v for v in values], dtype=np.int64)
+    elif kinds == {bool}:
+        col = np.array([False if v is None else v for v in values], dtype=bool)
+    else:
+        col = np.empty(len(values), dtype=object)
+        col[:] = values
+    return col, mask
+
+
+def _py(v):
+    return v.item() if isinstance(v, np.generic) else v
+
+
+class RecordBatch:
+    __slots__ = ("columns", "nulls", "length")
+
+    def __init__(self, columns: dict[str, Any],
+                 nulls: Optional[dict[str, np.ndarray]] = None):
+        self.columns: dict[str, np.ndarray] = {}
+        self.nulls: dict[str, np.ndarray] = {}
+        length = None
+        for name, values in columns.items():
+            col, mask = _column(values)
+            if nulls and name in nulls:
+                mask = nulls[name] if nulls[name].any() else None
+            if length is None:
+                length = len(col)
+            elif len(col) != length:
+                raise ValueError(f"column {name!r} has {len(col)} rows, expected {length}")
+            self.columns[name] = col
+            if mask is not None:
+                self.nulls[name] = mask
+        self.length = length or 0
+
+    # ── Shape / access ───────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.columns)
+
+    def __getitem__(self, key):
+        """batch["col"] → column array; batch[slice | bool mask | indices] → RecordBatch."""
+        if isinstance(key, str):
+            return self.columns[key]
+        return self.take(key)
+
+    def is_null(self, name: str) -> np.ndarray:
+        mask = self.nulls.get(name)
+        return mask if mask is not None else np.zeros(self.length, dtype=bool)
+
+    def valid(self, name: str) -> np.ndarray:
+        return ~self.is_null(name)
+
+    def value(self, name: str, i: int):
+        """One cell as a Python value; None for NULL."""
+        mask = self.nulls.get(name)
+        if mask is not None and mask[i]:
+            return None
+        return _py(self.columns[name][i])
+
+    # ── Derived batches ──────────────────────────────────────────────────
+
+    def take(self, index) -> RecordBatch:
+        """Rows by slice, bool mask or integer indices."""
+        if isinstance(index, (int, np.integer)):
+            index = slice(index, index + 1 or None)
+        return RecordBatch(
+            {name: col[index] for name, col in self.columns.items()},
+            {name: mask[index] for name, mask in self.nulls.items()},
+        )
+
+    def filter(self, mask) -> RecordBatch:
+        mask = np.asarray(mask, dtype=bool)
+        if len(mask) != self.length:
+            raise ValueError(f"filter mask has {len(mask)} rows, batch has {self.length}")
+        return self.take(mask)
+
+    def with_columns(self, *batches: RecordBatch, **columns) -> RecordBatch:
+        """
+        A new batch sharing these columns, plus / replacing the columns of
+        row-aligned batches (masks and all) and the given ones.
+        """
+        cols = dict(self.columns)
+        nulls = dict(self.nulls)
+        for batch in (*batches, RecordBatch(columns)):
+            if batch.columns and batch.length != self.length:
+                raise ValueError(f"new columns have {batch.length} rows, batch has {self.length}")
+            for name, col in batch.columns.items():
+                cols[name] = col
+                nulls.pop(name, None)
+            nulls.update(batch.nulls)
+        return RecordBatch(cols, nulls)
+
+    # ── Rows ─────────────────────────────────────────────────────────────
+
+    def row(self, i: int) -> Row:
+        return Row(self, i)
+
+    def __iter__(self) -> Iterator[Row]:
+        return (Row(self, i) for i in range(self.length))
+
+    def to_records(self, names: Iterable[str]) -> list[tuple]:
+        """Tuples of Python values in `names` order (None for NULL) — executemany args."""
+        cols = []
+        for name in names:
+            values = self.columns[name].tolist()
+            mask = self.nulls.get(name)
+            if mask is not None:
+                for i in np.flatnonzero(mask):
+                    values[i] = None
+            cols.append(values)
+        return list(zip(*cols))
+
+    def __repr__(self) -> str:
+        return f"RecordBatch({self.length} rows: {', '.join(self.columns)})"
+
+
+class Row:
+    """Read-only view of one batch row; attribute access, None for NULL."""
+
+    __slots__ = ("_batch", "_i")
+
+    def __init__(self, batch: RecordBatch, i: int):
+        self._batch = batch
+        self._i = i
+
+    def __getattr__(self, name: str):
+        try:
+            return self._batch.value(name, self._i)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def as_dict(self) -> dict:
+        return {name: self._batch.value(name, self._i) for name in self._batch.columns}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items())
+        return f"Row({fields})"
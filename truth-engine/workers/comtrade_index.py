@@ -0,0 +1,222 @@
+"""
+comtrade_index.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Comtrade Period-Completeness Index
+
+Tracks when each Comtrade tuple was last fetched and what it contained, so
+the weekly cycle only asks the API for data that can still change.
+Backed by macro.comtrade_fetch_index_v1 (DB-side, survives redeploys;
+DDL in INDEX_DDL), one row per make_record_id tuple and flow.
+
+A (reporter, commodity, period) tuple is settled — skipped by the planner —
+once both flows are indexed and either:
+  - the period is older than REVISION_WINDOW_MONTHS, or
+  - both flows have data and it has not changed for STABLE_AFTER_DAYS.
+    A flow still empty (EMPTY_HASH) keeps the tuple live for the whole
+    revision window — late reporters publish months after the period.
+Unsettled tuples are refetched at most every REFETCH_AFTER_DAYS, so a
+restart does not repeat a fetch that just ran.
+
+Index rows are only written by commit(), after the trade_flows rows of the
+same request have been flushed: a request whose flow rows were dropped (or
+a cycle that dies before its flush) leaves the index untouched, so those
+tuples are fetched again rather than marked fresh.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from metrics import ROWS
+from supabase_sink import SupabaseSink
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+log = logging.getLogger("comtrade_index")
+
+INDEX_SCHEMA = "macro"
+INDEX_TABLE  = "comtrade_fetch_index_v1"
+
+REVISION_WINDOW_MONTHS = 6     # UN revisions land within ~6 months of release
+STABLE_AFTER_DAYS      = 90    # unchanged this long → settled early
+REFETCH_AFTER_DAYS     = 6     # min spacing between refetches of a live tuple
+FLOWS                  = ("X", "M")
+PARTNER_WORLD          = "0"
+EMPTY_HASH             = "EMPTY"
+PAGE_SIZE              = 1000
+
+INDEX_DDL = f"""
+CREATE TABLE IF NOT EXISTS {INDEX_SCHEMA}.{INDEX_TABLE} (
+    record_id        text        PRIMARY KEY,          -- make_record_id(...)
+    reporter_country text        NOT NULL,
+    partner_country  text        NOT NULL,
+    commodity_code   text        NOT NULL,
+    period           text        NOT NULL,             -- YYYYMM
+    trade_flow       text        NOT NULL CHECK (trade_flow IN ('X', 'M')),
+    content_hash     text        NOT NULL,             -- sha256 of the row, EMPTY_HASH if absent
+    first_fetched_at timestamptz NOT NULL,
+    last_fetched_at  timestamptz NOT NULL,
+    last_changed_at  timestamptz NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_period_idx ON {INDEX_SCHEMA}.{INDEX_TABLE} (period);
+"""
+
+
+def content_hash(row: Optional[dict]) -> str:
+    if not row:
+        return EMPTY_HASH
+    return hashlib.sha256(
+        json.dumps(row, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def period_age_months(period: str, now: datetime) -> int:
+    return (now.year * 12 + now.month) - (int(period[:4]) * 12 + int(period[4:6]))
+
+
+def _norm_code(code) -> str:
+    """Comtrade returns numeric codes as ints ("036" → 36); match upsert_flow."""
+    return str(int(code)) if str(code).isdigit() else str(code)
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class CompletenessIndex:
+    def __init__(self, make_record_id: Callable[[str, str, str, str, str], str]):
+        self.make_record_id = make_record_id
+        self._entries: dict[str, dict] = {}
+        self._pending: list[tuple[list[dict], set[str]]] = []    # (index rows, flow record_ids)
+        self.stats = {"settled": 0, "fresh": 0, "due": 0, "changed": 0, "unchanged": 0,
+                      "withheld": 0}
+
+    def _rid(self, reporter: str, commodity: str, period: str, flow: str) -> str:
+        return self.make_record_id(_norm_code(reporter), PARTNER_WORLD, commodity, period, flow)
+
+    # ── Load ─────────────────────────────────────────────────────────────
+
+    def load(self, supabase: Client, periods: list[str]):
+        offset = 0
+        while True:
+            try:
+                result = supabase.schema(INDEX_SCHEMA).table(INDEX_TABLE).select(
+                    "record_id, content_hash, last_fetched_at, last_changed_at, first_fetched_at"
+                ).in_("period", periods).range(offset, offset + PAGE_SIZE - 1).execute()
+            except Exception as e:
+                if str(getattr(e, "code", "")) in ("42P01", "PGRST205"):     # undefined table
+                    raise RuntimeError(f"{INDEX_SCHEMA}.{INDEX_TABLE} missing "
+                                       "(DDL in comtrade_index.INDEX_DDL)") from e
+                raise
+            rows = result.data or []
+            ROWS.labels(f"{INDEX_SCHEMA}.{INDEX_TABLE}", "read").inc(len(rows))
+            for row in rows:
+                self._entries[row["record_id"]] = row
+            if len(rows) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        log.info(f"Completeness index: {len(self._entries)} entries for {len(periods)} periods")
+
+    # ── Planning ─────────────────────────────────────────────────────────
+
+    def needs_fetch(self, reporter: str, commodity: str, period: str,
+                    now: datetime) -> bool:
+        entries = [self._entries.get(self._rid(reporter, commodity, period, f)) for f in FLOWS]
+        if any(e is None for e in entries):
+            self.stats["due"] += 1
+            return True
+
+        last_fetched = min(_parse_ts(e["last_fetched_at"]) for e in entries)
+        last_changed = max(_parse_ts(e["last_changed_at"]) for e in entries)
+        stable = (all(e["content_hash"] != EMPTY_HASH for e in entries)
+                  and now - last_changed > timedelta(days=STABLE_AFTER_DAYS))
+        if period_age_months(period, now) > REVISION_WINDOW_MONTHS or stable:
+            self.stats["settled"] += 1
+            return False
+        if now - last_fetched < timedelta(days=REFETCH_AFTER_DAYS):
+            self.stats["fresh"] += 1
+            return False
+        self.stats["due"] += 1
+        return True
+
+    def filter(self, tuples: Iterable[tuple[str, str, str]],
+               now: Optional[datetime] = None) -> list[tuple[str, str, str]]:
+        now = now or datetime.now(timezone.utc)
+        return [t for t in tuples if self.needs_fetch(*t, now=now)]
+
+    # ── Recording ────────────────────────────────────────────────────────
+
+    def record(self, tuples: Iterable[tuple[str, str, str]], rows: list[dict],
+               now: Optional[datetime] = None) -> list[dict]:
+        """
+        Record a completed request. Returns the subset of rows whose content
+        changed since the last fetch — only those need writing downstream.
+        Its index rows are held until commit().
+        """
+        now = now or datetime.now(timezone.utc)
+        now_iso = now.isoformat()
+        by_key = {
+            (_norm_code(r.get("reporterCode", "")), str(r.get("cmdCode", "")),
+             str(r.get("period", "")), r.get("flowCode", "")): r
+            for r in rows
+            if str(r.get("partnerCode", PARTNER_WORLD)) == PARTNER_WORLD
+        }
+
+        changed_rows, index_rows, flow_ids = [], [], set()
+        for reporter, commodity, period in tuples:
+            for flow in FLOWS:
+                row = by_key.get((_norm_code(reporter), commodity, period, flow))
+                rid = self._rid(reporter, commodity, period, flow)
+                digest = content_hash(row)
+                prev = self._entries.get(rid)
+                changed = prev is None or prev["content_hash"] != digest
+                if changed:
+                    self.stats["changed"] += 1
+                    if row:
+                        changed_rows.append(row)
+                        flow_ids.add(rid)
+                else:
+                    self.stats["unchanged"] += 1
+                entry = {
+                    "record_id":        rid,
+                    "reporter_country": _norm_code(reporter),
+                    "partner_country":  PARTNER_WORLD,
+                    "commodity_code":   commodity,
+                    "period":           period,
+                    "trade_flow":       flow,
+                    "content_hash":     digest,
+                    "first_fetched_at": prev["first_fetched_at"] if prev else now_iso,
+                    "last_fetched_at":  now_iso,
+                    "last_changed_at":  now_iso if changed else prev["last_changed_at"],
+                }
+                self._entries[rid] = entry
+                index_rows.append(entry)
+
+        self._pending.append((index_rows, flow_ids))
+        return changed_rows
+
+    def commit(self, sink: SupabaseSink, failed_flows: list[dict]):
+        """
+        Queue the held index rows once the flow rows are flushed, skipping
+        every request that had a row among failed_flows (macro.trade_flows_v1
+        rows the sink dropped).
+        """
+        failed = {
+            self._rid(r["reporter_country"], r["commodity_code"], r["period"],
+                      "X" if r["trade_flow"] == "EXPORT" else "M")
+            for r in failed_flows
+        }
+        for index_rows, flow_ids in self._pending:
+            if flow_ids & failed:
+                self.stats["withheld"] += len(index_rows)
+                continue
+            sink.upsert(INDEX_SCHEMA, INDEX_TABLE, index_rows, on_conflict="record_id")
+        if self.stats["withheld"]:
+            log.warning(f"Completeness index: {self.stats['withheld']} rows withheld — "
+                        f"their trade_flows rows were not written")
+        self._pending = []
@@ -0,0 +1,259 @@
+"""
+comtrade_planner.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Comtrade Request Planner
+
+Packs (reporter, commodity, period) tuples into multi-value Comtrade
+requests and runs them under an adaptive rate limiter.
+
+The public preview endpoint accepts comma lists for reporterCode, cmdCode
+and period and returns the cartesian product, capped at MAX_RECORDS rows.
+The planner builds products sized so the expected row count stays under
+the cap:
+
+  1. Group needed tuples by period. If a period's dense cover (every
+     needed reporter × every needed commodity) fits one call, use it;
+     otherwise group commodities that need the same reporter set into
+     exact (reporters × commodities) blocks.
+  2. Split blocks so reporters × commodities × ROWS_PER_TUPLE ≤ MAX_RECORDS.
+  3. Merge identical blocks across periods while they still fit.
+
+Execution guarantees coverage: a 429 is retried after the limiter backs
+off (never dropped), a response that hits MAX_RECORDS is treated as
+truncated and split, and the report lists any tuple that could not be
+fetched after MAX_ATTEMPTS.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+from metrics import EXTERNAL_SECONDS
+
+log = logging.getLogger("comtrade_planner")
+
+MAX_RECORDS     = 500    # preview endpoint row cap per call
+MAX_PERIODS     = 12     # API limit on period list length
+ROWS_PER_TUPLE  = 2      # flowCode X,M with partner 0 → one row per flow
+MAX_ATTEMPTS    = 6      # non-429 failures per request before giving up
+
+# (reporter, commodity, period)
+Tuple3 = tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class ComtradeRequest:
+    reporters:   tuple[str, ...]
+    commodities: tuple[str, ...]
+    periods:     tuple[str, ...]
+
+    def tuples(self) -> set[Tuple3]:
+        return {(r, c, p) for r in self.reporters
+                for c in self.commodities for p in self.periods}
+
+    def expected_rows(self) -> int:
+        return (len(self.reporters) * len(self.commodities)
+                * len(self.periods) * ROWS_PER_TUPLE)
+
+    def split(self) -> tuple["ComtradeRequest", "ComtradeRequest"]:
+        """Halve along the longest dimension."""
+        dims = {"reporters": self.reporters, "commodities": self.commodities,
+                "periods": self.periods}
+        name = max(dims, key=lambda k: len(dims[k]))
+        values = dims[name]
+        if len(values) < 2:
+            raise ValueError("cannot split a single-tuple request")
+        mid = len(values) // 2
+        lo = ComtradeRequest(**{**dims, name: values[:mid]})
+        hi = ComtradeRequest(**{**dims, name: values[mid:]})
+        return lo, hi
+
+    def params(self) -> dict:
+        return {
+            "reporterCode": ",".join(self.reporters),
+            "cmdCode": ",".join(self.commodities),
+            "flowCode": "X,M",     # exports and imports
+            "period": ",".join(self.periods),
+            "partnerCode": "0",    # 0 = World (aggregate)
+            "partner2Code": "0",
+            "maxRecords": str(MAX_RECORDS),
+            "format": "JSON",
+            "breakdownMode": "classic",
+            "includeDesc": "false",
+        }
+
+
+# ── Planning ─────────────────────────────────────────────────────────────
+
+def plan_requests(tuples: Iterable[Tuple3],
+                  max_records: int = MAX_RECORDS) -> list[ComtradeRequest]:
+    """Pack tuples into as few requests as fit the per-call row cap."""
+    cap = max(max_records // ROWS_PER_TUPLE, 1)   # tuples per request
+
+    # 1. period → commodity → reporters
+    by_period: dict[str, dict[str, set[str]]] = defaultdict(lambda: defaultdict(set))
+    for reporter, commodity, period in tuples:
+        by_period[period][commodity].add(reporter)
+
+    # 2. per period: commodities sharing a reporter set form one block,
+    #    chunked to fit the per-request cap
+    blocks: dict[tuple[tuple[str, ...], tuple[str, ...]], list[str]] = defaultdict(list)
+    for period, cmd_map in by_period.items():
+        by_reporters: dict[tuple[str, ...], list[str]] = defaultdict(list)
+        all_reporters = set().union(*cmd_map.values())
+        if len(all_reporters) * len(cmd_map) <= cap:
+            # sparse period whose dense cover still fits one call
+            by_reporters[tuple(sorted(all_reporters))] = list(cmd_map)
+        else:
+            for commodity, reporters in cmd_map.items():
+                by_reporters[tuple(sorted(reporters))].append(commodity)
+        for reporters, commodities in by_reporters.items():
+            commodities = sorted(commodities)
+            rep_chunk = min(len(reporters), cap)
+            cmd_chunk = max(min(len(commodities), cap // rep_chunk), 1)
+            for ri in range(0, len(reporters), rep_chunk):
+                for ci in range(0, len(commodities), cmd_chunk):
+                    key = (reporters[ri:ri + rep_chunk], tuple(commodities[ci:ci + cmd_chunk]))
+                    blocks[key].append(period)
+
+    # 3. merge identical blocks across periods while they fit
+    plan = []
+    for (reporters, commodities), periods in blocks.items():
+        per_req = max(min(cap // (len(reporters) * len(commodities)), MAX_PERIODS), 1)
+        periods = sorted(periods)
+        for pi in range(0, len(periods), per_req):
+            plan.append(ComtradeRequest(reporters, commodities,
+                                        tuple(periods[pi:pi + per_req])))
+    return plan
+
+
+# ── Rate limiting ────────────────────────────────────────────────────────
+
+class AdaptiveRateLimiter:
+    """
+    AIMD spacing between calls: every 429 doubles the interval (or honours
+    Retry-After), every success shrinks it back toward min_interval.
+    """
+
+    def __init__(self, min_interval: float = 1.0, max_interval: float = 120.0,
+                 decay: float = 0.85):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.decay        = decay
+        self.interval     = min_interval
+        self._next_at     = 0.0
+
+    def wait(self):
+        delay = self._next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_at = time.monotonic() + self.interval
+
+    def on_success(self):
+        self.interval = max(self.min_interval, self.interval * self.decay)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        self.interval = min(self.max_interval, self.interval * 2)
+        backoff = max(retry_after or 0.0, self.interval)
+        self._next_at = time.monotonic() + backoff
+        log.warning(f"Comtrade backing off {backoff:.1f}s")
+
+
+# ── Execution ────────────────────────────────────────────────────────────
+
+@dataclass
+class FetchReport:
+    planned_requests: int = 0
+    http_calls:       int = 0
+    throttled:        int = 0
+    retries:          int = 0
+    splits:           int = 0
+    rows:             int = 0
+    fetched:          set = field(default_factory=set)
+    failed:           set = field(default_factory=set)
+
+    def summary(self) -> dict:
+        return {
+            "planned_requests": self.planned_requests,
+            "http_calls": self.http_calls,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "splits": self.splits,
+            "rows": self.rows,
+            "tuples_fetched": len(self.fetched),
+            "tuples_failed": len(self.failed),
+        }
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    try:
+        return float(resp.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def execute_plan(
+    plan: list[ComtradeRequest],
+    session: requests.Session,
+    base_url: str,
+    limiter: AdaptiveRateLimiter,
+    report: FetchReport,
+    max_records: int = MAX_RECORDS,
+) -> Iterator[tuple[ComtradeRequest, list[dict]]]:
+    """
+    Yield (request, rows) for every completed request. Throttled requests
+    are requeued, truncated responses are split, and tuples of requests
+    that exhaust MAX_ATTEMPTS land in report.failed.
+    """
+    report.planned_requests += len(plan)
+    queue: deque[tuple[ComtradeRequest, int]] = deque((req, 0) for req in plan)
+
+    while queue:
+        req, attempts = queue.popleft()
+        limiter.wait()
+        report.http_calls += 1
+        t0, status = time.perf_counter(), "error"
+        try:
+            resp = session.get(base_url, params=req.params(), timeout=60)
+            status = str(resp.status_code)
+            EXTERNAL_SECONDS.labels("comtrade", status).observe(time.perf_counter() - t0)
+            if resp.status_code == 429:
+                report.throttled += 1
+                limiter.on_throttle(_retry_after(resp))
+                queue.appendleft((req, attempts))   # throttling never costs an attempt
+                continue
+            resp.raise_for_status()
+            rows = resp.json().get("data", []) or []
+        except Exception as e:
+            if status == "error":
+                EXTERNAL_SECONDS.labels("comtrade", status).observe(time.perf_counter() - t0)
+            attempts += 1
+            if attempts >= MAX_ATTEMPTS:
+                log.error(f"Comtrade request gave up after {attempts} attempts "
+                          f"{req.params()['reporterCode']}/{req.params()['cmdCode']}/"
+                          f"{req.params()['period']}: {e}")
+                report.failed |= req.tuples()
+                continue
+            report.retries += 1
+            limiter.on_throttle()
+            queue.append((req, attempts))
+            continue
+
+        limiter.on_success()
+        if len(rows) >= max_records and len(req.tuples()) > 1:
+            report.splits += 1
+            lo, hi = req.split()
+            queue.appendleft((hi, 0))
+            queue.appendleft((lo, 0))
+            continue
+
+        report.rows += len(rows)
+        report.fetched |= req.tuples()
+        yield req, rows
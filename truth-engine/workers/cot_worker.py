@@ -3,18 +3,26 @@ Noterminal — UN Comtrade Trade Flow Worker v1.0.0
 Source: comtradeplus.un.org free API tier
 Target: macro.trade_flows_v1
 Schedule: Weekly (monthly data, ~2-month lag from UN)
-Canon: restart-loop managed by start.sh
+Canon: hosted by supervisor.py; weekly slot + last success in ingest_run_log_v1 via scheduler.py
 """
 
-import os
-import time
+from __future__ import annotations
+
+import uuid
 import logging
 import hashlib
-import requests
 from datetime import datetime, timezone, timedelta
+from typing import TYPE_CHECKING
+
 from dateutil.relativedelta import relativedelta
 
-from supabase import create_client, Client
+from comtrade_index import CompletenessIndex
+from lazy import lazy_import, supabase_client
+from metrics import serve as serve_metrics
+from scheduler import CronSchedule, ScheduledJob, last_success_supabase, run_blocking
+from comtrade_planner import AdaptiveRateLimiter, FetchReport, execute_plan, plan_requests
+from supabase_sink import SupabaseSink
+from trade_shock_detector import BASELINE_MONTHS, load_flow_cube, scan, shock_cells
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,12 +30,17 @@ logging.basicConfig(
 )
 log = logging.getLogger("comtrade_worker")
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
+requests = lazy_import("requests")
+if TYPE_CHECKING:
+    from supabase import Client
+
 # No API key required — using UN Comtrade public/v1 endpoint (free, no auth)
 
 WORKER_VERSION = "1.0.0"
-POLL_INTERVAL_SECONDS = 7 * 24 * 3600  # Weekly
+SOURCE_NAME = "comtrade_worker_v1"     # ingest_run_log_v1.source_name
+SCHEDULE = CronSchedule("0 4 * * 1", "UTC")   # weekly, Monday 04:00 UTC
+FRESH_FOR = timedelta(days=3)
+LOOKBACK_MONTHS = 14                   # settled periods are skipped via the completeness index
 
 # ── Commodity codes to track (HS 2-digit chapters) ──────────────────────
 # These map directly to Noterminal's causal graph edges
@@ -68,6 +81,7 @@ REPORTER_COUNTRIES = [
 ]
 
 BASE_URL = "https://comtradeapi.un.org/public/v1/preview/C/M/HS"
+RATE_LIMIT_MIN_INTERVAL = 1.0   # seconds between calls on the free tier
 
 
 def make_record_id(reporter: str, partner: str, commodity: str, period: str, flow: str) -> str:
@@ -75,42 +89,8 @@ def make_record_id(reporter: str, partner: str, commodity: str, period: str, flo
     return hashlib.sha256(raw.encode()).hexdigest()[:24]
 
 
-def fetch_trade_flows(
-    reporter: str,
-    commodity: str,
-    period: str,
-    session: requests.Session
-) -> list[dict]:
-    """Fetch bilateral trade flows for one reporter/commodity/period."""
-    params = {
-        "reporterCode": reporter,
-        "cmdCode": commodity,
-        "flowCode": "X,M",     # exports and imports
-        "period": period,
-        "partnerCode": "0",    # 0 = World (aggregate)
-        "partner2Code": "0",
-        "maxRecords": "500",
-        "format": "JSON",
-        "breakdownMode": "classic",
-        "includeDesc": "false",
-    }
-
-    try:
-        resp = session.get(BASE_URL, params=params, timeout=30)
-        if resp.status_code == 429:
-            log.warning("Comtrade rate limit — sleeping 60s")
-            time.sleep(60)
-            return []
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("data", []) or []
-    except Exception as e:
-        log.warning(f"Comtrade fetch error {reporter}/{commodity}/{period}: {e}")
-        return []
-
-
-def upsert_flow(row: dict, commodity_meta: dict, supabase: Client):
-    """Map Comtrade response row → macro.trade_flows_v1 upsert."""
+def upsert_flow(row: dict, commodity_meta: dict, sink: SupabaseSink):
+    """Map Comtrade response row → macro.trade_flows_v1 upsert (buffered)."""
     reporter = str(row.get("reporterCode", ""))
     partner = str(row.get("partnerCode", "0"))
     commodity = str(row.get("cmdCode", ""))
@@ -120,81 +100,92 @@ def upsert_flow(row: dict, commodity_meta: dict, supabase: Client):
 
     record_id = make_record_id(reporter, partner, commodity, period, flow)
 
-    try:
-        supabase.table("trade_flows_v1").upsert({
-            "record_id": record_id,
-            "source": "UN_COMTRADE",
-            "reporter_country": reporter,
-            "partner_country": partner,
-            "commodity_code": commodity,
-            "trade_flow": "EXPORT" if flow == "X" else "IMPORT",
-            "value_usd": float(value_usd),
-            "period": period,
-            "metadata": {
-                "label": commodity_meta["label"],
-                "instruments": commodity_meta["instruments"],
-                "reporter_desc": row.get("reporterDesc", ""),
-                "partner_desc": row.get("partnerDesc", ""),
-                "unit": row.get("qtyUnitCode", ""),
-                "qty": row.get("qty"),
-                "worker_version": WORKER_VERSION,
-            }
-        }, on_conflict="record_id", schema="macro").execute()
-    except Exception as e:
-        log.warning(f"trade_flows upsert failed {record_id}: {e}")
-
-
-def emit_trade_shock_signal(
-    commodity_meta: dict,
-    reporter: str,
-    period: str,
-    value_usd: float,
-    baseline_usd: float,
-    flow_type: str,
-    supabase: Client,
-):
-    """Emit TRADE_FLOW_SHOCK to macro.supply_chain_signal_v1 when deviation > 2σ."""
-    if baseline_usd <= 0:
-        return
-    pct_change = (value_usd - baseline_usd) / baseline_usd
-    if abs(pct_change) < 0.25:  # <25% change = not a shock
-        return
-
-    direction = 1 if pct_change > 0 else -1
-    strength = min(abs(pct_change) / 2.0, 1.0)  # normalize to 0..1
-
-    for instrument in commodity_meta["instruments"]:
-        try:
-            supabase.table("supply_chain_signal_v1").insert({
+    sink.upsert("macro", "trade_flows_v1", {
+        "record_id": record_id,
+        "source": "UN_COMTRADE",
+        "reporter_country": reporter,
+        "partner_country": partner,
+        "commodity_code": commodity,
+        "trade_flow": "EXPORT" if flow == "X" else "IMPORT",
+        "value_usd": float(value_usd),
+        "period": period,
+        "metadata": {
+            "label": commodity_meta["label"],
+            "instruments": commodity_meta["instruments"],
+            "reporter_desc": row.get("reporterDesc", ""),
+            "partner_desc": row.get("partnerDesc", ""),
+            "unit": row.get("qtyUnitCode", ""),
+            "qty": row.get("qty"),
+            "worker_version": WORKER_VERSION,
+        }
+    }, on_conflict="record_id")
+
+
+def emit_trade_shock_signals(shocks: list[dict], commodity_by_code: dict,
+                             sink: SupabaseSink) -> int:
+    """Bulk-emit TRADE_FLOW_SHOCK rows to macro.supply_chain_signal_v1, one per instrument."""
+    bucket_ts = datetime.now(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ).isoformat()
+
+    rows = []
+    for shock in shocks:
+        commodity_meta = commodity_by_code.get(shock["commodity"])
+        if not commodity_meta:
+            continue
+        pct_change = shock["pct_change"]
+        direction = 1 if pct_change > 0 else -1
+        strength = min(abs(pct_change) / 2.0, 1.0)  # normalize to 0..1
+        for instrument in commodity_meta["instruments"]:
+            rows.append({
                 "signal_type": "TRADE_FLOW_SHOCK",
                 "instrument_symbol": instrument,
                 "direction": direction,
                 "strength": float(strength),
-                "z_score": float(pct_change / 0.15) if baseline_usd > 0 else None,
+                "z_score": shock["z_score"],
                 "commodity": commodity_meta["label"],
-                "route": f"COUNTRY_{reporter}",
-                "trade_value_usd": float(value_usd),
-                "lookback_days": 30,
+                "route": f"COUNTRY_{shock['reporter']}",
+                "trade_value_usd": shock["value_usd"],
+                "lookback_days": BASELINE_MONTHS * 30,
                 "rationale": (
-                    f"{flow_type} {commodity_meta['label']} from reporter {reporter} "
-                    f"period {period}: {pct_change:+.1%} vs baseline"
+                    f"{shock['flow']} {commodity_meta['label']} from reporter {shock['reporter']} "
+                    f"period {shock['period']}: {pct_change:+.1%} vs "
+                    f"{shock['n_obs']}-month baseline (z={shock['z_score']:+.2f})"
                 ),
                 "meta": {
-                    "reporter": reporter,
-                    "period": period,
-                    "baseline_usd": float(baseline_usd),
+                    "reporter": shock["reporter"],
+                    "period": shock["period"],
+                    "baseline_usd": shock["baseline_usd"],
+                    "baseline_std": shock["baseline_std"],
+                    "baseline_obs": shock["n_obs"],
                     "worker_version": WORKER_VERSION,
                 },
-                "bucket_ts": datetime.now(timezone.utc).replace(
-                    hour=0, minute=0, second=0, microsecond=0
-                ).isoformat(),
-            }, schema="macro").execute()
-            log.info(
-                f"TRADE_FLOW_SHOCK emitted: {instrument} "
-                f"{commodity_meta['label']} {pct_change:+.1%} ({flow_type})"
-            )
-        except Exception as e:
-            log.warning(f"supply_chain_signal insert failed: {e}")
+                "bucket_ts": bucket_ts,
+            })
+        log.info(
+            f"TRADE_FLOW_SHOCK: {commodity_meta['label']} reporter {shock['reporter']} "
+            f"{shock['period']} {shock['flow']} {pct_change:+.1%} z={shock['z_score']:+.2f}"
+        )
+
+    if rows:
+        sink.insert("macro", "supply_chain_signal_v1", rows)
+    return len(rows)
+
+
+def detect_trade_shocks(supabase: Client, periods: list[str],
+                        changed_keys: set, commodity_by_code: dict) -> int:
+    """Score every series against its 12-month baseline; emit shocks for changed cells."""
+    if not changed_keys:
+        return 0
+    min_period = (
+        datetime.strptime(min(periods), "%Y%m") - relativedelta(months=BASELINE_MONTHS)
+    ).strftime("%Y%m")
+    cube = load_flow_cube(supabase, min_period)
+    if cube is None:
+        return 0
+    shocks = shock_cells(cube, scan(cube.values), only=changed_keys)
+    with SupabaseSink(supabase) as sink:
+        return emit_trade_shock_signals(shocks, commodity_by_code, sink)
 
 
 def get_periods(lookback_months: int = 3) -> list[str]:
@@ -207,56 +198,88 @@ def get_periods(lookback_months: int = 3) -> list[str]:
     return periods
 
 
-def get_baseline_value(
-    reporter: str,
-    commodity: str,
-    flow: str,
-    supabase: Client
-) -> float:
-    """Get 12-month average trade value as baseline."""
-    try:
-        result = supabase.rpc("", {}).execute()  # placeholder
-        return 0.0
-    except Exception:
-        return 0.0
-
-
 def run_once(supabase: Client):
     log.info("Starting Comtrade ingest cycle")
     session = requests.Session()
     session.headers["User-Agent"] = "Noterminal/1.0 trade-intelligence-worker"
 
-    periods = get_periods(lookback_months=2)
-    log.info(f"Fetching periods: {periods}")
-
-    total_rows = 0
-    for commodity in COMMODITY_TARGETS:
-        for reporter in REPORTER_COUNTRIES:
-            for period in periods:
-                rows = fetch_trade_flows(reporter, commodity["hs_code"], period, session)
-                for row in rows:
-                    upsert_flow(row, commodity, supabase)
-                total_rows += len(rows)
-                time.sleep(0.25)  # Respect free tier rate limits
-
-    log.info(f"Comtrade cycle complete — {total_rows} rows upserted")
+    periods = get_periods(lookback_months=LOOKBACK_MONTHS)
+    log.info(f"Candidate periods: {periods}")
+
+    index = CompletenessIndex(make_record_id)
+    index.load(supabase, periods)
+
+    commodity_by_code = {c["hs_code"]: c for c in COMMODITY_TARGETS}
+    candidates = [
+        (reporter, hs_code, period)
+        for hs_code in commodity_by_code
+        for reporter in REPORTER_COUNTRIES
+        for period in periods
+    ]
+    tuples = index.filter(candidates)
+    plan = plan_requests(tuples)
+    log.info(
+        f"Planned {len(plan)} requests for {len(tuples)}/{len(candidates)} tuples "
+        f"(index: {index.stats})"
+    )
+
+    report = FetchReport()
+    limiter = AdaptiveRateLimiter(min_interval=RATE_LIMIT_MIN_INTERVAL)
+    wanted = set(tuples)
+    changed_keys = set()
+    with SupabaseSink(supabase) as sink:
+        for req, rows in execute_plan(plan, session, BASE_URL, limiter, report):
+            changed = index.record(req.tuples() & wanted, rows)
+            for row in changed:
+                commodity = commodity_by_code.get(str(row.get("cmdCode", "")))
+                if commodity:
+                    upsert_flow(row, commodity, sink)
+                    changed_keys.add((
+                        str(row.get("reporterCode", "")), str(row.get("cmdCode", "")),
+                        "EXPORT" if row.get("flowCode") == "X" else "IMPORT",
+                        str(row.get("period", "")),
+                    ))
+        # Index rows only after their flow rows landed (comtrade_index.py).
+        sink.flush()
+        index.commit(sink, sink.dropped_rows("macro", "trade_flows_v1"))
+
+    if report.failed:
+        log.error(f"Comtrade cycle incomplete — {len(report.failed)} tuples not fetched")
+
+    shocks = detect_trade_shocks(supabase, periods, changed_keys, commodity_by_code)
+    log.info(f"Shock scan — {shocks} TRADE_FLOW_SHOCK rows from {len(changed_keys)} changed series cells")
+    log.info(
+        f"Comtrade cycle complete — fetch: {report.summary()}, "
+        f"index: {index.stats}, sink: {sink.stats}"
+    )
+    log_run(supabase, "PARTIAL" if report.failed else "COMPLETED", {
+        "fetch": report.summary(), "index": index.stats, "sink": sink.stats, "shocks": shocks,
+    })
+
+
+def log_run(supabase: Client, status: str, meta: dict):
+    supabase.schema("market").table("ingest_run_log_v1").insert({
+        "ingest_run_id": str(uuid.uuid4()),
+        "source_name":   SOURCE_NAME,
+        "run_status":    status,
+        "meta":          meta,
+        "completed_at":  datetime.now(timezone.utc).isoformat(),
+    }).execute()
 
 
 def main():
-    log.info(f"Comtrade Worker v{WORKER_VERSION} starting")
+    log.info(f"Comtrade Worker v{WORKER_VERSION} starting (schedule={SCHEDULE!r})")
+    serve_metrics()
     supabase = get_supabase_client()
-
-    while True:
-        try:
-            run_once(supabase)
-        except Exception as e:
-            log.error(f"Comtrade cycle error: {e}")
-        log.info(f"Sleeping {POLL_INTERVAL_SECONDS // 3600}h until next cycle")
-        time.sleep(POLL_INTERVAL_SECONDS)
+    run_blocking(
+        ScheduledJob(SOURCE_NAME, SCHEDULE, fresh_for=FRESH_FOR),
+        lambda: run_once(supabase),
+        lambda: last_success_supabase(supabase, SOURCE_NAME),
+    )
 
 
 def get_supabase_client() -> Client:
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    return supabase_client()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+db.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Shared asyncpg Pool Configuration
+
+One place that decides how every worker talks to Postgres. The question
+is whether asyncpg's prepared-statement cache can be used:
+
+  transaction  Supavisor / PgBouncer transaction pooling (port 6543).
+               Consecutive statements may land on different server
+               connections, so named prepares are unsafe:
+               statement_cache_size=0 — every call is parsed and planned.
+  session      direct connection or Session Pooler (port 5432). The
+               connection is ours for its lifetime: statements are
+               prepared once per connection and re-executed by name.
+  prepared     a transaction pooler that tracks protocol-level named
+               prepares itself (PgBouncer >= 1.21 max_prepared_statements)
+               — cache on behind the pooler.
+
+Mode is DB_POOL_MODE when set, otherwise inferred from the DSN port.
+
+numeric_as_float=True registers a text-format codec that decodes numeric
+straight to float (and binds floats / Decimals / strings as numeric
+text), skipping Decimal construction — ~35% less decode time on wide
+numeric reads. Only for analytics pools: values lose exact decimal
+precision, and binary COPY into numeric columns (ops_worker) needs the
+default codec. fetch_columns() returns a result set as columns, with
+NULL kept as None (or NaN in a float64 array).
+
+Workers that hold one connection for a whole run and repeat the same
+statements per symbol / week (panel aggregation, nowcast, accuracy,
+ops_worker's flush path) ask for session=True: they use DB_SESSION_URL
+when it is set and fall back to DATABASE_URL otherwise, so nothing
+changes until a session DSN is configured.
+
+    pool = await db.create_pool(WORKER_VERSION, session=True)
+
+  DATABASE_URL        default DSN (transaction pooler)
+  DB_SESSION_URL      session-mode DSN for session=True pools
+  DB_POOL_MODE        transaction | session | prepared (default: by port)
+  DB_STATEMENT_CACHE  prepared statements kept per connection (default 256)
+
+bench/bench_db_statements.py measures the hottest statements under each
+mode.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+from lazy import lazy_import
+
+asyncpg = lazy_import("asyncpg")
+
+log = logging.getLogger("db")
+
+MODES                   = ("transaction", "session", "prepared")
+TRANSACTION_POOLER_PORT = 6543
+STATEMENT_CACHE         = int(os.getenv("DB_STATEMENT_CACHE", 256))
+
+
+@dataclass
+class PoolConfig:
+    worker:               str
+    dsn:                  str
+    mode:                 str
+    min_size:             int = 1
+    max_size:             int = 3
+    timeout:              float = 60.0     # connect
+    command_timeout:      Optional[float] = None
+
+    @property
+    def statement_cache_size(self) -> int:
+        return 0 if self.mode == "transaction" else STATEMENT_CACHE
+
+    def describe(self) -> str:
+        parts = urlsplit(self.dsn)
+        host = parts.hostname or (parts.query or "local socket")
+        return (f"{self.worker}: {self.mode} mode, {host}:{parts.port or 5432}, "
+                f"statement cache {self.statement_cache_size}, pool {self.min_size}-{self.max_size}")
+
+
+def infer_mode(dsn: str) -> str:
+    mode = os.getenv("DB_POOL_MODE")
+    if mode:
+        if mode not in MODES:
+            raise ValueError(f"DB_POOL_MODE must be one of {MODES}, got {mode!r}")
+        return mode
+    port = urlsplit(dsn).port
+    return "transaction" if port == TRANSACTION_POOLER_PORT else "session"
+
+
+def pool_config(worker: str, dsn: Optional[str] = None, *, session: bool = False,
+                min_size: int = 1, max_size: int = 3, timeout: float = 60.0,
+                command_timeout: Optional[float] = None) -> PoolConfig:
+    """
+    Resolve DSN and mode. An explicit dsn wins; otherwise session=True
+    prefers DB_SESSION_URL, then DATABASE_URL.
+    """
+    if dsn is None:
+        dsn = (session and os.getenv("DB_SESSION_URL")) or os.environ["DATABASE_URL"]
+    return PoolConfig(worker, dsn, infer_mode(dsn), min_size, max_size, timeout, command_timeout)
+
+
+async def register_numeric_float(conn) -> None:
+    await conn.set_type_codec(
+        "numeric", schema="pg_catalog", format="text", encoder=str, decoder=float,
+    )
+
+
+async def create_pool(worker: str, dsn: Optional[str] = None, *,
+                      numeric_as_float: bool = False, **kwargs) -> "asyncpg.Pool":
+    cfg = pool_config(worker, dsn, **kwargs)
+    log.info(f"🔌 {cfg.describe()}{', numeric → float' if numeric_as_float else ''}")
+    return await asyncpg.create_pool(
+        dsn=cfg.dsn,
+        min_size=cfg.min_size,
+        max_size=cfg.max_size,
+        statement_cache_size=cfg.statement_cache_size,
+        timeout=cfg.timeout,
+        command_timeout=cfg.command_timeout,
+        init=register_numeric_float if numeric_as_float else None,
+    )
+
+
+# ── Columnar reads ───────────────────────────────────────────────────────
+
+async def fetch_columns(conn, sql: str, *args, numpy: bool = False) -> dict[str, list]:
+    """
+    {column: values} in select-list order; {} for an empty result. With
+    numpy=True, columns whose values are all float / None become float64
+    arrays (None → NaN) and all-int columns int64 arrays.
+    """
+    rows = await conn.fetch(sql, *args)
+    if not rows:
+        return {}
+    cols = dict(zip(rows[0].keys(), map(list, zip(*rows))))
+    if numpy:
+        import numpy as np
+        for name, values in cols.items():
+            kinds = {type(v) for v in values}
+            if kinds <= {float, type(None)}:
+                cols[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            elif kinds == {int}:
+                cols[name] = np.array(values, dtype=np.int64)
+    return cols
@@ -0,0 +1,242 @@
+"""
+db_trace.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Per-statement asyncpg Tracing
+
+Wraps an asyncpg connection so every fetch / fetchrow / fetchval /
+execute / executemany is timed and counted under a statement name — the
+calling function (fetch_qtd_aggregates, upsert_panel_rows, ...; db.py
+helpers are skipped), so the worker code does not change:
+
+    tracer = QueryTracer(WORKER_VERSION, run_id)
+    async with metrics.acquire(pool, WORKER_VERSION) as raw:
+        conn = tracer.wrap(raw)
+        ...
+        await log_run(conn, run_id, "COMPLETED", {..., "db": tracer.summary()})
+
+  slow queries   over DB_SLOW_MS are logged with their duration and rows
+  plans          a DB_EXPLAIN_SAMPLE fraction of slow read-only queries
+                 (at most DB_EXPLAIN_MAX per run) is re-run under
+                 EXPLAIN (ANALYZE, BUFFERS) and the JSON plan written to
+                 market.query_diagnostics_v1 (DDL below). DML is never
+                 explained: ANALYZE would execute it a second time
+  summary        per-statement calls / rows / total / mean / max ms,
+                 heaviest first, for the ingest_run_log_v1 meta
+  metrics        noterminal_db_statement_seconds{worker,statement}
+
+The EXPLAIN and the diagnostics insert run in a savepoint, so a failure
+there (missing table, statement_timeout) never aborts the caller's
+transaction. If the table does not exist the plan is logged instead.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import metrics
+
+log = logging.getLogger("db_trace")
+
+SLOW_MS        = float(os.getenv("DB_SLOW_MS", 500))
+EXPLAIN_SAMPLE = float(os.getenv("DB_EXPLAIN_SAMPLE", 0.1))
+EXPLAIN_MAX    = int(os.getenv("DB_EXPLAIN_MAX", 10))      # per run
+SUMMARY_TOP    = 15
+
+DIAGNOSTICS_DDL = """
+CREATE TABLE IF NOT EXISTS market.query_diagnostics_v1 (
+    diagnostic_id  uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    ingest_run_id  uuid,
+    source_name    text        NOT NULL,
+    statement_name text        NOT NULL,
+    duration_ms    numeric     NOT NULL,
+    row_count      integer,
+    query_sql      text        NOT NULL,
+    plan           jsonb       NOT NULL,
+    captured_at    timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+STATEMENT_SECONDS = metrics.Histogram(
+    "noterminal_db_statement_seconds", "asyncpg statement latency by calling function",
+    ("worker", "statement"),
+)
+
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH|VALUES|TABLE)\b", re.IGNORECASE)
+_WRITES    = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+def _explainable(sql: str) -> bool:
+    return bool(_READ_ONLY.match(sql)) and not _WRITES.search(sql)
+
+
+def _caller(frame) -> str:
+    """The worker function issuing the query — skipping db.py helpers (fetch_columns)."""
+    while frame.f_back is not None and frame.f_globals.get("__name__") == "db":
+        frame = frame.f_back
+    return frame.f_code.co_name
+
+
+def _status_rows(status) -> int:
+    """'INSERT 0 3' / 'UPDATE 2' / 'DELETE 0' → affected row count."""
+    try:
+        return int(str(status).rsplit(" ", 1)[-1])
+    except ValueError:
+        return 0
+
+
+@dataclass
+class StatementStats:
+    calls:    int = 0
+    rows:     int = 0
+    total_ms: float = 0.0
+    max_ms:   float = 0.0
+    slow:     int = 0
+
+
+class QueryTracer:
+    def __init__(self, worker: str, run_id: Optional[uuid.UUID] = None,
+                 slow_ms: float = SLOW_MS, explain_sample: float = EXPLAIN_SAMPLE,
+                 explain_max: int = EXPLAIN_MAX):
+        self.worker = worker
+        self.run_id = run_id
+        self.slow_ms = slow_ms
+        self.explain_sample = explain_sample
+        self.explain_max = explain_max
+        self.stats: dict[str, StatementStats] = {}
+        self.explained = 0
+        self._diagnostics_table = True      # flipped off on UndefinedTableError
+        self._hist: dict[str, metrics.HistogramChild] = {}
+
+    def wrap(self, conn) -> "TracedConnection":
+        return TracedConnection(conn, self)
+
+    def record(self, name: str, secs: float, rows: int) -> bool:
+        """Account one call; True if it was slow."""
+        ms = secs * 1000
+        st = self.stats.get(name)
+        if st is None:
+            st = self.stats[name] = StatementStats()
+            self._hist[name] = STATEMENT_SECONDS.labels(self.worker, name)
+        st.calls += 1
+        st.rows += rows
+        st.total_ms += ms
+        if ms > st.max_ms:
+            st.max_ms = ms
+        self._hist[name].observe(secs)
+        if ms < self.slow_ms:
+            return False
+        st.slow += 1
+        log.warning(f"🐢 {self.worker} {name}: {ms:.0f} ms, {rows} rows")
+        return True
+
+    def should_explain(self, sql: str) -> bool:
+        return (self.explained < self.explain_max
+                and random.random() < self.explain_sample
+                and _explainable(sql))
+
+    async def explain(self, conn, name: str, sql: str, args: tuple, ms: float, rows: int):
+        """EXPLAIN (ANALYZE, BUFFERS) on the raw connection, inside a savepoint."""
+        self.explained += 1
+        try:
+            async with conn.transaction():
+                plan = await conn.fetchval(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", *args
+                )
+        except Exception as e:
+            log.warning(f"EXPLAIN for {name} failed: {e}")
+            return
+        if self._diagnostics_table:
+            try:
+                async with conn.transaction():
+                    await conn.execute(
+                        """
+                        INSERT INTO market.query_diagnostics_v1
+                            (ingest_run_id, source_name, statement_name, duration_ms,
+                             row_count, query_sql, plan)
+                        VALUES ($1,$2,$3,$4,$5,$6,$7)
+                        """,
+                        self.run_id, self.worker, name, repr(round(ms, 3)), rows,
+                        sql.strip(), plan if isinstance(plan, str) else json.dumps(plan),
+                    )
+                log.info(f"🔬 {name}: plan captured to market.query_diagnostics_v1")
+                return
+            except Exception as e:
+                if type(e).__name__ == "UndefinedTableError":
+                    self._diagnostics_table = False
+                    log.warning("market.query_diagnostics_v1 missing — plans go to the log "
+                                "(DDL in db_trace.DIAGNOSTICS_DDL)")
+                else:
+                    log.warning(f"could not store plan for {name}: {e}")
+        log.info(f"🔬 {name} plan: {plan}")
+
+    def summary(self, top: int = SUMMARY_TOP) -> dict:
+        """Heaviest statements by total time, for log_run meta."""
+        ranked = sorted(self.stats.items(), key=lambda kv: kv[1].total_ms, reverse=True)
+        return {
+            "statements": {
+                name: {
+                    "calls":    st.calls,
+                    "rows":     st.rows,
+                    "total_ms": round(st.total_ms, 1),
+                    "mean_ms":  round(st.total_ms / st.calls, 2),
+                    "max_ms":   round(st.max_ms, 1),
+                    "slow":     st.slow,
+                }
+                for name, st in ranked[:top]
+            },
+            "total_ms":      round(sum(st.total_ms for st in self.stats.values()), 1),
+            "calls":         sum(st.calls for st in self.stats.values()),
+            "slow":          sum(st.slow for st in self.stats.values()),
+            "plans_sampled": self.explained,
+            "slow_ms":       self.slow_ms,
+        }
+
+
+class TracedConnection:
+    """asyncpg connection proxy; anything not traced passes straight through."""
+
+    def __init__(self, conn, tracer: QueryTracer):
+        self._conn = conn
+        self._tracer = tracer
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+    async def _traced(self, method, rows_of, sql: str, args: tuple, kwargs: dict):
+        name = _caller(sys._getframe(2))
+        t0 = time.perf_counter()
+        result = await method(sql, *args, **kwargs)
+        secs = time.perf_counter() - t0
+        rows = rows_of(result)
+        tracer = self._tracer
+        if tracer.record(name, secs, rows) and tracer.should_explain(sql):
+            await tracer.explain(self._conn, name, sql, args, secs * 1000, rows)
+        return result
+
+    async def fetch(self, sql: str, *args, **kwargs):
+        return await self._traced(self._conn.fetch, len, sql, args, kwargs)
+
+    async def fetchrow(self, sql: str, *args, **kwargs):
+        return await self._traced(self._conn.fetchrow, lambda r: int(r is not None),
+                                  sql, args, kwargs)
+
+    async def fetchval(self, sql: str, *args, **kwargs):
+        return await self._traced(self._conn.fetchval, lambda v: int(v is not None),
+                                  sql, args, kwargs)
+
+    async def execute(self, sql: str, *args, **kwargs):
+        return await self._traced(self._conn.execute, _status_rows, sql, args, kwargs)
+
+    async def executemany(self, sql: str, args, **kwargs):
+        name = _caller(sys._getframe(1))
+        args = list(args)
+        t0 = time.perf_counter()
+        await self._conn.executemany(sql, args, **kwargs)
+        self._tracer.record(name, time.perf_counter() - t0, len(args))
@@ -15,34 +15,44 @@ model where it was wrong — direction, magnitude, timing. The scorecard
 view surfaces MAPE and direction accuracy in real time.
 
 Canon compliance:
-  - Restart loop in start.sh (non-critical worker)
-  - asyncpg → Transaction Pooler port 6543
+  - Hosted by supervisor.py (non-critical worker)
+  - Wall-clock schedule via scheduler.py — restarts never re-run a fresh job
+  - asyncpg via db.py — Transaction Pooler 6543, or DB_SESSION_URL for cached prepares
   - Idempotent on (prediction_id, actual_id)
-  - Provenance via ingest_run_log_v1
+  - Provenance via ingest_run_log_v1 (meta.db = per-statement timings)
 """
 
 import asyncio
 import json
 import logging
-import os
+import time
 import uuid
-from dataclasses import dataclass
-from datetime import date, timedelta
+from datetime import timedelta
 from typing import Optional
 
 import asyncpg
 
+import db
+import metrics
+from columnar import RecordBatch, Row
+from db_trace import QueryTracer
+from lazy import lazy_import
+from metrics import ROWS, SYMBOL_SECONDS
+from scheduler import CronSchedule, ScheduledJob, last_success_pg, run_async
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [earnings_accuracy_worker] %(levelname)s %(message)s",
 )
 log = logging.getLogger(__name__)
 
+np = lazy_import("numpy")
+
 # ─── Config ───────────────────────────────────────────────────────────────────
 
-DB_URL             = os.environ["DATABASE_URL"]
 WORKER_VERSION     = "earnings_accuracy_worker_v1"
-POLL_INTERVAL_SECS = 86400     # daily
+SCHEDULE           = CronSchedule("0 7 * * *", "America/New_York")   # daily
+FRESH_FOR          = timedelta(hours=12)
 
 # Beat/miss classification thresholds (vs consensus)
 BEAT_THRESHOLD      =  2.0     # >+2% vs consensus = BEAT
@@ -50,29 +60,17 @@ STRONG_BEAT_THRESHOLD = 5.0    # >+5% = STRONG_BEAT
 MISS_THRESHOLD      = -2.0     # <-2% = MISS
 STRONG_MISS_THRESHOLD = -5.0   # <-5% = STRONG_MISS
 
-# ─── Data classes ─────────────────────────────────────────────────────────────
-
-@dataclass
-class ActualRow:
-    actual_id:              uuid.UUID
-    symbol:                 str
-    fiscal_quarter:         str
-    report_date:            date
-    actual_revenue_usd:     float
-    actual_eps:             Optional[float]
-
-@dataclass
-class PredictionRow:
-    prediction_id:          uuid.UUID
-    nowcast_id:             uuid.UUID
-    symbol:                 str
-    fiscal_quarter:         str
-    prediction:             str
-    predicted_revenue_usd:  Optional[float]
-    surprise_pct:           Optional[float]
-    confidence_score:       Optional[float]
-    status:                 str
-    created_at:             date
+# Column order of market.earnings_model_accuracy_v1 inserts (score_predictions)
+ACCURACY_COLUMNS = (
+    "accuracy_id", "prediction_id", "actual_id",
+    "symbol", "fiscal_quarter", "model_version",
+    "predicted_revenue_usd", "actual_revenue_usd",
+    "revenue_error_usd", "revenue_error_pct", "revenue_mape",
+    "prediction", "actual_direction", "direction_correct",
+    "surprise_pct", "actual_surprise_pct", "surprise_error_pct",
+    "panel_weeks_used", "panel_coverage_score", "days_before_earnings",
+    "meta",
+)
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
 
@@ -87,18 +85,20 @@ def classify_direction(vs_consensus_pct: float) -> str:
         return "MISS"
     return "IN_LINE"
 
-def mape(predicted: float, actual: float) -> float:
+def mape(predicted, actual: float):
+    """Absolute % error vs actual; predicted may be a scalar or an array."""
     if actual == 0:
-        return 0.0
-    return round(abs((actual - predicted) / actual) * 100, 4)
+        return np.zeros(np.shape(predicted))
+    return np.round(np.abs((actual - predicted) / actual) * 100, 4)
 
 # ─── DB reads ─────────────────────────────────────────────────────────────────
 
-async def fetch_unscored_actuals(conn) -> list[ActualRow]:
+async def fetch_unscored_actuals(conn) -> RecordBatch:
     """
     Actuals that have at least one prediction not yet scored.
     """
-    rows = await conn.fetch(
+    return RecordBatch(await db.fetch_columns(
+        conn,
         """
         SELECT DISTINCT
             a.actual_id, a.symbol, a.fiscal_quarter,
@@ -113,23 +113,13 @@ async def fetch_unscored_actuals(conn) -> list[ActualRow]:
         )
         ORDER BY a.report_date
         """
-    )
-    return [
-        ActualRow(
-            actual_id=r["actual_id"],
-            symbol=r["symbol"],
-            fiscal_quarter=r["fiscal_quarter"],
-            report_date=r["report_date"],
-            actual_revenue_usd=float(r["actual_revenue_usd"]),
-            actual_eps=float(r["actual_eps"]) if r["actual_eps"] else None,
-        )
-        for r in rows
-    ]
+    ))
 
 async def fetch_predictions_for_quarter(conn, symbol: str,
-                                         fiscal_quarter: str) -> list[PredictionRow]:
+                                         fiscal_quarter: str) -> RecordBatch:
     """All predictions (any status) for a symbol+quarter."""
-    rows = await conn.fetch(
+    return RecordBatch(await db.fetch_columns(
+        conn,
         """
         SELECT
             prediction_id, nowcast_id, symbol, fiscal_quarter,
@@ -141,24 +131,7 @@ async def fetch_predictions_for_quarter(conn, symbol: str,
         ORDER BY created_at
         """,
         symbol, fiscal_quarter,
-    )
-    return [
-        PredictionRow(
-            prediction_id=r["prediction_id"],
-            nowcast_id=r["nowcast_id"],
-            symbol=r["symbol"],
-            fiscal_quarter=r["fiscal_quarter"],
-            prediction=r["prediction"],
-            predicted_revenue_usd=float(r["predicted_revenue_usd"])
-                if r["predicted_revenue_usd"] else None,
-            surprise_pct=float(r["surprise_pct"]) if r["surprise_pct"] else None,
-            confidence_score=float(r["confidence_score"])
-                if r["confidence_score"] else None,
-            status=r["status"],
-            created_at=r["created_at"],
-        )
-        for r in rows
-    ]
+    ))
 
 async def fetch_consensus_revenue(conn, symbol: str,
                                    fiscal_quarter: str) -> Optional[float]:
@@ -171,24 +144,20 @@ async def fetch_consensus_revenue(conn, symbol: str,
         """,
         symbol, fiscal_quarter,
     )
-    return float(row["consensus_revenue_usd"]) if row and row["consensus_revenue_usd"] else None
+    return row["consensus_revenue_usd"] if row else None
 
-async def fetch_nowcast_panel_meta(conn, nowcast_id: uuid.UUID) -> dict:
-    row = await conn.fetchrow(
+async def fetch_nowcast_panel_meta(conn, nowcast_ids: list) -> RecordBatch:
+    """panel_weeks_used / panel_coverage_score per nowcast_id, in input order (NULL if none)."""
+    return RecordBatch(await db.fetch_columns(
+        conn,
         """
-        SELECT panel_weeks_used, panel_coverage_score
-        FROM market.earnings_nowcast_runs_v1
-        WHERE nowcast_id = $1
+        SELECT r.panel_weeks_used, r.panel_coverage_score
+        FROM unnest($1::uuid[]) WITH ORDINALITY AS k(nowcast_id, ord)
+        LEFT JOIN market.earnings_nowcast_runs_v1 r ON r.nowcast_id = k.nowcast_id
+        ORDER BY k.ord
         """,
-        nowcast_id,
-    )
-    if not row:
-        return {"panel_weeks_used": None, "panel_coverage_score": None}
-    return {
-        "panel_weeks_used": row["panel_weeks_used"],
-        "panel_coverage_score": float(row["panel_coverage_score"])
-            if row["panel_coverage_score"] else None,
-    }
+        nowcast_ids,
+    ))
 
 # ─── DB writes ────────────────────────────────────────────────────────────────
 
@@ -207,7 +176,7 @@ async def resolve_active_predictions(conn, symbol: str,
         symbol, fiscal_quarter,
     )
 
-async def update_actual_beat_miss(conn, actual: ActualRow,
+async def update_actual_beat_miss(conn, actual: Row,
                                    consensus_rev: Optional[float],
                                    actual_growth_pct: Optional[float]) -> None:
     """Populate vs_consensus_revenue_pct and beat_miss_label on the actual row."""
@@ -228,48 +197,59 @@ async def update_actual_beat_miss(conn, actual: ActualRow,
         round(vs_consensus, 4), beat_miss, actual_growth_pct, actual.actual_id,
     )
 
-async def score_prediction(conn, pred: PredictionRow, actual: ActualRow,
-                            consensus_rev: Optional[float]) -> None:
-    """Score one prediction against actuals. Idempotent."""
-    accuracy_id = uuid.uuid4()
+async def score_predictions(conn, preds: RecordBatch, actual: Row,
+                             consensus_rev: Optional[float]) -> RecordBatch:
+    """Score a quarter's predictions against actuals in one executemany. Idempotent."""
+    actual_rev = actual.actual_revenue_usd
 
     # vs consensus actual surprise
     actual_surprise_pct = None
     actual_direction    = "UNKNOWN"
     if consensus_rev and consensus_rev > 0:
         actual_surprise_pct = round(
-            ((actual.actual_revenue_usd - consensus_rev) / consensus_rev) * 100, 4
+            ((actual_rev - consensus_rev) / consensus_rev) * 100, 4
         )
         actual_direction = classify_direction(actual_surprise_pct)
 
-    # Revenue error
-    rev_error_usd = None
-    rev_error_pct = None
-    rev_mape      = None
-    if pred.predicted_revenue_usd:
-        rev_error_usd = round(actual.actual_revenue_usd - pred.predicted_revenue_usd, 2)
-        rev_error_pct = round(
-            (rev_error_usd / actual.actual_revenue_usd) * 100
-            if actual.actual_revenue_usd else 0.0, 4
-        )
-        rev_mape = mape(pred.predicted_revenue_usd, actual.actual_revenue_usd)
-
-    # Direction correct?
-    direction_correct = (pred.prediction == actual_direction)
+    # Revenue error (NaN → NULL where there is no predicted revenue)
+    predicted = preds["predicted_revenue_usd"]
+    rev_error_usd = np.round(actual_rev - predicted, 2)
+    rev_error_pct = (np.round(rev_error_usd / actual_rev * 100, 4) if actual_rev
+                     else np.where(np.isnan(predicted), np.nan, 0.0))
+    rev_mape = np.where(np.isnan(predicted), np.nan, mape(predicted, actual_rev))
 
     # Surprise error
-    surprise_error = None
-    if pred.surprise_pct is not None and actual_surprise_pct is not None:
-        surprise_error = round(pred.surprise_pct - actual_surprise_pct, 4)
+    surprise_error = (np.round(preds["surprise_pct"] - actual_surprise_pct, 4)
+                      if actual_surprise_pct is not None else np.full(len(preds), np.nan))
 
     # Days before earnings at time of prediction
-    days_before = (actual.report_date - pred.created_at).days \
-        if pred.created_at else None
+    days_before = [(actual.report_date - d).days if d else None
+                   for d in preds["created_at"]]
 
     # Panel metadata
-    panel_meta = await fetch_nowcast_panel_meta(conn, pred.nowcast_id)
+    panel_meta = await fetch_nowcast_panel_meta(conn, preds["nowcast_id"].tolist())
+
+    n = len(preds)
+    scored = preds.with_columns(
+        panel_meta,
+        accuracy_id=[uuid.uuid4() for _ in range(n)],
+        actual_id=np.full(n, actual.actual_id, dtype=object),
+        model_version=np.full(n, WORKER_VERSION, dtype=object),
+        actual_revenue_usd=np.full(n, actual_rev, dtype=np.float64),
+        revenue_error_usd=rev_error_usd,
+        revenue_error_pct=rev_error_pct,
+        revenue_mape=rev_mape,
+        actual_direction=np.full(n, actual_direction, dtype=object),
+        direction_correct=preds["prediction"] == actual_direction,
+        actual_surprise_pct=np.full(n, np.nan if actual_surprise_pct is None
+                                    else actual_surprise_pct),
+        surprise_error_pct=surprise_error,
+        days_before_earnings=days_before,
+        meta=[json.dumps({"worker": WORKER_VERSION, "status_at_score": st})
+              for st in preds["status"]],
+    )
 
-    await conn.execute(
+    await conn.executemany(
         """
         INSERT INTO market.earnings_model_accuracy_v1 (
             accuracy_id, prediction_id, actual_id,
@@ -289,19 +269,9 @@ async def score_prediction(conn, pred: PredictionRow, actual: ActualRow,
         )
         ON CONFLICT (prediction_id, actual_id) DO NOTHING
         """,
-        accuracy_id, pred.prediction_id, actual.actual_id,
-        pred.symbol, pred.fiscal_quarter, WORKER_VERSION,
-        pred.predicted_revenue_usd, actual.actual_revenue_usd,
-        rev_error_usd, rev_error_pct, rev_mape,
-        pred.prediction, actual_direction, direction_correct,
-        pred.surprise_pct, actual_surprise_pct, surprise_error,
-        panel_meta["panel_weeks_used"], panel_meta["panel_coverage_score"],
-        days_before,
-        json.dumps({
-            "worker": WORKER_VERSION,
-            "status_at_score": pred.status,
-        }),
+        scored.to_records(ACCURACY_COLUMNS),
     )
+    return scored
 
 async def log_run(conn, run_id: uuid.UUID, status: str, meta: dict) -> None:
     await conn.execute(
@@ -322,11 +292,15 @@ async def run_once(pool: asyncpg.Pool) -> None:
     actuals_processed = 0
     predictions_scored = 0
 
-    async with pool.acquire() as conn:
+    tracer = QueryTracer(WORKER_VERSION, run_id)
+    async with metrics.acquire(pool, WORKER_VERSION) as raw:
+        conn = tracer.wrap(raw)
         actuals = await fetch_unscored_actuals(conn)
+        ROWS.labels("market.earnings_actuals_v1", "read").inc(len(actuals))
         log.info("🎯 %d actuals with unscored predictions", len(actuals))
 
         for actual in actuals:
+            t0 = time.perf_counter()
             try:
                 log.info("  📋 Scoring %s %s (reported %s)",
                          actual.symbol, actual.fiscal_quarter, actual.report_date)
@@ -354,42 +328,47 @@ async def run_once(pool: asyncpg.Pool) -> None:
                     conn, actual.symbol, actual.fiscal_quarter
                 )
 
-                for pred in predictions:
-                    await score_prediction(conn, pred, actual, consensus_rev)
-                    predictions_scored += 1
-                    log.info(
-                        "    ✅ Scored prediction %s → direction=%s, mape=%.2f%%",
-                        str(pred.prediction_id)[:8],
-                        pred.prediction,
-                        mape(pred.predicted_revenue_usd or 0,
-                             actual.actual_revenue_usd),
-                    )
+                if predictions:
+                    scored = await score_predictions(conn, predictions, actual, consensus_rev)
+                    predictions_scored += len(scored)
+                    ROWS.labels("market.earnings_model_accuracy_v1", "write").inc(len(scored))
+                    for pred in scored:
+                        log.info(
+                            "    ✅ Scored prediction %s → direction=%s, mape=%.2f%%",
+                            str(pred.prediction_id)[:8],
+                            pred.prediction,
+                            mape(pred.predicted_revenue_usd or 0,
+                                 actual.actual_revenue_usd),
+                        )
 
                 actuals_processed += 1
 
             except Exception as e:
                 log.error("  ❌ %s %s — scoring failed: %s",
                           actual.symbol, actual.fiscal_quarter, e, exc_info=True)
+            finally:
+                SYMBOL_SECONDS.labels(WORKER_VERSION).observe(time.perf_counter() - t0)
 
         await log_run(conn, run_id, "COMPLETED", {
             "actuals_processed": actuals_processed,
             "predictions_scored": predictions_scored,
+            "db": tracer.summary(),
         })
 
     log.info("✅ Run complete — %d actuals, %d predictions scored",
              actuals_processed, predictions_scored)
 
 async def main() -> None:
-    log.info("🚀 earnings_accuracy_worker starting (poll=%ds)", POLL_INTERVAL_SECS)
-    pool = await asyncpg.create_pool(DB_URL, min_size=1, max_size=3)
+    log.info("🚀 earnings_accuracy_worker starting (schedule=%r)", SCHEDULE)
+    metrics.serve()
+    pool = await db.create_pool(WORKER_VERSION, session=True, numeric_as_float=True)
+    job = ScheduledJob(WORKER_VERSION, SCHEDULE, fresh_for=FRESH_FOR)
     try:
-        while True:
-            try:
-                await run_once(pool)
-            except Exception as e:
-                log.error("Run failed: %s — retrying next cycle", e, exc_info=True)
-            log.info("💤 Sleeping %ds", POLL_INTERVAL_SECS)
-            await asyncio.sleep(POLL_INTERVAL_SECS)
+        await run_async(
+            job,
+            lambda: run_once(pool),
+            lambda: last_success_pg(pool, WORKER_VERSION),
+        )
     finally:
         await pool.close()
 
@@ -18,36 +18,46 @@ Extrapolation methods:
   (REGRESSION added in v2 when we have enough historical accuracy data)
 
 Canon compliance:
-  - Restart loop in start.sh (non-critical worker)
-  - asyncpg → Transaction Pooler port 6543
+  - Hosted by supervisor.py (non-critical worker)
+  - Wall-clock schedule via scheduler.py — restarts never re-run a fresh job
+  - asyncpg via db.py — Transaction Pooler 6543, or DB_SESSION_URL for cached prepares
   - inputs_hash / outputs_hash on every nowcast row
   - Vol regime gate before signal write
-  - Provenance via ingest_run_log_v1
+  - Provenance via ingest_run_log_v1 (meta.db = per-statement timings)
 """
 
 import asyncio
 import hashlib
 import json
 import logging
-import os
+import time
 import uuid
-from dataclasses import dataclass
-from datetime import date, datetime, timedelta, timezone
+from datetime import date, timedelta
 from typing import Optional
 
 import asyncpg
 
+import db
+import metrics
+from columnar import RecordBatch, Row
+from db_trace import QueryTracer
+from lazy import lazy_import
+from metrics import ROWS, SYMBOL_SECONDS
+from scheduler import CronSchedule, ScheduledJob, last_success_pg, run_async
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [earnings_nowcast_worker] %(levelname)s %(message)s",
 )
 log = logging.getLogger(__name__)
 
+np = lazy_import("numpy")
+
 # ─── Config ───────────────────────────────────────────────────────────────────
 
-DB_URL              = os.environ["DATABASE_URL"]
 WORKER_VERSION      = "earnings_nowcast_worker_v1"
-POLL_INTERVAL_SECS  = 604800        # weekly (7 days)
+SCHEDULE            = CronSchedule("0 6 * * 0", "America/New_York")   # weekly (Sundays)
+FRESH_FOR           = timedelta(days=3)     # restarts never re-run a fresh nowcast
 MIN_PANEL_WEEKS     = 2             # minimum weeks of panel data to run model
 MIN_COVERAGE_SCORE  = 0.15          # minimum panel quality to produce prediction
 MIN_CONFIDENCE      = 0.55          # minimum confidence to write signal
@@ -62,49 +72,27 @@ PREDICTION_BANDS = [
     (None, "STRONG_MISS", 0.90),
 ]
 
-# ─── Data classes ─────────────────────────────────────────────────────────────
-
-@dataclass
-class ConsensusRow:
-    consensus_id:               uuid.UUID
-    symbol:                     str
-    fiscal_quarter:             str
-    fiscal_quarter_end:         date
-    earnings_date:              Optional[date]
-    consensus_revenue_usd:      float
-    consensus_revenue_growth_pct: Optional[float]
-    analyst_count:              Optional[int]
-
-@dataclass
-class PanelSummary:
-    symbol:                 str
-    fiscal_quarter:         str
-    weeks_used:             int
-    qtd_spend_usd:          float
-    yoy_growth_pct:         Optional[float]
-    user_count:             int
-    coverage_score:         float
-    latest_week_start:      date
-
-@dataclass
-class NowcastResult:
-    nowcast_revenue_usd:    float
-    nowcast_growth_pct:     float
-    nowcast_surprise_pct:   float
-    nowcast_revenue_low:    float
-    nowcast_revenue_high:   float
-    quarter_completion_pct: float
-    weeks_remaining:        int
-    method:                 str
-    prediction:             str
-    confidence_score:       float
-    confidence_label:       str
+# ─── Batches ──────────────────────────────────────────────────────────────────
+#
+# One RecordBatch flows through the run, one row per symbol+quarter:
+#   fetch_upcoming_consensus  consensus_id, symbol, fiscal_quarter,
+#                             fiscal_quarter_end, earnings_date,
+#                             consensus_revenue_usd, consensus_revenue_growth_pct,
+#                             analyst_count
+#   fetch_panel_summaries     + weeks_used, qtd_spend_usd, yoy_growth_pct,
+#                             user_count, coverage_score, latest_week_start
+#   run_nowcast_model         + nowcast_revenue_usd, nowcast_growth_pct,
+#                             nowcast_surprise_pct, nowcast_revenue_low,
+#                             nowcast_revenue_high, quarter_completion_pct,
+#                             weeks_remaining, method, prediction,
+#                             confidence_score, confidence_label
 
 # ─── DB reads ─────────────────────────────────────────────────────────────────
 
-async def fetch_upcoming_consensus(conn) -> list[ConsensusRow]:
+async def fetch_upcoming_consensus(conn) -> RecordBatch:
     """All symbols with earnings within MAX_DAYS_TO_EARNINGS."""
-    rows = await conn.fetch(
+    return RecordBatch(await db.fetch_columns(
+        conn,
         """
         SELECT DISTINCT ON (symbol, fiscal_quarter)
             consensus_id, symbol, fiscal_quarter, fiscal_quarter_end,
@@ -113,61 +101,44 @@ async def fetch_upcoming_consensus(conn) -> list[ConsensusRow]:
         FROM market.earnings_consensus_v1
         WHERE earnings_date IS NOT NULL
           AND earnings_date BETWEEN CURRENT_DATE
-                                AND CURRENT_DATE + $1
+                                AND CURRENT_DATE + $1::int
           AND consensus_revenue_usd IS NOT NULL
         ORDER BY symbol, fiscal_quarter, as_of_date DESC
         """,
         MAX_DAYS_TO_EARNINGS,
-    )
-    return [
-        ConsensusRow(
-            consensus_id=r["consensus_id"],
-            symbol=r["symbol"],
-            fiscal_quarter=r["fiscal_quarter"],
-            fiscal_quarter_end=r["fiscal_quarter_end"],
-            earnings_date=r["earnings_date"],
-            consensus_revenue_usd=float(r["consensus_revenue_usd"]),
-            consensus_revenue_growth_pct=float(r["consensus_revenue_growth_pct"])
-                if r["consensus_revenue_growth_pct"] else None,
-            analyst_count=r["analyst_count"],
-        )
-        for r in rows
-    ]
+    ))
 
-async def fetch_panel_summary(conn, symbol: str,
-                               fiscal_quarter: str) -> Optional[PanelSummary]:
-    """Latest QTD panel state for symbol+quarter."""
-    row = await conn.fetchrow(
+async def fetch_panel_summaries(conn, consensus: RecordBatch) -> RecordBatch:
+    """
+    Latest QTD panel state for every symbol+quarter in consensus, in one
+    round trip. weeks_used = 0 where there is no panel yet.
+    """
+    cols = await db.fetch_columns(
+        conn,
         """
         SELECT
-            COUNT(*)                    AS weeks_used,
-            MAX(qtd_spend_usd)          AS qtd_spend_usd,
-            AVG(yoy_growth_pct)         AS yoy_growth_pct,
-            MAX(qtd_user_count)         AS user_count,
-            AVG(panel_coverage_score)   AS coverage_score,
-            MAX(week_start)             AS latest_week_start
-        FROM market.merchant_spend_panel_v1
-        WHERE canonical_symbol = $1
-          AND fiscal_quarter    = $2
-          AND min_user_threshold_met = true
+            COUNT(p.week_start)           AS weeks_used,
+            MAX(p.qtd_spend_usd)          AS qtd_spend_usd,
+            AVG(p.yoy_growth_pct)         AS yoy_growth_pct,
+            MAX(p.qtd_user_count)         AS user_count,
+            AVG(p.panel_coverage_score)   AS coverage_score,
+            MAX(p.week_start)             AS latest_week_start
+        FROM unnest($1::text[], $2::text[]) WITH ORDINALITY
+                AS k(symbol, fiscal_quarter, ord)
+        LEFT JOIN market.merchant_spend_panel_v1 p
+               ON p.canonical_symbol = k.symbol
+              AND p.fiscal_quarter   = k.fiscal_quarter
+              AND p.min_user_threshold_met = true
+        GROUP BY k.ord
+        ORDER BY k.ord
         """,
-        symbol, fiscal_quarter,
+        consensus["symbol"].tolist(), consensus["fiscal_quarter"].tolist(),
     )
-
-    if not row or not row["weeks_used"] or row["weeks_used"] == 0:
-        return None
-    if not row["qtd_spend_usd"]:
-        return None
-
-    return PanelSummary(
-        symbol=symbol,
-        fiscal_quarter=fiscal_quarter,
-        weeks_used=int(row["weeks_used"]),
-        qtd_spend_usd=float(row["qtd_spend_usd"]),
-        yoy_growth_pct=float(row["yoy_growth_pct"]) if row["yoy_growth_pct"] else None,
-        user_count=int(row["user_count"]) if row["user_count"] else 0,
-        coverage_score=float(row["coverage_score"]) if row["coverage_score"] else 0.0,
-        latest_week_start=row["latest_week_start"],
+    panel = RecordBatch(cols)
+    return consensus.with_columns(
+        panel,
+        user_count=np.where(panel.valid("user_count"), panel["user_count"], 0),
+        coverage_score=np.where(panel.valid("coverage_score"), panel["coverage_score"], 0.0),
     )
 
 async def get_vol_regime(conn) -> str:
@@ -186,120 +157,149 @@ def quarter_date_range(fiscal_quarter: str, fq_end: date) -> tuple[date, date]:
     q_start = date(yr, q_start_month, 1)
     return q_start, fq_end
 
-def compute_quarter_completion(fq_start: date, fq_end: date) -> tuple[float, int]:
-    """How far through the quarter are we today."""
-    today = date.today()
-    total_days = (fq_end - fq_start).days
-    elapsed = min((today - fq_start).days, total_days)
-    completion_pct = round((elapsed / total_days) * 100, 2)
+def compute_quarter_completion(fq_start, fq_end) -> tuple:
+    """How far through each quarter we are today (datetime64[D] arrays)."""
+    today = np.datetime64(date.today(), "D")
+    total_days = (fq_end - fq_start).astype(np.int64)
+    elapsed = np.minimum((today - fq_start).astype(np.int64), total_days)
+    completion_pct = np.round(elapsed / total_days * 100, 2)
     # Remaining weeks
-    remaining_days = max((fq_end - today).days, 0)
+    remaining_days = np.maximum((fq_end - today).astype(np.int64), 0)
     weeks_remaining = remaining_days // 7
     return completion_pct, weeks_remaining
 
-def linear_qtd_extrapolation(panel: PanelSummary,
-                              completion_pct: float) -> tuple[float, float, float]:
+def prior_year_revenue(consensus_revenue, consensus_growth):
+    """Prior-year revenue implied by consensus revenue and growth."""
+    with np.errstate(divide="ignore"):
+        return np.where(consensus_growth != -100,
+                        consensus_revenue / (1 + consensus_growth / 100), consensus_revenue)
+
+def linear_qtd_extrapolation(qtd_spend, completion_pct) -> tuple:
     """
     Project QTD spend to full-quarter revenue via linear run-rate.
     Returns (nowcast_revenue, low, high).
     Uncertainty band widens early in the quarter, tightens as it completes.
     """
-    if completion_pct <= 0:
-        completion_pct = 1.0
+    completion_pct = np.where(completion_pct <= 0, 1.0, completion_pct)
 
     # Run-rate: annualize QTD spend based on quarter completion
-    nowcast = panel.qtd_spend_usd / (completion_pct / 100)
+    nowcast = qtd_spend / (completion_pct / 100)
 
     # Uncertainty: ±15% early, narrows to ±3% at quarter end
-    uncertainty = max(0.03, 0.15 * (1 - completion_pct / 100))
+    uncertainty = np.maximum(0.03, 0.15 * (1 - completion_pct / 100))
     low  = nowcast * (1 - uncertainty)
     high = nowcast * (1 + uncertainty)
 
-    return round(nowcast, 2), round(low, 2), round(high, 2)
+    return np.round(nowcast, 2), np.round(low, 2), np.round(high, 2)
 
-def seasonal_adj_extrapolation(panel: PanelSummary, completion_pct: float,
-                                consensus: ConsensusRow) -> tuple[float, float, float]:
+def seasonal_adj_extrapolation(panel_growth, coverage, completion_pct,
+                                prior_rev, consensus_growth) -> tuple:
     """
     Blend panel YoY growth with consensus growth using panel coverage as weight.
     Higher coverage = more weight on panel signal.
     """
-    panel_growth = panel.yoy_growth_pct or 0.0
-    consensus_growth = consensus.consensus_revenue_growth_pct or 0.0
-    prior_rev = consensus.consensus_revenue_usd / (1 + consensus_growth / 100) \
-        if consensus_growth != -100 else consensus.consensus_revenue_usd
-
     # Blend: panel_weight driven by coverage score and quarter completion
-    panel_weight = min(panel.coverage_score * (completion_pct / 100), 0.85)
+    panel_weight = np.minimum(coverage * (completion_pct / 100), 0.85)
     blended_growth = (panel_growth * panel_weight) + (consensus_growth * (1 - panel_weight))
     nowcast = prior_rev * (1 + blended_growth / 100)
 
-    uncertainty = max(0.02, 0.10 * (1 - panel.coverage_score))
+    uncertainty = np.maximum(0.02, 0.10 * (1 - coverage))
     low  = nowcast * (1 - uncertainty)
     high = nowcast * (1 + uncertainty)
 
-    return round(nowcast, 2), round(low, 2), round(high, 2)
-
-def determine_prediction(surprise_pct: float,
-                          coverage_score: float,
-                          completion_pct: float) -> tuple[str, float, str]:
-    """Map surprise_pct → prediction label + confidence score."""
-    # Base confidence from surprise bands
-    for threshold, label, base_conf in PREDICTION_BANDS:
-        if threshold is None or surprise_pct <= threshold:
-            # Discount confidence based on panel quality and quarter completeness
-            quality_factor = min(coverage_score * 1.5, 1.0)
-            completion_factor = min(completion_pct / 100, 1.0)
-            confidence = base_conf * (0.5 + 0.3 * quality_factor + 0.2 * completion_factor)
-            confidence = round(min(confidence, 0.95), 4)
-            conf_label = (
-                "HIGH"     if confidence >= 0.80 else
-                "MODERATE" if confidence >= 0.65 else
-                "LOW"
-            )
-            return label, confidence, conf_label
-
-    return "IN_LINE", 0.50, "LOW"
+    return np.round(nowcast, 2), np.round(low, 2), np.round(high, 2)
+
+def determine_prediction(surprise_pct, coverage_score, completion_pct) -> tuple:
+    """Map surprise_pct → prediction label + confidence score (first matching band)."""
+    label      = np.full(len(surprise_pct), "IN_LINE", dtype=object)
+    base_conf  = np.full(len(surprise_pct), np.nan)
+    unmatched  = np.ones(len(surprise_pct), dtype=bool)
+    for threshold, band, conf in PREDICTION_BANDS:
+        hit = unmatched & (True if threshold is None else surprise_pct <= threshold)
+        label[hit] = band
+        base_conf[hit] = conf
+        unmatched &= ~hit
+
+    # Discount confidence based on panel quality and quarter completeness
+    quality_factor = np.minimum(coverage_score * 1.5, 1.0)
+    completion_factor = np.minimum(completion_pct / 100, 1.0)
+    confidence = base_conf * (0.5 + 0.3 * quality_factor + 0.2 * completion_factor)
+    confidence = np.round(np.minimum(confidence, 0.95), 4)
+    confidence = np.where(unmatched, 0.50, confidence)        # no band matched
+    conf_label = np.select(
+        [unmatched, confidence >= 0.80, confidence >= 0.65],
+        ["LOW", "HIGH", "MODERATE"], "LOW",
+    ).astype(object)
+    return label, confidence, conf_label
 
 def sha256_of(obj: dict) -> str:
     return hashlib.sha256(
         json.dumps(obj, sort_keys=True, default=str).encode()
     ).hexdigest()
 
+def select_ready(batch: RecordBatch) -> tuple[RecordBatch, list[date]]:
+    """
+    Rows with enough panel to nowcast, and their quarter starts. Every
+    skipped symbol is logged with the reason.
+    """
+    weeks    = batch["weeks_used"]
+    no_panel = (weeks == 0) | ~(batch["qtd_spend_usd"] > 0)          # NaN → no panel
+    short    = ~no_panel & (weeks < MIN_PANEL_WEEKS)
+    thin     = ~no_panel & ~short & (batch["coverage_score"] < MIN_COVERAGE_SCORE)
+    for row in batch.filter(no_panel):
+        log.info("  ⏭  %s — no panel data yet", row.symbol)
+    for row in batch.filter(short):
+        log.info("  ⏭  %s — only %d weeks of panel (need %d)",
+                 row.symbol, row.weeks_used, MIN_PANEL_WEEKS)
+    for row in batch.filter(thin):
+        log.info("  ⏭  %s — coverage %.2f below threshold",
+                 row.symbol, row.coverage_score)
+
+    ready = ~(no_panel | short | thin)
+    fq_start = []
+    for i in np.flatnonzero(ready):
+        row = batch.row(i)
+        try:
+            fq_start.append(quarter_date_range(row.fiscal_quarter, row.fiscal_quarter_end)[0])
+        except (KeyError, ValueError) as e:
+            log.error("  ❌ %s — bad fiscal_quarter %r: %s", row.symbol, row.fiscal_quarter, e)
+            ready[i] = False
+    return batch.filter(ready), fq_start
+
 # ─── Model runner ─────────────────────────────────────────────────────────────
 
-def run_nowcast_model(panel: PanelSummary,
-                      consensus: ConsensusRow,
-                      fq_start: date) -> NowcastResult:
+def run_nowcast_model(batch: RecordBatch, fq_start) -> RecordBatch:
+    """Nowcast every row of a consensus + panel batch; fq_start aligned to it."""
     completion_pct, weeks_remaining = compute_quarter_completion(
-        fq_start, consensus.fiscal_quarter_end
+        np.asarray(fq_start, dtype="datetime64[D]"),
+        batch["fiscal_quarter_end"].astype("datetime64[D]"),
     )
+    coverage = batch["coverage_score"]
+    panel_growth = batch["yoy_growth_pct"]
+    consensus_growth = np.nan_to_num(batch["consensus_revenue_growth_pct"])
+    prior_rev = prior_year_revenue(batch["consensus_revenue_usd"], consensus_growth)
 
     # Choose method: seasonal if we have YoY data, linear otherwise
-    if panel.yoy_growth_pct is not None and panel.coverage_score >= 0.3:
-        method = "SEASONAL_ADJ"
-        nowcast, low, high = seasonal_adj_extrapolation(
-            panel, completion_pct, consensus
+    seasonal = batch.valid("yoy_growth_pct") & (coverage >= 0.3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lin = linear_qtd_extrapolation(batch["qtd_spend_usd"], completion_pct)
+        sea = seasonal_adj_extrapolation(np.nan_to_num(panel_growth), coverage,
+                                         completion_pct, prior_rev, consensus_growth)
+        nowcast, low, high = (np.where(seasonal, s, l) for s, l in zip(sea, lin))
+
+        # Growth implied by our nowcast vs prior year
+        nowcast_growth = np.round(
+            np.where(prior_rev != 0, (nowcast - prior_rev) / prior_rev * 100, 0.0), 4
         )
-    else:
-        method = "LINEAR_QTD"
-        nowcast, low, high = linear_qtd_extrapolation(panel, completion_pct)
-
-    # Growth implied by our nowcast vs prior year
-    consensus_growth = consensus.consensus_revenue_growth_pct or 0.0
-    prior_rev = consensus.consensus_revenue_usd / (1 + consensus_growth / 100) \
-        if consensus_growth != -100 else consensus.consensus_revenue_usd
-    nowcast_growth = round(
-        ((nowcast - prior_rev) / prior_rev * 100) if prior_rev else 0.0, 4
-    )
 
     # Surprise = our growth estimate minus consensus growth estimate
-    nowcast_surprise = round(nowcast_growth - consensus_growth, 4)
+    nowcast_surprise = np.round(nowcast_growth - consensus_growth, 4)
 
     prediction, confidence, conf_label = determine_prediction(
-        nowcast_surprise, panel.coverage_score, completion_pct
+        nowcast_surprise, coverage, completion_pct
     )
 
-    return NowcastResult(
+    return batch.with_columns(
         nowcast_revenue_usd=nowcast,
         nowcast_growth_pct=nowcast_growth,
         nowcast_surprise_pct=nowcast_surprise,
@@ -307,7 +307,7 @@ def run_nowcast_model(panel: PanelSummary,
         nowcast_revenue_high=high,
         quarter_completion_pct=completion_pct,
         weeks_remaining=weeks_remaining,
-        method=method,
+        method=np.where(seasonal, "SEASONAL_ADJ", "LINEAR_QTD").astype(object),
         prediction=prediction,
         confidence_score=confidence,
         confidence_label=conf_label,
@@ -315,34 +315,32 @@ def run_nowcast_model(panel: PanelSummary,
 
 # ─── DB writes ────────────────────────────────────────────────────────────────
 
-async def write_nowcast_and_prediction(conn, panel: PanelSummary,
-                                        consensus: ConsensusRow,
-                                        result: NowcastResult) -> uuid.UUID:
+async def write_nowcast_and_prediction(conn, row: Row) -> uuid.UUID:
     """Atomic write: nowcast run + prediction. Supersedes prior active prediction."""
     nowcast_id   = uuid.uuid4()
     prediction_id = uuid.uuid4()
     days_to_earnings = (
-        (consensus.earnings_date - date.today()).days
-        if consensus.earnings_date else None
+        (row.earnings_date - date.today()).days
+        if row.earnings_date else None
     )
 
     inputs = {
-        "symbol": panel.symbol,
-        "fiscal_quarter": panel.fiscal_quarter,
-        "panel_weeks_used": panel.weeks_used,
-        "panel_qtd_spend_usd": panel.qtd_spend_usd,
-        "panel_yoy_growth_pct": panel.yoy_growth_pct,
-        "panel_coverage_score": panel.coverage_score,
-        "consensus_revenue_usd": consensus.consensus_revenue_usd,
-        "consensus_growth_pct": consensus.consensus_revenue_growth_pct,
-        "method": result.method,
+        "symbol": row.symbol,
+        "fiscal_quarter": row.fiscal_quarter,
+        "panel_weeks_used": row.weeks_used,
+        "panel_qtd_spend_usd": row.qtd_spend_usd,
+        "panel_yoy_growth_pct": row.yoy_growth_pct,
+        "panel_coverage_score": row.coverage_score,
+        "consensus_revenue_usd": row.consensus_revenue_usd,
+        "consensus_growth_pct": row.consensus_revenue_growth_pct,
+        "method": row.method,
     }
     outputs = {
         "nowcast_id": str(nowcast_id),
-        "nowcast_revenue_usd": result.nowcast_revenue_usd,
-        "nowcast_surprise_pct": result.nowcast_surprise_pct,
-        "prediction": result.prediction,
-        "confidence_score": result.confidence_score,
+        "nowcast_revenue_usd": row.nowcast_revenue_usd,
+        "nowcast_surprise_pct": row.nowcast_surprise_pct,
+        "prediction": row.prediction,
+        "confidence_score": row.confidence_score,
     }
 
     async with conn.transaction():
@@ -367,15 +365,15 @@ async def write_nowcast_and_prediction(conn, panel: PanelSummary,
                 $21,$22,$23
             )
             """,
-            nowcast_id, panel.symbol, panel.fiscal_quarter, WORKER_VERSION,
-            panel.weeks_used, panel.qtd_spend_usd, panel.yoy_growth_pct,
-            panel.user_count, panel.coverage_score,
-            consensus.consensus_id, consensus.consensus_revenue_usd,
-            consensus.consensus_revenue_growth_pct,
-            result.nowcast_revenue_usd, result.nowcast_growth_pct,
-            result.nowcast_surprise_pct, result.nowcast_revenue_low,
-            result.nowcast_revenue_high,
-            result.method, result.quarter_completion_pct, result.weeks_remaining,
+            nowcast_id, row.symbol, row.fiscal_quarter, WORKER_VERSION,
+            row.weeks_used, row.qtd_spend_usd, row.yoy_growth_pct,
+            row.user_count, row.coverage_score,
+            row.consensus_id, row.consensus_revenue_usd,
+            row.consensus_revenue_growth_pct,
+            row.nowcast_revenue_usd, row.nowcast_growth_pct,
+            row.nowcast_surprise_pct, row.nowcast_revenue_low,
+            row.nowcast_revenue_high,
+            row.method, row.quarter_completion_pct, row.weeks_remaining,
             sha256_of(inputs), sha256_of(outputs),
             json.dumps(inputs, default=str),
         )
@@ -391,7 +389,7 @@ async def write_nowcast_and_prediction(conn, panel: PanelSummary,
               AND fiscal_quarter = $3
               AND status         = 'ACTIVE'
             """,
-            prediction_id, panel.symbol, panel.fiscal_quarter,
+            prediction_id, row.symbol, row.fiscal_quarter,
         )
 
         # 3. Write new prediction
@@ -404,30 +402,31 @@ async def write_nowcast_and_prediction(conn, panel: PanelSummary,
                 status, days_to_earnings, meta
             ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,'ACTIVE',$11,$12)
             """,
-            prediction_id, nowcast_id, panel.symbol, panel.fiscal_quarter,
-            consensus.earnings_date, result.prediction, result.nowcast_revenue_usd,
-            result.nowcast_surprise_pct, result.confidence_score,
-            result.confidence_label, days_to_earnings,
+            prediction_id, nowcast_id, row.symbol, row.fiscal_quarter,
+            row.earnings_date, row.prediction, row.nowcast_revenue_usd,
+            row.nowcast_surprise_pct, row.confidence_score,
+            row.confidence_label, days_to_earnings,
             json.dumps({"model_version": WORKER_VERSION,
-                        "method": result.method}, default=str),
+                        "method": row.method}, default=str),
         )
 
     return prediction_id
 
-async def write_signal(conn, panel: PanelSummary, consensus: ConsensusRow,
-                        result: NowcastResult, prediction_id: uuid.UUID) -> Optional[uuid.UUID]:
+async def write_signal(conn, row: Row, prediction_id: uuid.UUID) -> Optional[uuid.UUID]:
     """Fire a signal into truth.signals_v1 for BEAT/STRONG_BEAT/MISS/STRONG_MISS."""
-    if result.prediction == "IN_LINE":
+    if row.prediction == "IN_LINE":
         return None
-    if result.confidence_score < MIN_CONFIDENCE:
+    if row.confidence_score < MIN_CONFIDENCE:
         log.info("    ⏭  %s confidence %.2f below threshold — no signal",
-                 panel.symbol, result.confidence_score)
+                 row.symbol, row.confidence_score)
         return None
 
-    side = "LONG" if result.prediction in ("BEAT", "STRONG_BEAT") else "SHORT"
+    side = "LONG" if row.prediction in ("BEAT", "STRONG_BEAT") else "SHORT"
     signal_id = uuid.uuid4()
 
-    # Stub entry price — replace with live Alpaca quote
+    # Stub entry price — replace with live Alpaca quote. market_board only
+    # carries ops_worker's Binance symbols; read it here once equities are
+    # published there.
     entry_price = 100.0
     atr_proxy   = 0.015
     stop   = round(entry_price * (1 - atr_proxy) if side == "LONG"
@@ -446,16 +445,16 @@ async def write_signal(conn, panel: PanelSummary, consensus: ConsensusRow,
             ON CONFLICT (signal_id) DO NOTHING
             """,
             signal_id,
-            f"EARNINGS_NOWCAST_{result.prediction}_v1",
-            panel.symbol,
+            f"EARNINGS_NOWCAST_{row.prediction}_v1",
+            row.symbol,
             side,
             "FUNDAMENTAL_REVENUE",
             entry_price, stop, target,
-            result.confidence_score,
+            row.confidence_score,
             json.dumps({
-                "prediction": result.prediction,
-                "surprise_pct": result.nowcast_surprise_pct,
-                "earnings_date": str(consensus.earnings_date),
+                "prediction": row.prediction,
+                "surprise_pct": row.nowcast_surprise_pct,
+                "earnings_date": str(row.earnings_date),
                 "prediction_id": str(prediction_id),
                 "worker": WORKER_VERSION,
             }),
@@ -492,81 +491,72 @@ async def run_once(pool: asyncpg.Pool) -> None:
     predictions_written = 0
     signals_fired = 0
 
-    async with pool.acquire() as conn:
-        consensus_rows = await fetch_upcoming_consensus(conn)
-        log.info("📅 %d symbols with upcoming earnings", len(consensus_rows))
+    tracer = QueryTracer(WORKER_VERSION, run_id)
+    async with metrics.acquire(pool, WORKER_VERSION) as raw:
+        conn = tracer.wrap(raw)
+        consensus = await fetch_upcoming_consensus(conn)
+        ROWS.labels("market.earnings_consensus_v1", "read").inc(len(consensus))
+        log.info("📅 %d symbols with upcoming earnings", len(consensus))
 
         regime = await get_vol_regime(conn)
         if regime == "HIGH":
             log.warning("🚫 Vol regime HIGH — suppressing all signals this run")
 
-        for consensus in consensus_rows:
-            try:
-                panel = await fetch_panel_summary(
-                    conn, consensus.symbol, consensus.fiscal_quarter
-                )
-                if not panel:
-                    log.info("  ⏭  %s — no panel data yet", consensus.symbol)
-                    continue
-                if panel.weeks_used < MIN_PANEL_WEEKS:
-                    log.info("  ⏭  %s — only %d weeks of panel (need %d)",
-                             consensus.symbol, panel.weeks_used, MIN_PANEL_WEEKS)
-                    continue
-                if panel.coverage_score < MIN_COVERAGE_SCORE:
-                    log.info("  ⏭  %s — coverage %.2f below threshold",
-                             consensus.symbol, panel.coverage_score)
-                    continue
-
-                fq_start, _ = quarter_date_range(
-                    consensus.fiscal_quarter, consensus.fiscal_quarter_end
-                )
-                result = run_nowcast_model(panel, consensus, fq_start)
+        results = RecordBatch({})
+        if consensus:
+            ready, fq_start = select_ready(await fetch_panel_summaries(conn, consensus))
+            if ready:
+                results = run_nowcast_model(ready, fq_start)
 
-                prediction_id = await write_nowcast_and_prediction(
-                    conn, panel, consensus, result
-                )
+        for row in results:
+            t0 = time.perf_counter()
+            try:
+                prediction_id = await write_nowcast_and_prediction(conn, row)
                 predictions_written += 1
+                ROWS.labels("market.earnings_predictions_v1", "write").inc()
 
                 log.info(
                     "  📈 %s %s → %s (surprise %.2f%%, conf %.2f, method=%s)",
-                    consensus.symbol, consensus.fiscal_quarter,
-                    result.prediction, result.nowcast_surprise_pct,
-                    result.confidence_score, result.method,
+                    row.symbol, row.fiscal_quarter,
+                    row.prediction, row.nowcast_surprise_pct,
+                    row.confidence_score, row.method,
                 )
 
                 if regime != "HIGH":
-                    sig_id = await write_signal(
-                        conn, panel, consensus, result, prediction_id
-                    )
+                    sig_id = await write_signal(conn, row, prediction_id)
                     if sig_id:
                         signals_fired += 1
+                        ROWS.labels("truth.signals_v1", "write").inc()
                         log.info("    🔔 Signal fired → %s", sig_id)
 
             except Exception as e:
                 log.error("  ❌ %s — failed: %s",
-                          consensus.symbol, e, exc_info=True)
+                          row.symbol, e, exc_info=True)
+            finally:
+                SYMBOL_SECONDS.labels(WORKER_VERSION).observe(time.perf_counter() - t0)
 
         await log_run(conn, run_id, "COMPLETED", {
-            "symbols_evaluated": len(consensus_rows),
+            "symbols_evaluated": len(consensus),
             "predictions_written": predictions_written,
             "signals_fired": signals_fired,
             "vol_regime": regime,
+            "db": tracer.summary(),
         })
 
     log.info("✅ Run complete — %d predictions, %d signals",
              predictions_written, signals_fired)
 
 async def main() -> None:
-    log.info("🚀 earnings_nowcast_worker starting (poll=%ds)", POLL_INTERVAL_SECS)
-    pool = await asyncpg.create_pool(DB_URL, min_size=1, max_size=3)
+    log.info("🚀 earnings_nowcast_worker starting (schedule=%r)", SCHEDULE)
+    metrics.serve()
+    pool = await db.create_pool(WORKER_VERSION, session=True, numeric_as_float=True)
+    job = ScheduledJob(WORKER_VERSION, SCHEDULE, fresh_for=FRESH_FOR)
     try:
-        while True:
-            try:
-                await run_once(pool)
-            except Exception as e:
-                log.error("Run failed: %s — retrying next cycle", e, exc_info=True)
-            log.info("💤 Sleeping %ds", POLL_INTERVAL_SECS)
-            await asyncio.sleep(POLL_INTERVAL_SECS)
+        await run_async(
+            job,
+            lambda: run_once(pool),
+            lambda: last_success_pg(pool, WORKER_VERSION),
+        )
     finally:
         await pool.close()
 
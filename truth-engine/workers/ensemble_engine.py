@@ -0,0 +1,374 @@
+"""
+ensemble_engine.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Ensemble Engine
+
+Runbook step 3: signals.signal_daily → models.ensemble_output_daily for a
+versioned ensemble (models.ensemble_versions / models.ensemble_members).
+
+For a date range the engine loads every member signal as one
+date × symbol × signal array, looks up each date's regime, and scores
+every (date, symbol) in a single contraction against the regime's weight
+vector:
+
+    score[d, s]    = Σ_k  X[d, s, k] · W[regime[d], k]     (missing X → 0)
+    coverage[d, s] = Σ_k  present[d, s, k] · W[regime[d], k]
+
+Weights are fixed per (version, regime) — a signal missing for a symbol
+contributes nothing and lowers `coverage`; weights are never renormalised.
+Output is written per chunk of CHUNK_DAYS with binary COPY into a staging
+table and one INSERT … ON CONFLICT, so a multi-year backfill is a handful
+of round trips per chunk.
+
+Tables (column names as used here):
+  signals.signal_daily        signal_name, signal_version, asof_date, symbol_id, value
+  signals.regime_daily        asof_date, regime          (BULL | BEAR | NEUTRAL | HIGH_VOL)
+  models.ensemble_versions    model_version
+  models.ensemble_members     model_version, regime, signal_name, signal_version, weight
+  models.ensemble_output_daily
+      model_version, asof_date, symbol_id, regime, score, coverage, n_signals, computed_at
+      unique (model_version, asof_date, symbol_id)
+
+Canon compliance (Signal Canon v1):
+  - Weights are regime-dependent and MUST sum to 1.0 for every canon regime —
+    a version that fails is rejected before anything is read or written
+  - Disabled / absent members have zero weight
+  - A date with no regime classification is skipped, never defaulted
+  - ensemble_v1 is frozen: existing rows are never rewritten (ON CONFLICT DO NOTHING)
+  - Deterministic: same inputs → same scores
+  - Hosted by supervisor.py (non-critical); scheduled via scheduler.py
+  - Full provenance via ingest_run_log_v1 (meta.db = per-statement timings)
+
+    python workers/ensemble_engine.py                                  # scheduled daily
+    python workers/ensemble_engine.py --backfill 2016-01-01 2026-10-16 --version ensemble_v2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+import asyncpg
+
+import db
+import metrics
+from db_trace import QueryTracer
+from lazy import lazy_import
+from metrics import ROWS
+from scheduler import CronSchedule, ScheduledJob, last_success_pg, run_async
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [ensemble_engine] %(levelname)s %(message)s",
+)
+log = logging.getLogger(__name__)
+
+np = lazy_import("numpy")
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+
+WORKER_VERSION      = "ensemble_engine_v1"
+SCHEDULE            = CronSchedule("30 6 * * 1-5", "America/New_York")   # after signals, before sizing
+FRESH_FOR           = timedelta(hours=12)
+MODEL_VERSION       = os.getenv("ENSEMBLE_VERSION", "ensemble_v2")
+FROZEN_VERSIONS     = {"ensemble_v1"}
+REGIMES             = ("BULL", "BEAR", "NEUTRAL", "HIGH_VOL")   # Signal Canon v1
+WEIGHT_TOLERANCE    = 1e-9
+DAILY_LOOKBACK_DAYS = 5       # rescore recent days — late signals land here
+CHUNK_DAYS          = 120     # dates per tensor / COPY
+
+OUTPUT_COLUMNS = (
+    "model_version", "asof_date", "symbol_id", "regime",
+    "score", "coverage", "n_signals", "computed_at",
+)
+
+# ─── Weights ──────────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class WeightTable:
+    model_version: str
+    regimes: tuple[str, ...]
+    members: tuple[tuple[str, str], ...]     # (signal_name, signal_version), column order of weights
+    weights: "np.ndarray"                    # len(regimes) × len(members)
+
+    def index(self, regime: str) -> int:
+        return self.regimes.index(regime) if regime in self.regimes else -1
+
+
+async def load_weights(conn, model_version: str) -> WeightTable:
+    if not await conn.fetchval(
+        "SELECT 1 FROM models.ensemble_versions WHERE model_version = $1", model_version
+    ):
+        raise ValueError(f"{model_version} is not registered in models.ensemble_versions")
+
+    cols = await db.fetch_columns(
+        conn,
+        """
+        SELECT regime, signal_name, signal_version::text AS signal_version,
+               weight::float8 AS weight
+        FROM models.ensemble_members
+        WHERE model_version = $1
+        """,
+        model_version,
+    )
+    if not cols:
+        raise ValueError(f"{model_version} has no rows in models.ensemble_members")
+
+    regimes = tuple(sorted(set(cols["regime"])))
+    members = tuple(sorted(set(zip(cols["signal_name"], cols["signal_version"]))))
+    weights = np.zeros((len(regimes), len(members)))
+    for regime, name, version, w in zip(cols["regime"], cols["signal_name"],
+                                        cols["signal_version"], cols["weight"]):
+        weights[regimes.index(regime), members.index((name, version))] += w or 0.0
+    return WeightTable(model_version, regimes, members, weights)
+
+
+def validate_weights(wt: WeightTable) -> None:
+    """Signal Canon: one weight vector per canon regime, each summing to 1.0."""
+    problems = [f"no weights for regime {r}" for r in REGIMES if r not in wt.regimes]
+    problems += [f"unknown regime {r}" for r in wt.regimes if r not in REGIMES]
+    sums = wt.weights.sum(axis=1)
+    problems += [
+        f"{r} weights sum to {s:.12f}"
+        for r, s in zip(wt.regimes, sums)
+        if abs(s - 1.0) > WEIGHT_TOLERANCE
+    ]
+    if not np.isfinite(wt.weights).all():
+        problems.append("non-finite weight")
+    if problems:
+        raise ValueError(f"{wt.model_version} violates the weight-sum invariant: " + "; ".join(problems))
+
+# ─── Inputs ───────────────────────────────────────────────────────────────────
+
+async def load_regimes(conn, wt: WeightTable, start: date, n_days: int) -> "np.ndarray":
+    """Weight-row index per day of [start, start + n_days); -1 = no regime, -2 = unknown label."""
+    cols = await db.fetch_columns(
+        conn,
+        """
+        SELECT (asof_date - $1::date) AS d, regime
+        FROM signals.regime_daily
+        WHERE asof_date >= $1 AND asof_date < $1::date + $2::int
+        """,
+        start, n_days,
+    )
+    out = np.full(n_days, -1, dtype=np.int64)
+    for d, regime in zip(cols.get("d", []), cols.get("regime", [])):
+        i = wt.index(regime)
+        out[d] = i if i >= 0 else -2
+    return out
+
+
+async def load_signal_tensor(conn, wt: WeightTable, start: date,
+                             n_days: int) -> tuple[list, "np.ndarray"]:
+    """(symbol_ids, X[date, symbol, member]) with NaN where a signal is missing."""
+    names = [m[0] for m in wt.members]
+    versions = [m[1] for m in wt.members]
+    symbols = (await db.fetch_columns(
+        conn,
+        """
+        SELECT DISTINCT symbol_id
+        FROM signals.signal_daily
+        WHERE asof_date >= $1 AND asof_date < $1::date + $2::int
+          AND signal_name = ANY($3::text[])
+        ORDER BY symbol_id
+        """,
+        start, n_days, names,
+    )).get("symbol_id", [])
+    X = np.full((n_days, len(symbols), len(wt.members)), np.nan)
+    if not symbols:
+        return symbols, X
+
+    cols = await db.fetch_columns(
+        conn,
+        """
+        SELECT (s.asof_date - $1::date)   AS d,
+               (sym.ord - 1)::int         AS s,
+               (m.ord - 1)::int           AS k,
+               s.value::float8            AS value
+        FROM signals.signal_daily s
+        JOIN unnest($3::text[], $4::text[]) WITH ORDINALITY AS m(signal_name, signal_version, ord)
+          ON s.signal_name = m.signal_name AND s.signal_version::text = m.signal_version
+        JOIN unnest($5::uuid[]) WITH ORDINALITY AS sym(symbol_id, ord)
+          ON s.symbol_id = sym.symbol_id
+        WHERE s.asof_date >= $1 AND s.asof_date < $1::date + $2::int
+        """,
+        start, n_days, names, versions, symbols,
+        numpy=True,
+    )
+    if cols:
+        X[cols["d"], cols["s"], cols["k"]] = cols["value"]
+        ROWS.labels("signals.signal_daily", "read").inc(len(cols["d"]))
+    return symbols, X
+
+# ─── Scoring ──────────────────────────────────────────────────────────────────
+
+def ensemble_scores(X: "np.ndarray", W_d: "np.ndarray") -> tuple:
+    """
+    X: date × symbol × member (NaN = missing); W_d: date × member weights.
+    Returns (score, coverage, n_signals), each date × symbol.
+    """
+    present = ~np.isnan(X)
+    stacked = np.stack([np.where(present, X, 0.0), present.astype(np.float64)])
+    score, coverage = np.einsum("ndsk,dk->nds", stacked, W_d, optimize=True)
+    return score, coverage, present.sum(axis=2)
+
+# ─── Output ───────────────────────────────────────────────────────────────────
+
+async def write_output(conn, model_version: str, records: list[tuple]) -> int:
+    """COPY into a staging table, then one upsert (insert-only for frozen versions)."""
+    if not records:
+        return 0
+    cols = ", ".join(OUTPUT_COLUMNS)
+    if model_version in FROZEN_VERSIONS:
+        conflict = "DO NOTHING"
+    else:
+        conflict = "DO UPDATE SET " + ", ".join(
+            f"{c} = EXCLUDED.{c}" for c in OUTPUT_COLUMNS[3:]
+        )
+    # ON COMMIT DROP keeps the staging table inside one transaction, so
+    # this is safe behind the transaction pooler.
+    async with conn.transaction():
+        await conn.execute(
+            "CREATE TEMP TABLE stage_ensemble_output (LIKE models.ensemble_output_daily) ON COMMIT DROP"
+        )
+        await conn.copy_records_to_table(
+            "stage_ensemble_output", columns=OUTPUT_COLUMNS, records=records,
+        )
+        status = await conn.execute(
+            f"""
+            INSERT INTO models.ensemble_output_daily ({cols})
+            SELECT {cols} FROM stage_ensemble_output
+            ON CONFLICT (model_version, asof_date, symbol_id) {conflict}
+            """
+        )
+    return int(status.split()[-1])
+
+
+async def score_range(conn, wt: WeightTable, start: date, end: date) -> dict:
+    """Score and write [start, end] chunk by chunk; returns counts for the run log."""
+    stats = {"days": 0, "days_no_regime": 0, "days_unknown_regime": 0,
+             "rows_scored": 0, "rows_written": 0}
+    computed_at = datetime.now(timezone.utc)
+    chunk_start = start
+    while chunk_start <= end:
+        t0 = time.perf_counter()
+        n_days = min(CHUNK_DAYS, (end - chunk_start).days + 1)
+        regime_idx = await load_regimes(conn, wt, chunk_start, n_days)
+        symbols, X = await load_signal_tensor(conn, wt, chunk_start, n_days)
+
+        has_data = ~np.isnan(X).all(axis=(1, 2)) if symbols else np.zeros(n_days, dtype=bool)
+        stats["days"] += int(has_data.sum())
+        stats["days_no_regime"] += int((has_data & (regime_idx == -1)).sum())
+        stats["days_unknown_regime"] += int((has_data & (regime_idx == -2)).sum())
+        for d in np.flatnonzero(has_data & (regime_idx < 0)):
+            log.warning("  ⏭  %s — %s, not scored", chunk_start + timedelta(days=int(d)),
+                        "no regime classification" if regime_idx[d] == -1 else "regime has no weights")
+
+        written = 0
+        if symbols:
+            ok = regime_idx >= 0
+            W_d = np.where(ok[:, None], wt.weights[np.maximum(regime_idx, 0)], 0.0)
+            score, coverage, n_signals = ensemble_scores(X, W_d)
+            d_idx, s_idx = np.nonzero(ok[:, None] & (n_signals > 0))
+            dates = [chunk_start + timedelta(days=i) for i in range(n_days)]
+            regimes = wt.regimes
+            records = list(zip(
+                [wt.model_version] * len(d_idx),
+                [dates[d] for d in d_idx.tolist()],
+                [symbols[s] for s in s_idx.tolist()],
+                [regimes[r] for r in regime_idx[d_idx].tolist()],
+                map(repr, score[d_idx, s_idx].tolist()),       # numeric: shortest repr, as ops_worker
+                map(repr, coverage[d_idx, s_idx].tolist()),
+                n_signals[d_idx, s_idx].tolist(),
+                [computed_at] * len(d_idx),
+            ))
+            written = await write_output(conn, wt.model_version, records)
+            stats["rows_scored"] += len(records)
+            stats["rows_written"] += written
+            ROWS.labels("models.ensemble_output_daily", "write").inc(written)
+
+        log.info("  ✅ %s → %s — %d symbols, %d rows in %.2fs",
+                 chunk_start, chunk_start + timedelta(days=n_days - 1),
+                 len(symbols), written, time.perf_counter() - t0)
+        chunk_start += timedelta(days=n_days)
+    return stats
+
+
+async def log_run(conn, run_id: uuid.UUID, status: str, meta: dict) -> None:
+    await conn.execute(
+        """
+        INSERT INTO market.ingest_run_log_v1
+            (ingest_run_id, source_name, run_status, meta, completed_at)
+        VALUES ($1,$2,$3,$4,now())
+        ON CONFLICT DO NOTHING
+        """,
+        run_id, WORKER_VERSION, status, json.dumps(meta, default=str),
+    )
+
+# ─── Main loop ────────────────────────────────────────────────────────────────
+
+async def run_once(pool: asyncpg.Pool, model_version: str = MODEL_VERSION,
+                   start: date = None, end: date = None) -> dict:
+    run_id = uuid.uuid4()
+    end = end or date.today()
+    start = start or end - timedelta(days=DAILY_LOOKBACK_DAYS - 1)
+    log.info("⚡ ensemble_engine — %s %s → %s", model_version, start, end)
+
+    tracer = QueryTracer(WORKER_VERSION, run_id)
+    async with metrics.acquire(pool, WORKER_VERSION) as raw:
+        conn = tracer.wrap(raw)
+        wt = await load_weights(conn, model_version)
+        validate_weights(wt)
+        log.info("⚖️  %d members × %d regimes, weights sum to 1.0", len(wt.members), len(wt.regimes))
+
+        t0 = time.perf_counter()
+        stats = await score_range(conn, wt, start, end)
+        stats["seconds"] = round(time.perf_counter() - t0, 2)
+
+        await log_run(conn, run_id, "COMPLETED", {
+            "model_version": model_version,
+            "start": start, "end": end,
+            "members": [f"{n}:{v}" for n, v in wt.members],
+            **stats,
+            "db": tracer.summary(),
+        })
+
+    log.info("✅ Run complete — %d rows over %d days in %.1fs",
+             stats["rows_written"], stats["days"], stats["seconds"])
+    return stats
+
+async def main() -> None:
+    log.info("🚀 ensemble_engine starting (schedule=%r, version=%s)", SCHEDULE, MODEL_VERSION)
+    metrics.serve()
+    pool = await db.create_pool(WORKER_VERSION, session=True)
+    job = ScheduledJob(WORKER_VERSION, SCHEDULE, fresh_for=FRESH_FOR)
+    try:
+        await run_async(
+            job,
+            lambda: run_once(pool),
+            lambda: last_success_pg(pool, WORKER_VERSION),
+        )
+    finally:
+        await pool.close()
+
+async def backfill(model_version: str, start: date, end: date) -> None:
+    pool = await db.create_pool(WORKER_VERSION, session=True)
+    try:
+        await run_once(pool, model_version, start, end)
+    finally:
+        await pool.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backfill", nargs=2, metavar=("START", "END"), type=date.fromisoformat)
+    ap.add_argument("--version", default=MODEL_VERSION)
+    args = ap.parse_args()
+    if args.backfill:
+        asyncio.run(backfill(args.version, *args.backfill))
+    else:
+        asyncio.run(main())
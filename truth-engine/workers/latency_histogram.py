@@ -0,0 +1,90 @@
+"""
+latency_histogram.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — HDR-style Latency Histogram
+
+Log-linear buckets over integer microseconds: values below 2·SUB are
+exact, above that every power of two is split into SUB linear
+sub-buckets, so any recorded value is reported within 1/SUB (~3%).
+record() is a bit_length, a shift and an array increment — no
+allocation — so it is safe on the ops_worker hot path.
+
+Values above max_us are clamped into the top bucket; negative values
+(exchange clock ahead of ours) are clamped to 0 and counted.
+"""
+
+from array import array
+
+SUB_BITS = 5
+SUB      = 1 << SUB_BITS         # 32 sub-buckets per power of two
+SUB2     = SUB << 1
+
+
+def _index(v: int) -> int:
+    if v < SUB2:
+        return v
+    shift = v.bit_length() - SUB_BITS - 1
+    return SUB2 + (shift - 1) * SUB + (v >> shift) - SUB
+
+
+def _upper(idx: int) -> int:
+    """Highest value that maps to bucket idx."""
+    if idx < SUB2:
+        return idx
+    k = idx - SUB2
+    shift = k // SUB + 1
+    return ((k % SUB + SUB + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self, name: str, max_us: int = 60_000_000):
+        self.name     = name
+        self.max_us   = max_us
+        self.counts   = array("q", bytes(8 * (_index(max_us) + 1)))
+        self.total    = 0
+        self.sum_us   = 0
+        self.max_seen = 0
+        self.negative = 0
+
+    def record(self, v_us: int):
+        if v_us < 0:
+            self.negative += 1
+            v_us = 0
+        elif v_us > self.max_us:
+            v_us = self.max_us
+        self.counts[_index(v_us)] += 1
+        self.total += 1
+        self.sum_us += v_us
+        if v_us > self.max_seen:
+            self.max_seen = v_us
+
+    def percentile(self, q: float) -> int:
+        if not self.total:
+            return 0
+        target = max(1, int(q / 100.0 * self.total + 0.5))
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= target:
+                    return min(_upper(idx), self.max_seen)
+        return self.max_seen
+
+    def summary(self) -> dict:
+        return {
+            "count":   self.total,
+            "mean_us": round(self.sum_us / self.total, 1) if self.total else 0,
+            "p50_us":  self.percentile(50),
+            "p90_us":  self.percentile(90),
+            "p99_us":  self.percentile(99),
+            "p999_us": self.percentile(99.9),
+            "max_us":  self.max_seen,
+            "negative": self.negative,
+        }
+
+    def reset(self):
+        self.counts   = array("q", bytes(8 * len(self.counts)))
+        self.total    = 0
+        self.sum_us   = 0
+        self.max_seen = 0
+        self.negative = 0
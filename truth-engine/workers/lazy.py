@@ -0,0 +1,80 @@
+"""
+lazy.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Deferred Imports and Clients
+
+Worker modules should import in milliseconds: the supervisor imports
+every worker it hosts, and bench/profile_startup.py imports them to
+measure exactly this. Heavy dependencies (numpy, requests, supabase →
+httpx/pydantic) are bound with lazy_import() and only execute on first
+attribute access, and clients are built on first use from the
+environment instead of at import time.
+
+The lazy module is a proxy, not importlib.util.LazyLoader: on 3.11 a
+LazyLoader module is swapped to a plain module before it has executed,
+so a second thread touching it mid-load (cot_worker and trace_worker
+share np / requests) sees missing attributes. The proxy imports under
+_import_lock, then serves the real module's attributes.
+
+    np = lazy_import("numpy")               # loads on first np.<attr>
+    talib = lazy_import("talib", optional=True)   # ImportError only when used
+
+    supabase = supabase_client()            # one cached client per process
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+from types import ModuleType
+
+
+class _MissingModule(ModuleType):
+    def __getattr__(self, attr):
+        raise ImportError(
+            f"optional dependency '{self.__name__}' is not installed "
+            f"(pip install -r requirements.txt)"
+        )
+
+
+_import_lock = threading.RLock()     # re-entrant: a lazy import may touch another proxy
+
+
+class _LazyModule(ModuleType):
+    def __getattr__(self, attr):
+        module = self.__dict__.get("_lazy_module")
+        if module is None:
+            with _import_lock:
+                module = self.__dict__.get("_lazy_module")
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__.update(module.__dict__)   # later lookups skip __getattr__
+                    self.__dict__["_lazy_module"] = module
+        return getattr(module, attr)
+
+
+def lazy_import(name: str, optional: bool = False) -> ModuleType:
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        if optional:
+            return _MissingModule(name)
+        raise ImportError(f"No module named '{name}'")
+    return _LazyModule(name)
+
+
+_clients: dict = {}
+_clients_lock = threading.Lock()     # thread-hosted workers may race on first use
+
+
+def supabase_client():
+    """Service-role Supabase client, built on first call and shared per process."""
+    with _clients_lock:
+        client = _clients.get("supabase")
+        if client is None:
+            from supabase import create_client
+            client = _clients["supabase"] = create_client(
+                os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"],
+            )
+        return client
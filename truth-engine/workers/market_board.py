@@ -0,0 +1,299 @@
+"""
+market_board.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Shared-memory Market State Board
+
+ops_worker publishes, per symbol, the latest trade price, a rolling ATR
+and a vol regime into a fixed-layout POSIX shared-memory segment
+(/dev/shm/<MARKET_BOARD_NAME>). Any process on the host reads a symbol in
+a few microseconds with no database round trip:
+
+    board = BoardReader()
+    q = board.get("BTCUSDT", max_age_s=120)    # → Quote | None
+    q.price, q.atr, q.atr_pct, q.regime
+
+Layout (little-endian, one writer):
+
+  header  64 B   magic, version, n_slots, generation, retired
+  slot   128 B   seq u64 | symbol 16s | price f64 | ts_ms i64 | atr f64 |
+                 atr_pct f64 | vol_short f64 | vol_long f64 |
+                 bar_ts_ms i64 | regime u8
+
+Each slot is a seqlock: the writer bumps seq to odd, writes the payload,
+bumps it back to even. A reader retries while seq is odd or changed
+across its read, so it never sees a torn slot.
+
+  atr        Wilder ATR(14) over closed 1m bars, in price units
+  regime     EWMA stdev of 1m log returns, short (halflife 30 bars) vs
+             long (halflife 1 day): > 1.5× long = HIGH, < 0.67× = LOW,
+             else NORMAL; UNKNOWN until WARMUP_BARS bars have been seen
+
+A restarted writer retires the old segment (readers re-attach on their
+next get()) and creates a new one with a new generation.
+
+ops_worker only publishes with OPS_MARKET_BOARD=1. No worker reads the
+board yet: it carries ops_worker's Binance symbols, while the equity
+consumers (earnings_nowcast) need quotes nothing publishes here.
+"""
+
+import logging
+import math
+import os
+import struct
+import time
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple, Optional
+
+log = logging.getLogger("market_board")
+
+BOARD_NAME  = os.getenv("MARKET_BOARD_NAME", "noterminal_market_board")
+MAGIC       = b"NTBOARD1"
+VERSION     = 1
+HEADER      = struct.Struct("<8sIIQB")          # magic, version, n_slots, generation, retired
+HEADER_SIZE = 64
+SEQ         = struct.Struct("<Q")
+PAYLOAD     = struct.Struct("<16sdqddddqB")
+SLOT_SIZE   = 128
+REGIMES     = ("UNKNOWN", "LOW", "NORMAL", "HIGH")
+
+ATR_PERIOD       = 14
+ATR_TIMEFRAME_S  = 60
+SHORT_HALFLIFE   = 30            # bars
+LONG_HALFLIFE    = 1440
+WARMUP_BARS      = 60
+HIGH_RATIO       = 1.5
+LOW_RATIO        = 0.67
+READ_RETRIES     = 1000
+
+assert SEQ.size + PAYLOAD.size <= SLOT_SIZE
+
+_created: set[str] = set()      # segments this process owns (and its resource tracker unlinks)
+
+
+class Quote(NamedTuple):
+    symbol:    str
+    price:     float
+    ts_ms:     int
+    atr:       float            # 0.0 until ATR_PERIOD 1m bars
+    atr_pct:   float
+    regime:    str
+    bar_ts_ms: int
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.ts_ms / 1000
+
+
+def _slot_offset(slot: int) -> int:
+    return HEADER_SIZE + slot * SLOT_SIZE
+
+
+# ── Writer ───────────────────────────────────────────────────────────────
+
+class MarketBoard:
+    """Single writer (ops_worker). Per-symbol indicator state stays in process."""
+
+    def __init__(self, symbols: list[str], name: str = BOARD_NAME):
+        n = len(symbols)
+        self.name = name
+        self.n = n
+        _retire(name)
+        self.shm = shared_memory.SharedMemory(name, create=True, size=HEADER_SIZE + n * SLOT_SIZE)
+        _created.add(name)
+        self.buf = self.shm.buf
+        self.generation = time.time_ns()
+        self.symbols = [s.upper().encode()[:16] for s in symbols]
+
+        self.price     = array("d", bytes(8 * n))
+        self.ts_ms     = array("q", bytes(8 * n))
+        self.atr       = array("d", bytes(8 * n))
+        self.atr_pct   = array("d", bytes(8 * n))
+        self.prev_close = array("d", bytes(8 * n))
+        self.var_short = array("d", bytes(8 * n))
+        self.var_long  = array("d", bytes(8 * n))
+        self.bars_seen = array("q", bytes(8 * n))
+        self.returns   = array("q", bytes(8 * n))
+        self.bar_ts_ms = array("q", bytes(8 * n))
+        self.regime    = bytearray(n)
+        self._a_short  = 1 - 0.5 ** (1 / SHORT_HALFLIFE)
+        self._a_long   = 1 - 0.5 ** (1 / LONG_HALFLIFE)
+
+        for i in range(n):
+            self._write(i)
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, n, self.generation, 0)
+        log.info(f"📋 market board /dev/shm/{name}: {n} symbols, {HEADER_SIZE + n * SLOT_SIZE} bytes")
+
+    def _write(self, i: int):
+        buf, off = self.buf, _slot_offset(i)
+        seq = SEQ.unpack_from(buf, off)[0] + 1
+        SEQ.pack_into(buf, off, seq)                    # odd: write in progress
+        PAYLOAD.pack_into(
+            buf, off + SEQ.size, self.symbols[i], self.price[i], self.ts_ms[i],
+            self.atr[i] if self.bars_seen[i] >= ATR_PERIOD else 0.0, self.atr_pct[i],
+            math.sqrt(self._var(i, self.var_short, self._a_short)),
+            math.sqrt(self._var(i, self.var_long, self._a_long)),
+            self.bar_ts_ms[i], self.regime[i],
+        )
+        SEQ.pack_into(buf, off, seq + 1)
+
+    def publish_prices(self, price, ts_ms) -> int:
+        """Copy changed last prices (LastValueState arrays) into the board."""
+        changed = 0
+        mine = self.ts_ms
+        for i in range(self.n):
+            t = ts_ms[i]
+            if t != mine[i]:
+                self.price[i] = price[i]
+                mine[i] = t
+                self._write(i)
+                changed += 1
+        return changed
+
+    def on_bars(self, bars) -> None:
+        """Update ATR / regime from closed bars (bar_aggregator.Bar); other timeframes ignored."""
+        for b in bars:
+            if b.timeframe_s != ATR_TIMEFRAME_S or b.bucket_ms <= self.bar_ts_ms[b.slot]:
+                continue
+            i = b.slot
+            prev = self.prev_close[i]
+            n = self.bars_seen[i] = self.bars_seen[i] + 1
+            tr = b.high - b.low if prev <= 0 else max(b.high, prev) - min(b.low, prev)
+            if n <= ATR_PERIOD:
+                self.atr[i] += (tr - self.atr[i]) / n               # seed: simple mean
+            else:
+                self.atr[i] += (tr - self.atr[i]) / ATR_PERIOD      # Wilder smoothing
+            if prev > 0 and b.close > 0:
+                self.returns[i] += 1
+                r2 = math.log(b.close / prev) ** 2
+                self.var_short[i] += self._a_short * (r2 - self.var_short[i])
+                self.var_long[i]  += self._a_long * (r2 - self.var_long[i])
+            self.atr_pct[i] = self.atr[i] / b.close if n >= ATR_PERIOD and b.close > 0 else 0.0
+            self.regime[i] = self._classify(i, n)
+            self.prev_close[i] = b.close
+            self.bar_ts_ms[i] = b.bucket_ms
+            self._write(i)
+
+    def _var(self, i: int, ewma, alpha: float) -> float:
+        """EWMA variance with the zero-start bias removed."""
+        m = self.returns[i]
+        return ewma[i] / (1 - (1 - alpha) ** m) if m else 0.0
+
+    def _classify(self, i: int, n: int) -> int:
+        var_long = self._var(i, self.var_long, self._a_long)
+        if n < WARMUP_BARS or var_long <= 0:
+            return 0
+        ratio = math.sqrt(self._var(i, self.var_short, self._a_short) / var_long)
+        if ratio > HIGH_RATIO:
+            return 3
+        if ratio < LOW_RATIO:
+            return 1
+        return 2
+
+    def close(self):
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, self.n, self.generation, 1)
+        self.buf = None
+        self.shm.close()
+        _created.discard(self.name)
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _retire(name: str):
+    """Mark a leftover segment (crashed writer) retired and unlink it."""
+    try:
+        old = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+    try:
+        if bytes(old.buf[:8]) == MAGIC:
+            old.buf[HEADER.size - 1] = 1
+    finally:
+        old.close()
+        old.unlink()
+
+
+# ── Reader ───────────────────────────────────────────────────────────────
+
+class BoardReader:
+    """Attach lazily; re-attach when the writer restarts. Never raises on a missing board."""
+
+    def __init__(self, name: str = BOARD_NAME, retry_secs: float = 30.0):
+        self.name = name
+        self.retry_secs = retry_secs
+        self._shm = None
+        self._buf = None
+        self._index: dict[str, int] = {}
+        self._next_attach = 0.0
+
+    def _attach(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_attach:
+            return False
+        self._next_attach = now + self.retry_secs
+        try:
+            shm = shared_memory.SharedMemory(self.name)
+        except FileNotFoundError:
+            return False
+        # Attaching registers the segment with this process's resource
+        # tracker, which would unlink it at exit — unless we are the writer.
+        if self.name not in _created:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        magic, version, n, _, retired = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != VERSION or retired:
+            shm.close()
+            return False
+        index = {}
+        for i in range(n):
+            sym = PAYLOAD.unpack_from(shm.buf, _slot_offset(i) + SEQ.size)[0]
+            index[sym.rstrip(b"\0").decode()] = i
+        self._shm, self._buf, self._index = shm, shm.buf, index
+        return True
+
+    def _detach(self):
+        if self._shm is not None:
+            self._buf = None
+            self._index = {}
+            try:
+                self._shm.close()
+            except BufferError:
+                pass
+            self._shm = None
+        self._next_attach = 0.0
+
+    def symbols(self) -> list[str]:
+        if self._buf is None and not self._attach():
+            return []
+        return list(self._index)
+
+    def get(self, symbol: str, max_age_s: Optional[float] = None) -> Optional[Quote]:
+        if self._buf is None and not self._attach():
+            return None
+        buf = self._buf
+        if buf[HEADER.size - 1]:                     # writer restarted
+            self._detach()
+            if not self._attach():
+                return None
+            buf = self._buf
+        i = self._index.get(symbol.upper())
+        if i is None:
+            return None
+        off = _slot_offset(i)
+        for _ in range(READ_RETRIES):
+            s1 = SEQ.unpack_from(buf, off)[0]
+            if s1 & 1:
+                continue
+            fields = PAYLOAD.unpack_from(buf, off + SEQ.size)
+            if SEQ.unpack_from(buf, off)[0] == s1:
+                break
+        else:
+            return None
+        sym, price, ts_ms, atr, atr_pct, _, _, bar_ts_ms, regime = fields
+        if ts_ms == 0:
+            return None
+        q = Quote(sym.rstrip(b"\0").decode(), price, ts_ms, atr, atr_pct, REGIMES[regime], bar_ts_ms)
+        if max_age_s is not None and q.age_s > max_age_s:
+            return None
+        return q
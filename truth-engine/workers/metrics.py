@@ -0,0 +1,350 @@
+"""
+metrics.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Prometheus Metrics
+
+Counters, gauges and histograms exposed in Prometheus text format on a
+local HTTP endpoint (METRICS_HOST:METRICS_PORT/metrics, default
+127.0.0.1:9464; METRICS_PORT=0 disables). serve() is idempotent, so the
+supervisor and every worker main() can call it; a worker hosted by the
+supervisor shares its endpoint.
+
+Counter and histogram children keep one cell per thread and never take
+a lock after a thread's first touch; cells are summed on scrape. For a
+hot loop, hoist the child:
+
+    written = ROWS.labels("market.trades_v1", "write")
+    written.inc(len(batch))
+
+State a worker already counts (ops_worker's ring, journal, latency
+histograms) is exported with register_collector(), which is read on
+scrape and costs the hot path nothing.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Iterable
+
+log = logging.getLogger("metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+
+# (name, kind, help, [(labels dict, value)])
+Family = tuple[str, str, str, list[tuple[dict, float]]]
+
+
+def _fmt_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+# ── Children ─────────────────────────────────────────────────────────────
+
+class _Sharded:
+    __slots__ = ("_local", "_shards", "_lock", "_width")
+
+    def __init__(self, width: int):
+        self._local  = threading.local()
+        self._shards: list[list[float]] = []
+        self._lock   = threading.Lock()
+        self._width  = width
+
+    def _cell(self) -> list[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0.0] * self._width
+            with self._lock:
+                self._shards.append(cell)
+            self._local.cell = cell
+            return cell
+
+    def _collect(self) -> list[float]:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(col) for col in zip(*shards)] if shards else [0.0] * self._width
+
+
+class CounterChild(_Sharded):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, n: float = 1):
+        try:
+            self._local.cell[0] += n
+        except AttributeError:
+            self._cell()[0] += n
+
+    def value(self) -> float:
+        return self._collect()[0]
+
+
+class HistogramChild(_Sharded):
+    __slots__ = ("buckets",)
+
+    def __init__(self, buckets: tuple):
+        super().__init__(len(buckets) + 3)    # per-bucket counts, +Inf, sum, count
+        self.buckets = buckets
+
+    def observe(self, v: float):
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._cell()
+        cell[bisect_left(self.buckets, v)] += 1
+        cell[-2] += v
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+
+class GaugeChild:
+    __slots__ = ("_value", "_fn")
+
+    def __init__(self):
+        self._value = 0.0
+        self._fn: Callable[[], float] = None
+
+    def set(self, v: float):
+        self._value = v
+
+    def inc(self, n: float = 1):
+        self._value += n
+
+    def dec(self, n: float = 1):
+        self._value -= n
+
+    def set_function(self, fn: Callable[[], float]):
+        self._fn = fn
+
+    def value(self) -> float:
+        return self._fn() if self._fn else self._value
+
+
+# ── Families ─────────────────────────────────────────────────────────────
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kw):
+        key = tuple(str(v) for v in values) if values else tuple(str(kw[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self):
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, k)), c) for k, c in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+    def inc(self, n: float = 1):
+        self.labels().inc(n)
+
+    def samples(self):
+        return [(self.name, labels, c.value()) for labels, c in self._items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return GaugeChild()
+
+    def set(self, v: float):
+        self.labels().set(v)
+
+    def samples(self):
+        return [(self.name, labels, c.value()) for labels, c in self._items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, v: float):
+        self.labels().observe(v)
+
+    def samples(self):
+        out = []
+        for labels, c in self._items():
+            totals = c._collect()
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), totals):
+                cumulative += n
+                out.append((f"{self.name}_bucket", {**labels, "le": _fmt_value(bound)}, cumulative))
+            out.append((f"{self.name}_sum", labels, totals[-2]))
+            out.append((f"{self.name}_count", labels, totals[-1]))
+        return out
+
+
+# ── Registry / exposition ────────────────────────────────────────────────
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        # Last registration wins: a worker module re-imported by the
+        # supervisor after a failed import re-creates its metrics.
+        with self._lock:
+            self._metrics[metric.name] = metric
+
+    def register_collector(self, fn: Callable[[], Iterable[Family]]):
+        with self._lock:
+            self._collectors.append(fn)
+
+    def unregister_collector(self, fn: Callable[[], Iterable[Family]]):
+        with self._lock:
+            if fn in self._collectors:
+                self._collectors.remove(fn)
+
+    def exposition(self) -> str:
+        lines = []
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors)
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(f"{n}{_fmt_labels(l)} {_fmt_value(v)}" for n, l, v in m.samples())
+        for fn in collectors:
+            try:
+                families = list(fn())
+            except Exception as e:
+                log.warning(f"metrics collector {getattr(fn, '__qualname__', fn)} failed: {e}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_fmt_labels(l)} {_fmt_value(v)}" for l, v in samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+register_collector = REGISTRY.register_collector
+unregister_collector = REGISTRY.unregister_collector
+
+
+def _handler():
+    from http.server import BaseHTTPRequestHandler   # ~50 ms of imports; only when serving
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = REGISTRY.exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port: int = None, host: str = None):
+    """Start the /metrics endpoint once per process (no-op if running or disabled)."""
+    global _server
+    port = int(os.getenv("METRICS_PORT", 9464)) if port is None else port
+    host = host or os.getenv("METRICS_HOST", "127.0.0.1")
+    with _server_lock:
+        if _server is not None or port == 0:
+            return
+        from http.server import ThreadingHTTPServer
+        try:
+            _server = ThreadingHTTPServer((host, port), _handler())
+        except OSError as e:
+            log.warning(f"metrics endpoint not started on {host}:{port}: {e}")
+            return
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    log.info(f"📈 metrics on http://{host}:{port}/metrics")
+
+
+# ── Shared worker metrics ────────────────────────────────────────────────
+
+RUN_SECONDS = Histogram(
+    "noterminal_run_duration_seconds", "Duration of a scheduled worker run",
+    ("job", "status"), buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200),
+)
+ROWS = Counter(
+    "noterminal_rows_total", "Rows read from or written to a table", ("table", "op"),
+)
+EXTERNAL_SECONDS = Histogram(
+    "noterminal_external_request_seconds", "External HTTP request latency",
+    ("service", "status"),
+)
+POOL_ACQUIRE_SECONDS = Histogram(
+    "noterminal_pool_acquire_seconds", "Wait to acquire an asyncpg pool connection",
+    ("worker",), buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+SYMBOL_SECONDS = Histogram(
+    "noterminal_symbol_processing_seconds", "Per-symbol processing time within a run",
+    ("worker",),
+)
+
+
+@asynccontextmanager
+async def acquire(pool, worker: str):
+    """pool.acquire() that records the wait in POOL_ACQUIRE_SECONDS."""
+    t0 = time.perf_counter()
+    async with pool.acquire() as conn:
+        POOL_ACQUIRE_SECONDS.labels(worker).observe(time.perf_counter() - t0)
+        yield conn
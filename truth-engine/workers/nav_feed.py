@@ -0,0 +1,241 @@
+"""
+nav_feed.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — NAV Snapshot Change Feed
+
+Push-based replacement for polling capital.nav_snapshots_v1. A trigger on
+the table publishes the fund_id of every inserted / updated snapshot on
+the `nav_snapshot_changed` channel; NavFeed LISTENs, re-reads that fund's
+latest snapshot and keeps a per-fund cache:
+
+    feed = NavFeed(dsn, on_change=print)
+    await feed.run()                  # reconnects forever
+    feed.latest(fund_id)              # → NavSnapshot | None
+
+  reconnect   connection loss (termination callback or failed keepalive)
+              → reconnect with exponential backoff
+  backfill    every (re)subscribe LISTENs first, then reloads the latest
+              snapshot per fund, so nothing published while disconnected
+              is missed
+  coalescing  bursts of notifications for one fund cost one read
+  fallback    if the trigger is not installed, a max(nav_asof) probe
+              runs every NAV_FEED_POLL_SECS and the full backfill only
+              when it moves; every NAV_FEED_TRIGGER_CHECK_SECS the feed
+              looks for the trigger (switching to LISTEN) and backfills
+              anyway, catching updates and late rows the probe misses
+
+LISTEN needs a session: NAV_FEED_DSN (or DB_SESSION_URL) must point at
+the direct connection or the Session Pooler (port 5432). The Transaction Pooler (6543) drops
+LISTEN registrations between transactions.
+
+capital is a canon schema with DDL blocked at the DB layer —
+NOTIFY_TRIGGER_DDL is applied only through the Unfreeze Procedure in
+docs/statements-canon-v1.md (dual-control, re-freeze with new checksum).
+Until then the feed runs in poll fallback.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from lazy import lazy_import
+
+asyncpg = lazy_import("asyncpg")
+
+log = logging.getLogger("nav_feed")
+
+CHANNEL            = "nav_snapshot_changed"
+TRIGGER_NAME       = "nav_snapshots_v1_notify"
+POLL_SECS          = float(os.getenv("NAV_FEED_POLL_SECS", 5))      # fallback only; the old sensor cadence
+TRIGGER_CHECK_SECS = float(os.getenv("NAV_FEED_TRIGGER_CHECK_SECS", 300))   # fallback: trigger look-up + full backfill
+KEEPALIVE_SECS     = 30
+BACKOFF_MAX        = 60.0
+
+NOTIFY_TRIGGER_DDL = f"""
+CREATE OR REPLACE FUNCTION capital.notify_nav_snapshot_v1() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('{CHANNEL}', json_build_object('fund_id', NEW.fund_id)::text);
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER {TRIGGER_NAME}
+    AFTER INSERT OR UPDATE ON capital.nav_snapshots_v1
+    FOR EACH ROW EXECUTE FUNCTION capital.notify_nav_snapshot_v1();
+"""
+
+LATEST_ALL_SQL = """
+    SELECT DISTINCT ON (fund_id)
+        fund_id,
+        nav_total AS nav_value,
+        nav_asof  AS nav_date
+    FROM capital.nav_snapshots_v1
+    ORDER BY fund_id, nav_asof DESC
+"""
+
+PROBE_SQL = "SELECT max(nav_asof) FROM capital.nav_snapshots_v1"
+
+LATEST_ONE_SQL = """
+    SELECT
+        fund_id,
+        nav_total AS nav_value,
+        nav_asof  AS nav_date
+    FROM capital.nav_snapshots_v1
+    WHERE fund_id = $1
+    ORDER BY nav_asof DESC
+    LIMIT 1
+"""
+
+
+@dataclass(frozen=True)
+class NavSnapshot:
+    fund_id:   str
+    nav_value: object           # numeric as returned by asyncpg (Decimal)
+    nav_date:  object           # date / datetime
+    seen_at:   float            # time.time() the feed applied it
+
+
+class NavFeed:
+    def __init__(self, dsn: str, on_change: Optional[Callable[[NavSnapshot], None]] = None):
+        self.dsn = dsn
+        self.on_change = on_change
+        self.cache: dict[str, NavSnapshot] = {}
+        self.mode = "disconnected"          # listen | poll | disconnected
+        self.reconnects = 0
+        self._dirty: asyncio.Queue = asyncio.Queue()
+
+    def latest(self, fund_id) -> Optional[NavSnapshot]:
+        return self.cache.get(str(fund_id))
+
+    # ── Cache ────────────────────────────────────────────────────────────
+
+    def _apply(self, row) -> None:
+        fund_id = str(row["fund_id"])
+        prev = self.cache.get(fund_id)
+        if prev and (prev.nav_date, prev.nav_value) == (row["nav_date"], row["nav_value"]):
+            return
+        snap = NavSnapshot(fund_id, row["nav_value"], row["nav_date"], time.time())
+        self.cache[fund_id] = snap
+        if self.on_change:
+            try:
+                self.on_change(snap)
+            except Exception as e:
+                log.error(f"NAV on_change failed for {fund_id}: {e}", exc_info=True)
+
+    async def _backfill(self, conn) -> int:
+        rows = await conn.fetch(LATEST_ALL_SQL)
+        for row in rows:
+            self._apply(row)
+        return len(rows)
+
+    # ── Listen ───────────────────────────────────────────────────────────
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        try:
+            self._dirty.put_nowait(str(json.loads(payload)["fund_id"]))
+        except (ValueError, KeyError, TypeError):
+            log.warning(f"NAV feed: ignoring malformed payload {payload!r}")
+
+    async def _drain(self, conn) -> None:
+        while True:
+            funds = {await self._dirty.get()}
+            while not self._dirty.empty():
+                funds.add(self._dirty.get_nowait())
+            for fund_id in funds:
+                row = await conn.fetchrow(LATEST_ONE_SQL, fund_id)
+                if row:
+                    self._apply(row)
+
+    async def _keepalive(self, conn, lost: asyncio.Event) -> None:
+        while not lost.is_set():
+            try:
+                await asyncio.wait_for(lost.wait(), KEEPALIVE_SECS)
+            except asyncio.TimeoutError:
+                await conn.fetchval("SELECT 1", timeout=10)
+
+    async def _trigger_installed(self, conn) -> bool:
+        return bool(await conn.fetchval(
+            """
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = $1 AND tgrelid = 'capital.nav_snapshots_v1'::regclass
+            """,
+            TRIGGER_NAME,
+        ))
+
+    async def _session(self) -> None:
+        conn = await asyncpg.connect(self.dsn, timeout=10)
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda c: lost.set())
+        try:
+            if await self._trigger_installed(conn):
+                self.mode = "listen"
+                await conn.add_listener(CHANNEL, self._on_notify)    # before backfill: no gap
+                funds = await self._backfill(conn)
+                log.info(f"📡 NAV feed listening on {CHANNEL} — {funds} funds backfilled")
+                tasks = [asyncio.create_task(self._drain(conn)),
+                         asyncio.create_task(self._keepalive(conn, lost))]
+            else:
+                self.mode = "poll"
+                log.warning(f"NAV trigger {TRIGGER_NAME} not installed — polling every "
+                            f"{POLL_SECS:.0f}s (DDL needs the canon unfreeze procedure)")
+                tasks = [asyncio.create_task(self._poll(conn, lost))]
+            tasks.append(asyncio.create_task(lost.wait()))
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for t in tasks:
+                    t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            for t in done:
+                if t.exception():
+                    raise t.exception()
+            if lost.is_set():
+                raise ConnectionError("NAV feed connection lost")
+            # poll fallback found the trigger: resubscribe in listen mode
+        finally:
+            self.mode = "disconnected"
+            if not conn.is_closed():
+                await conn.close(timeout=5)
+
+    async def _poll(self, conn, lost: asyncio.Event) -> None:
+        seen = stale = object()             # forces the first backfill
+        next_check = time.monotonic() + TRIGGER_CHECK_SECS
+        while not lost.is_set():
+            probe = await conn.fetchval(PROBE_SQL)
+            if probe != seen:
+                await self._backfill(conn)
+                seen = probe
+            try:
+                await asyncio.wait_for(lost.wait(), POLL_SECS)
+            except asyncio.TimeoutError:
+                if time.monotonic() < next_check:
+                    continue
+                next_check = time.monotonic() + TRIGGER_CHECK_SECS
+                if await self._trigger_installed(conn):
+                    log.info(f"NAV trigger {TRIGGER_NAME} installed — switching to LISTEN")
+                    return
+                seen = stale
+
+    async def run(self) -> None:
+        """Subscribe and keep the cache current; never returns."""
+        delay = 1.0
+        while True:
+            started = time.monotonic()
+            try:
+                await self._session()
+                delay = 1.0
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if time.monotonic() - started > BACKOFF_MAX:
+                    delay = 1.0
+                self.reconnects += 1
+                log.warning(f"NAV feed disconnected ({e}) — reconnecting in {delay:.0f}s")
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, BACKOFF_MAX)
@@ -2,116 +2,442 @@ import os
 import json
 import asyncio
 import logging
+import time
 from pathlib import Path
 from datetime import datetime, timezone
 from decimal import Decimal
-import asyncpg
 import websockets
 from dotenv import load_dotenv
 
+from bar_aggregator import Bar, BarAggregator
+import db
+from latency_histogram import LatencyHistogram
+from market_board import MarketBoard
+import metrics
+from metrics import ROWS, Histogram
+from spill_journal import KIND_BAR, KIND_TRADE, SpillJournal
+from symbol_registry import LastValueState, SymbolRegistry
+from tick_buffer import TradeBatch, TradeRing
+from trade_decode import decode_trade
+
 # ============================================================
 # LOAD .env FROM PROJECT ROOT
 # ============================================================
 load_dotenv(Path(__file__).resolve().parents[1] / ".env")
 
-FUND_ID = os.getenv("FUND_ID")
-PG_CONN = os.getenv("PG_CONN")
-
-print("RUNNING FILE:", __file__)
-print("FUND_ID AT RUNTIME:", FUND_ID)
 
-if not FUND_ID:
-    raise RuntimeError("FUND_ID missing from .env")
-if not PG_CONN:
-    raise RuntimeError("PG_CONN missing from .env")
+def require_env() -> tuple[str, str]:
+    """FUND_ID / PG_CONN, checked at startup rather than import."""
+    fund_id = os.getenv("FUND_ID")
+    pg_conn = os.getenv("PG_CONN")
+    if not fund_id:
+        raise RuntimeError("FUND_ID missing from .env")
+    if not pg_conn:
+        raise RuntimeError("PG_CONN missing from .env")
+    logging.info(f"RUNNING FILE: {__file__} — FUND_ID AT RUNTIME: {fund_id}")
+    return fund_id, pg_conn
 
 # ============================================================
 # CONFIG
 # ============================================================
-BINANCE_WS_URL   = "wss://stream.binance.us:9443/ws/btcusdt@trade"
+BINANCE_WS_URL   = os.getenv("OPS_WS_URL", "wss://stream.binance.us:9443/stream")   # bench/ws_replay.py for load tests
 BTCUSDT_ASSET_ID = "22222222-2222-2222-2222-222222222222"
+DEFAULT_SYMBOLS  = {"btcusdt": BTCUSDT_ASSET_ID}
 STARTING_CASH    = 100000
-FLUSH_INTERVAL   = 5
+FLUSH_INTERVAL   = 5       # seconds — time threshold
+FLUSH_ROWS       = 20000   # buffered trades — size threshold
+COPY_BATCH       = 50000   # max rows per COPY
+RING_CAPACITY    = int(os.getenv("OPS_RING_CAPACITY", 1 << 18))   # ~11.8 MB of trades
+LATENCY_REPORT_SECS = 60
+MARKET_BOARD        = os.getenv("OPS_MARKET_BOARD") == "1"   # off until a worker reads the board
+BOARD_PUBLISH_SECS  = 0.25   # market_board.py price refresh for other processes
+
+# market.trades_v1 — append-only full tick capture (binary COPY target)
+# market.bars_v1   — closed 1s/1m/5m bars (binary COPY target)
+# market.ticks_v1  — one row per symbol_id (unique), explicit upsert
+# The unique keys are load-bearing: spill replay relies on them for
+# ON CONFLICT DO NOTHING, retention_worker's downsample for its upsert.
+CAPTURE_DDL = """
+CREATE TABLE IF NOT EXISTS market.trades_v1 (
+    symbol_id      uuid        NOT NULL,
+    trade_id       bigint      NOT NULL,
+    event_ts       timestamptz NOT NULL,
+    price          numeric     NOT NULL,
+    size           numeric     NOT NULL,
+    is_buyer_maker boolean     NOT NULL,
+    UNIQUE (symbol_id, trade_id)
+);
+CREATE INDEX IF NOT EXISTS trades_v1_event_ts_idx ON market.trades_v1 (event_ts);
+
+CREATE TABLE IF NOT EXISTS market.bars_v1 (
+    symbol_id   uuid        NOT NULL,
+    timeframe_s integer     NOT NULL,
+    bucket_ts   timestamptz NOT NULL,
+    open        numeric     NOT NULL,
+    high        numeric     NOT NULL,
+    low         numeric     NOT NULL,
+    close       numeric     NOT NULL,
+    volume      numeric     NOT NULL,
+    vwap        numeric,
+    trade_count integer     NOT NULL,
+    UNIQUE (symbol_id, timeframe_s, bucket_ts)
+);
+CREATE INDEX IF NOT EXISTS bars_v1_timeframe_bucket_idx ON market.bars_v1 (timeframe_s, bucket_ts);
+"""
+CAPTURE_KEYS = {
+    "market.trades_v1": ("symbol_id", "trade_id"),
+    "market.bars_v1":   ("symbol_id", "timeframe_s", "bucket_ts"),
+}
+TRADE_COLUMNS = ("symbol_id", "trade_id", "event_ts", "price", "size", "is_buyer_maker")
+BAR_COLUMNS   = ("symbol_id", "timeframe_s", "bucket_ts", "open", "high", "low", "close",
+                 "volume", "vwap", "trade_count")
+SUBSCRIBE_CHUNK  = 200    # streams per SUBSCRIBE frame (Binance caps frame rate, not size)
+
+# Spill journal — trades/bars that could not be written during a DB outage.
+# Replayed through a temp staging table + ON CONFLICT DO NOTHING (CAPTURE_KEYS).
+SPILL_PATH       = os.getenv("OPS_SPILL_PATH", str(Path(__file__).resolve().parents[1] / "spill" / "ops_worker.journal"))
+SPILL_MAX_MB     = int(os.getenv("OPS_SPILL_MAX_MB", 512))        # ~10M trades
+REPLAY_BATCH     = 100000  # rows per replay COPY
+DB_TIMEOUT       = 10      # seconds — fail fast into the journal instead of hanging
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
+FLUSH_SECONDS = Histogram(
+    "noterminal_ops_flush_seconds", "ops_worker flush duration", ("status",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
 # ============================================================
 # WORKER
 # ============================================================
 class OpsWorker:
-    def __init__(self):
-        self.pool       = None
-        self.last_price = None
-        self.last_size  = None
-        self.last_ts    = None
-        self.cash       = STARTING_CASH
+    def __init__(self, registry: SymbolRegistry = None):
+        self.pool     = None
+        self.registry = registry or SymbolRegistry.from_env(DEFAULT_SYMBOLS)
+        self.last     = LastValueState(len(self.registry))
+        self.ring     = TradeRing(RING_CAPACITY)
+        self.bars     = BarAggregator(len(self.registry))
+        self.pending_bars: list[Bar] = []
+        self.flush_now = asyncio.Event()
+        self.lat_exchange = LatencyHistogram("exchange_to_receive")
+        self.lat_commit   = LatencyHistogram("receive_to_commit")
+        self.journal  = SpillJournal(SPILL_PATH, SPILL_MAX_MB << 20)
+        self.board    = MarketBoard(self.registry.symbols) if MARKET_BOARD else None
+        self.cash     = STARTING_CASH
+        metrics.register_collector(self.collect_metrics)
 
     async def connect_db(self):
         logging.info("Connecting to DB...")
-        self.pool = await asyncpg.create_pool(
-            dsn=PG_CONN,
-            min_size=1,
-            max_size=3,
-            statement_cache_size=0
+        _, pg_conn = require_env()
+        self.pool = await db.create_pool(
+            "ops_worker", pg_conn,
+            timeout=DB_TIMEOUT,
+            command_timeout=DB_TIMEOUT * 6,
         )
+        await self.check_capture_tables()
         logging.info("DB ready.")
 
-    async def write_tick(self):
-        if self.last_price is None:
-            return
-        try:
-            await self.pool.execute(
+    async def check_capture_tables(self):
+        """Create missing capture tables; refuse to start if a unique key is missing."""
+        async def unique_keys(table):
+            rows = await self.pool.fetch(
                 """
-                INSERT INTO market.ticks_v1 (symbol_id, event_ts, last_price, last_size, created_at)
-                VALUES ($1, $2, $3, $4, now())
+                SELECT array(
+                    SELECT a.attname FROM unnest(i.indkey) AS k(attnum)
+                    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                ) AS cols
+                FROM pg_index i
+                WHERE i.indrelid = to_regclass($1) AND i.indisunique AND i.indpred IS NULL
                 """,
-                BTCUSDT_ASSET_ID,
-                self.last_ts,
-                self.last_price,
-                self.last_size,
+                table,
             )
+            return [set(r["cols"]) for r in rows]
+
+        tables = [t for t in CAPTURE_KEYS if not await self.pool.fetchval("SELECT to_regclass($1)", t)]
+        if tables:
+            logging.info(f"Creating capture tables: {', '.join(tables)}")
+            await self.pool.execute(CAPTURE_DDL)
+        for table, key in CAPTURE_KEYS.items():
+            if set(key) not in await unique_keys(table):
+                raise RuntimeError(
+                    f"{table} has no UNIQUE ({', '.join(key)}) — spill replay would duplicate rows "
+                    f"and retention downsampling fails (DDL in ops_worker.CAPTURE_DDL)"
+                )
+
+    async def write_ticks(self):
+        slots = self.last.drain()
+        if not slots:
+            return
+        reg, last = self.registry, self.last
+        asset_ids = [reg.asset_ids[i] for i in slots]
+        event_ts  = [datetime.fromtimestamp(last.ts_ms[i] / 1000, tz=timezone.utc) for i in slots]
+        prices    = [Decimal(repr(last.price[i])) for i in slots]
+        sizes     = [Decimal(repr(last.size[i])) for i in slots]
+
+        try:
+            await self._write_last_values(asset_ids, event_ts, prices, sizes)
         except Exception:
-            await self.pool.execute(
-                """
-                UPDATE market.ticks_v1
-                SET last_price = $2,
-                    last_size  = $3,
-                    event_ts   = $4,
-                    created_at = now()
-                WHERE symbol_id = $1
-                AND $4 > event_ts
-                """,
-                BTCUSDT_ASSET_ID,
-                self.last_price,
-                self.last_size,
-                self.last_ts,
+            for i in slots:
+                last.dirty[i] = 1       # retry these symbols on the next flush
+            raise
+
+    async def _write_last_values(self, asset_ids, event_ts, prices, sizes):
+        await self.pool.execute(
+            """
+            INSERT INTO market.ticks_v1 (symbol_id, event_ts, last_price, last_size, created_at)
+            SELECT u.symbol_id, u.event_ts, u.last_price, u.last_size, now()
+            FROM unnest($1::uuid[], $2::timestamptz[], $3::numeric[], $4::numeric[])
+                 AS u(symbol_id, event_ts, last_price, last_size)
+            ON CONFLICT (symbol_id) DO UPDATE
+            SET last_price = EXCLUDED.last_price,
+                last_size  = EXCLUDED.last_size,
+                event_ts   = EXCLUDED.event_ts,
+                created_at = now()
+            WHERE EXCLUDED.event_ts > market.ticks_v1.event_ts
+            """,
+            asset_ids, event_ts, prices, sizes,
+        )
+
+    async def copy_trades(self, batch: TradeBatch):
+        asset_ids = self.registry.asset_ids
+        records = [
+            (asset_ids[s], tid, datetime.fromtimestamp(ts / 1000, tz=timezone.utc),
+             repr(p), repr(q), bool(m))
+            for s, tid, ts, p, q, m in zip(batch.slot, batch.trade_id, batch.ts_ms,
+                                           batch.price, batch.size, batch.maker)
+        ]
+        async with metrics.acquire(self.pool, "ops_worker") as conn:
+            await conn.copy_records_to_table(
+                "trades_v1", schema_name="market",
+                columns=TRADE_COLUMNS, records=records,
+            )
+
+    async def copy_bars(self, bars: list[Bar]):
+        asset_ids = self.registry.asset_ids
+        records = [
+            (asset_ids[b.slot], b.timeframe_s,
+             datetime.fromtimestamp(b.bucket_ms / 1000, tz=timezone.utc),
+             repr(b.open), repr(b.high), repr(b.low), repr(b.close),
+             repr(b.volume), repr(b.vwap), b.trade_count)
+            for b in bars
+        ]
+        async with metrics.acquire(self.pool, "ops_worker") as conn:
+            await conn.copy_records_to_table(
+                "bars_v1", schema_name="market",
+                columns=BAR_COLUMNS, records=records,
             )
 
+    # ── Spill / replay ──────────────────────────────────────────────────
+
+    def spill(self):
+        """Move everything buffered in memory into the journal."""
+        asset_ids = self.registry.asset_ids
+        while len(self.ring):
+            batch = self.ring.take(COPY_BATCH)
+            rows = [
+                (asset_ids[s], tid, ts, p, q, bool(m))
+                for s, tid, ts, p, q, m in zip(batch.slot, batch.trade_id, batch.ts_ms,
+                                               batch.price, batch.size, batch.maker)
+            ]
+            if not self.journal.append(KIND_TRADE, rows):
+                break           # journal full — leave the rest in the ring
+            self.ring.commit(batch)
+        if self.pending_bars:
+            rows = [
+                (asset_ids[b.slot], b.timeframe_s, b.bucket_ms, b.open, b.high, b.low,
+                 b.close, b.volume, b.vwap, b.trade_count)
+                for b in self.pending_bars
+            ]
+            if self.journal.append(KIND_BAR, rows):
+                self.pending_bars = []
+
+    async def replay_journal(self):
+        t0, rows = time.monotonic(), 0
+        for kind, batch, end in self.journal.read_batches(REPLAY_BATCH):
+            if kind == KIND_TRADE:
+                table, columns = "trades_v1", TRADE_COLUMNS
+                records = [
+                    (a, tid, datetime.fromtimestamp(ts / 1000, tz=timezone.utc),
+                     repr(p), repr(q), m)
+                    for a, tid, ts, p, q, m in batch
+                ]
+            else:
+                table, columns = "bars_v1", BAR_COLUMNS
+                records = [
+                    (a, tf, datetime.fromtimestamp(ms / 1000, tz=timezone.utc),
+                     repr(o), repr(h), repr(l), repr(c), repr(v), repr(vw), n)
+                    for a, tf, ms, o, h, l, c, v, vw, n in batch
+                ]
+            await self._copy_idempotent(table, columns, records)
+            ROWS.labels(f"market.{table}", "write").inc(len(records))
+            self.journal.advance(end)
+            rows += len(records)
+        logging.info(f"✅ Spill journal replayed — {rows} rows in {time.monotonic() - t0:.1f}s")
+
+    async def _copy_idempotent(self, table: str, columns: tuple, records: list):
+        # ON COMMIT DROP keeps the staging table inside one transaction, so
+        # this is safe behind the transaction pooler.
+        cols = ", ".join(columns)
+        async with metrics.acquire(self.pool, "ops_worker") as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"CREATE TEMP TABLE replay_{table} (LIKE market.{table}) ON COMMIT DROP"
+                )
+                await conn.copy_records_to_table(
+                    f"replay_{table}", columns=columns, records=records,
+                )
+                await conn.execute(
+                    f"INSERT INTO market.{table} ({cols}) "
+                    f"SELECT {cols} FROM replay_{table} ON CONFLICT DO NOTHING"
+                )
+
+    async def flush(self):
+        self.bars.sweep(int(time.time() * 1000))
+        closed = self.bars.drain()
+        if self.board:
+            self.board.on_bars(closed)
+        self.pending_bars.extend(closed)
+        # Last values first and on their own: a failing capture COPY spills to
+        # the journal, but must not hold up the market.ticks_v1 updates.
+        ticks_error = None
+        try:
+            await self.write_ticks()
+        except Exception as e:
+            ticks_error = e
+        try:
+            if self.journal.pending_bytes:
+                await self.replay_journal()     # oldest first — keeps ordering
+            # Bound to what is buffered now; under sustained load the ring
+            # refills during each COPY and would otherwise starve bars/ticks.
+            end = self.ring.head
+            while self.ring.tail < end:
+                batch = self.ring.take(min(COPY_BATCH, end - self.ring.tail))
+                await self.copy_trades(batch)
+                self.ring.commit(batch)
+                ROWS.labels("market.trades_v1", "write").inc(len(batch))
+                commit_us = time.time_ns() // 1000
+                record = self.lat_commit.record
+                for recv_us in batch.recv_us:
+                    record(commit_us - recv_us)
+            if self.pending_bars:
+                await self.copy_bars(self.pending_bars)
+                ROWS.labels("market.bars_v1", "write").inc(len(self.pending_bars))
+                self.pending_bars = []
+        except Exception:
+            self.spill()
+            raise
+        if ticks_error:
+            raise ticks_error
+
     async def flusher(self):
+        dropped, spill_dropped = 0, self.journal.dropped
         while True:
-            await asyncio.sleep(FLUSH_INTERVAL)
             try:
-                await self.write_tick()
+                await asyncio.wait_for(self.flush_now.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_now.clear()
+            t0 = time.perf_counter()
+            try:
+                await self.flush()
+                FLUSH_SECONDS.labels("ok").observe(time.perf_counter() - t0)
             except Exception as e:
-                logging.error(f"DB WRITE FAILED: {e}")
+                FLUSH_SECONDS.labels("failed").observe(time.perf_counter() - t0)
+                logging.error(
+                    f"DB WRITE FAILED: {e} — {self.journal.pending_bytes >> 10} KiB spilled, "
+                    f"{len(self.ring)} trades in ring"
+                )
+            if self.ring.dropped != dropped:
+                logging.warning(f"Trade ring overflow — {self.ring.dropped - dropped} trades dropped")
+                dropped = self.ring.dropped
+            if self.journal.dropped != spill_dropped:
+                logging.warning(f"Spill journal full — {self.journal.dropped - spill_dropped} rows refused")
+                spill_dropped = self.journal.dropped
+
+    def collect_metrics(self):
+        """Read on scrape — the hot path only bumps the counters it already keeps."""
+        ring, journal, bars = self.ring, self.journal, self.bars
+        yield ("noterminal_ops_trades_received_total", "counter", "Trades decoded and buffered",
+               [({}, ring.head)])
+        yield ("noterminal_ops_ring_dropped_total", "counter", "Trades overwritten in a full ring",
+               [({}, ring.dropped)])
+        yield ("noterminal_ops_ring_buffered", "gauge", "Trades waiting for COPY",
+               [({}, len(ring))])
+        yield ("noterminal_ops_spill_pending_bytes", "gauge", "Unreplayed spill journal bytes",
+               [({}, journal.pending_bytes)])
+        yield ("noterminal_ops_spill_dropped_total", "counter", "Rows refused by a full spill journal",
+               [({}, journal.dropped)])
+        yield ("noterminal_ops_bars_pending", "gauge", "Closed bars waiting for COPY",
+               [({}, len(self.pending_bars))])
+        yield ("noterminal_ops_bars_late_total", "counter", "Trades behind an already closed bar",
+               [({}, bars.late)])
+        yield ("noterminal_ops_symbols", "gauge", "Subscribed symbols",
+               [({}, len(self.registry))])
+        yield ("noterminal_ops_latency_us", "gauge", "Latency percentiles over the current report window",
+               [({"stage": h.name, "quantile": q}, h.percentile(float(q) * 100))
+                for h in (self.lat_exchange, self.lat_commit) for q in ("0.5", "0.9", "0.99", "0.999")])
+
+    async def board_publisher(self):
+        last = self.last
+        while True:
+            await asyncio.sleep(BOARD_PUBLISH_SECS)
+            self.board.publish_prices(last.price, last.ts_ms)
+
+    async def latency_reporter(self):
+        while True:
+            await asyncio.sleep(LATENCY_REPORT_SECS)
+            for hist in (self.lat_exchange, self.lat_commit):
+                logging.info(f"LATENCY {hist.name}: {hist.summary()}")
+                hist.reset()
+
+    async def subscribe(self, ws):
+        streams = self.registry.streams("trade")
+        for i in range(0, len(streams), SUBSCRIBE_CHUNK):
+            await ws.send(json.dumps({
+                "method": "SUBSCRIBE",
+                "params": streams[i:i + SUBSCRIBE_CHUNK],
+                "id": i // SUBSCRIBE_CHUNK + 1,
+            }))
+            await asyncio.sleep(0.25)
+        logging.info(f"Subscribed {len(streams)} trade streams")
 
     async def market_loop(self):
         logging.info("Connecting to Binance...")
+        reg, last, ring, bars, flush_now = (
+            self.registry, self.last, self.ring, self.bars, self.flush_now
+        )
+        record_exchange = self.lat_exchange.record
         async with websockets.connect(BINANCE_WS_URL) as ws:
+            await self.subscribe(ws)
             logging.info("Binance LIVE")
             async for msg in ws:
-                trade = json.loads(msg)
-                self.last_price = Decimal(trade["p"])
-                self.last_size  = Decimal(trade["q"])
-                self.last_ts    = datetime.fromtimestamp(trade["T"] / 1000, tz=timezone.utc)
+                recv_us = time.time_ns() // 1000
+                trade = decode_trade(msg)
+                if trade is None:
+                    continue    # SUBSCRIBE acks
+                symbol, trade_id, price, size, trade_ms, _, maker = trade
+                slot = reg.slot(symbol)
+                if slot is None:
+                    continue
+                record_exchange(recv_us - trade_ms * 1000)
+                last.update(slot, price, size, trade_ms)
+                ring.push(slot, trade_id, trade_ms, price, size, maker, recv_us)
+                bars.on_trade(slot, trade_ms, price, size)
+                if len(ring) >= FLUSH_ROWS:
+                    flush_now.set()
 
     async def run(self):
         await self.connect_db()
-        logging.info("OPS WORKER STARTED")
-        await asyncio.gather(
-            self.market_loop(),
-            self.flusher()
-        )
+        metrics.serve()
+        logging.info(f"OPS WORKER STARTED — {len(self.registry)} symbols")
+        tasks = [self.market_loop(), self.flusher(), self.latency_reporter()]
+        if self.board:
+            tasks.append(self.board_publisher())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if self.board:
+                self.board.close()
 
 # ============================================================
 # MAIN
@@ -0,0 +1,268 @@
+"""
+retention_worker.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Tick Retention Worker
+
+Runs nightly. Keeps the append-only capture tables at a flat size:
+
+  market.trades_v1        full tick capture — hot for RETENTION_TRADES_DAYS
+  market.bars_v1 (1s)     1-second bars     — hot for RETENTION_BARS_1S_DAYS
+
+For each UTC day that has aged out of its hot window:
+
+  1. downsample  trades → 1m / 5m bars in market.bars_v1, rebuilt from
+                 the ticks wherever the live bar saw fewer trades (gaps
+                 from restarts / spill replay); 1m / 5m bars stay hot
+  2. export      the day's rows, an hour at a time, to one compressed
+                 columnar part under RETENTION_ARCHIVE_DIR (tick_archive.py)
+  3. delete      exactly the exported keys, DELETE_BATCH rows per short
+                 transaction with a lock_timeout, pausing between batches
+                 so ops_worker's COPYs never queue behind the cleanup
+
+A part stays `deleted: false` in the manifest until its delete finishes;
+the next run completes it before exporting anything new. At most
+MAX_DAYS_PER_RUN days per table per run, so a backlog drains over
+several nights instead of in one long run.
+
+tick_archive.read_range() reads archive + hot table together by time range.
+
+Canon compliance:
+  - Hosted by supervisor.py (non-critical worker)
+  - Wall-clock schedule via scheduler.py — restarts never re-run a fresh job
+  - asyncpg via db.py — DB_SESSION_URL preferred (long-running deletes)
+  - Only market capture tables are touched; canon schemas never
+  - Full provenance via ingest_run_log_v1 (meta.db = per-statement timings)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+import asyncpg
+
+import db
+import metrics
+from db_trace import QueryTracer
+from lazy import lazy_import
+from metrics import ROWS
+from scheduler import CronSchedule, ScheduledJob, last_success_pg, run_async
+from tick_archive import BARS_1S, SPECS, TRADES, ArchiveSpec, TickArchive, fetch_window, delete_sql, uuids
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [retention_worker] %(levelname)s %(message)s",
+)
+log = logging.getLogger(__name__)
+
+np = lazy_import("numpy")
+
+# ─── Config ───────────────────────────────────────────────────────────────────
+
+WORKER_VERSION   = "retention_worker_v1"
+SCHEDULE         = CronSchedule("30 3 * * *", "UTC")   # nightly, after the US close settles
+FRESH_FOR        = timedelta(hours=12)
+ARCHIVE_DIR      = os.getenv("RETENTION_ARCHIVE_DIR", str(Path(__file__).resolve().parents[1] / "archive"))
+HOT_DAYS = {
+    TRADES.name:  int(os.getenv("RETENTION_TRADES_DAYS", 7)),
+    BARS_1S.name: int(os.getenv("RETENTION_BARS_1S_DAYS", 3)),
+}
+DOWNSAMPLE_TIMEFRAMES_S = (60, 300)   # bars rebuilt from trades before they are archived
+EXPORT_WINDOW    = timedelta(hours=1)  # rows fetched per export query
+MAX_DAYS_PER_RUN = 7                   # per table
+DELETE_BATCH     = 5000                # keys per DELETE transaction
+DELETE_PAUSE_S   = 0.05                # between batches — lets live writers through
+LOCK_TIMEOUT     = "2s"                # per DELETE batch; a timed-out batch is retried
+LOCK_RETRIES     = 5
+
+# ─── Downsampling ─────────────────────────────────────────────────────────────
+
+async def downsample_day(conn, lo: datetime, hi: datetime) -> int:
+    """1m / 5m bars for trades in [lo, hi); returns bars inserted or rebuilt."""
+    written = 0
+    for tf in DOWNSAMPLE_TIMEFRAMES_S:
+        status = await conn.execute(
+            """
+            INSERT INTO market.bars_v1 (
+                symbol_id, timeframe_s, bucket_ts, open, high, low, close,
+                volume, vwap, trade_count
+            )
+            SELECT
+                symbol_id, $3::int, bucket,
+                (array_agg(price ORDER BY event_ts, trade_id))[1],
+                max(price), min(price),
+                (array_agg(price ORDER BY event_ts DESC, trade_id DESC))[1],
+                sum(size),
+                sum(price * size) / NULLIF(sum(size), 0),
+                count(*)
+            FROM (
+                SELECT symbol_id, trade_id, event_ts, price, size,
+                       to_timestamp(floor(extract(epoch FROM event_ts) / $3::int) * $3::int) AS bucket
+                FROM market.trades_v1
+                WHERE event_ts >= $1 AND event_ts < $2
+            ) t
+            GROUP BY symbol_id, bucket
+            ON CONFLICT (symbol_id, timeframe_s, bucket_ts) DO UPDATE SET
+                open        = EXCLUDED.open,
+                high        = EXCLUDED.high,
+                low         = EXCLUDED.low,
+                close       = EXCLUDED.close,
+                volume      = EXCLUDED.volume,
+                vwap        = EXCLUDED.vwap,
+                trade_count = EXCLUDED.trade_count
+            WHERE market.bars_v1.trade_count < EXCLUDED.trade_count
+            """,
+            lo, hi, tf,
+        )
+        written += int(status.split()[-1])
+    return written
+
+# ─── Export / delete ──────────────────────────────────────────────────────────
+
+async def next_aged_day(conn, spec: ArchiveSpec, after: Optional[date],
+                        cutoff: datetime) -> Optional[date]:
+    """First UTC day at or after `after` with rows older than cutoff."""
+    lo = datetime.combine(after, datetime.min.time(), timezone.utc) if after else None
+    ts = await conn.fetchval(
+        f"""
+        SELECT min({spec.ts}) FROM {spec.table}
+        WHERE {spec.where} AND {spec.ts} < $1
+          AND ($2::timestamptz IS NULL OR {spec.ts} >= $2)
+        """,
+        cutoff, lo,
+    )
+    return ts.astimezone(timezone.utc).date() if ts else None
+
+
+async def export_day(conn, archive: TickArchive, spec: ArchiveSpec, day: date) -> Optional[dict]:
+    """Archive every hot row of spec on `day` as one part; None if there were none."""
+    start = datetime.combine(day, datetime.min.time(), timezone.utc)
+    chunks = []
+    t = start
+    while t < start + timedelta(days=1):
+        cols = await fetch_window(conn, spec, t, t + EXPORT_WINDOW)
+        if cols:
+            chunks.append(cols)
+        t += EXPORT_WINDOW
+    if not chunks:
+        return None
+    columns = {n: np.concatenate([c[n] for c in chunks]) for n in spec.columns}
+    part = archive.write_part(spec.name, day, columns)
+    ROWS.labels(spec.table, "archive").inc(part["rows"])
+    return part
+
+
+async def delete_archived(conn, archive: TickArchive, part: dict) -> int:
+    """Delete a part's keys from the hot table in bounded batches; marks it deleted."""
+    spec = SPECS[part["table"]]
+    cols = archive.load(part)                  # verifies the checksum first
+    keys = []
+    for name in spec.key_columns:
+        col = cols[name]
+        keys.append(uuids(col) if name == "symbol_id" else col.tolist())
+    sql = delete_sql(spec)
+
+    deleted = 0
+    for i in range(0, part["rows"], DELETE_BATCH):
+        args = [k[i:i + DELETE_BATCH] for k in keys]
+        for attempt in range(1, LOCK_RETRIES + 1):
+            try:
+                async with conn.transaction():
+                    await conn.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+                    status = await conn.execute(sql, *args)
+                break
+            except asyncpg.LockNotAvailableError:
+                if attempt == LOCK_RETRIES:
+                    raise
+                log.warning("🔒 %s delete batch hit lock_timeout — retry %d/%d",
+                            part["path"], attempt, LOCK_RETRIES)
+                await asyncio.sleep(DELETE_PAUSE_S * 2 ** attempt)
+        deleted += int(status.split()[-1])
+        await asyncio.sleep(DELETE_PAUSE_S)
+
+    archive.mark_deleted(part, deleted)
+    ROWS.labels(spec.table, "delete").inc(deleted)
+    if deleted != part["rows"]:
+        log.warning("⚠️  %s — archived %d rows, deleted %d (already gone from the hot table?)",
+                    part["path"], part["rows"], deleted)
+    return deleted
+
+
+async def log_run(conn, run_id: uuid.UUID, status: str, meta: dict) -> None:
+    await conn.execute(
+        """
+        INSERT INTO market.ingest_run_log_v1
+            (ingest_run_id, source_name, run_status, meta, completed_at)
+        VALUES ($1,$2,$3,$4,now())
+        ON CONFLICT DO NOTHING
+        """,
+        run_id, WORKER_VERSION, status, json.dumps(meta, default=str),
+    )
+
+# ─── Main loop ────────────────────────────────────────────────────────────────
+
+async def run_once(pool: asyncpg.Pool, archive: Optional[TickArchive] = None) -> None:
+    run_id = uuid.uuid4()
+    log.info("⚡ retention_worker — starting run (archive=%s)", ARCHIVE_DIR)
+    archive = archive or TickArchive(ARCHIVE_DIR)
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    stats = {name: {"days": 0, "archived": 0, "deleted": 0, "bars_downsampled": 0} for name in SPECS}
+
+    tracer = QueryTracer(WORKER_VERSION, run_id)
+    async with metrics.acquire(pool, WORKER_VERSION) as raw:
+        conn = tracer.wrap(raw)
+
+        for part in archive.pending():
+            log.info("↻ finishing delete of %s from an interrupted run", part["path"])
+            stats[part["table"]]["deleted"] += await delete_archived(conn, archive, part)
+
+        for spec in SPECS.values():
+            cutoff = today - timedelta(days=HOT_DAYS[spec.name])
+            day = await next_aged_day(conn, spec, None, cutoff)
+            while day and stats[spec.name]["days"] < MAX_DAYS_PER_RUN:
+                t0 = time.perf_counter()
+                lo = datetime.combine(day, datetime.min.time(), timezone.utc)
+                if spec is TRADES:
+                    stats[spec.name]["bars_downsampled"] += await downsample_day(
+                        conn, lo, lo + timedelta(days=1))
+                part = await export_day(conn, archive, spec, day)
+                if part:
+                    stats[spec.name]["archived"] += part["rows"]
+                    stats[spec.name]["deleted"] += await delete_archived(conn, archive, part)
+                stats[spec.name]["days"] += 1
+                log.info("  ✅ %s %s — %d rows archived + deleted in %.1fs",
+                         spec.table, day, part["rows"] if part else 0, time.perf_counter() - t0)
+                day = await next_aged_day(conn, spec, day + timedelta(days=1), cutoff)
+            if day:
+                log.info("  ⏭  %s backlog remains from %s — continuing next run", spec.table, day)
+
+        await log_run(conn, run_id, "COMPLETED", {
+            "hot_days": HOT_DAYS,
+            "tables": stats,
+            "archive_parts": len(archive.parts),
+            "db": tracer.summary(),
+        })
+
+    log.info("✅ Run complete — %s", {n: s["deleted"] for n, s in stats.items()})
+
+async def main() -> None:
+    log.info("🚀 retention_worker starting (schedule=%r, hot_days=%s)", SCHEDULE, HOT_DAYS)
+    metrics.serve()
+    pool = await db.create_pool(WORKER_VERSION, session=True, numeric_as_float=True)
+    job = ScheduledJob(WORKER_VERSION, SCHEDULE, fresh_for=FRESH_FOR)
+    try:
+        await run_async(
+            job,
+            lambda: run_once(pool),
+            lambda: last_success_pg(pool, WORKER_VERSION),
+        )
+    finally:
+        await pool.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
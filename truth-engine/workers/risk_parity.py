@@ -0,0 +1,525 @@
+"""
+risk_parity.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Risk-Parity Allocator
+
+Runbook step 4 alternative: instead of copying the ensemble score into
+portfolio.target_weights.raw_score, allocate each slate by risk.
+The ensemble score picks the side of every name; the risk budget is
+equal across names (or proportional to |score| with --budget score).
+step 5 (size_weights_basic / sizing_engine) then applies the caps as usual.
+
+Solver (books/02_portfolio_risk): with D = diag(sign(score)) the signed
+slate is a long-only risk-budgeting problem on DΣD. In its correlation
+form R (Spinu; Choi & Chen) the root satisfies
+
+    w_i (Rw)_i = b_i        w > 0,   weights ∝ D · w / σ
+
+Improved cyclical coordinate descent (Risk_Parity_Iterative, Alg. 1)
+takes the exact positive root per coordinate, w_i ← √(a_i² + b_i) − a_i
+with a_i = ((Rw)_i − w_i) / 2, keeps Rw current with one axpy per step and
+rescales to wᵀRw = Σb after each sweep. Slates whose sweeps stop halving
+the error — long/short slates, where DRD has large negative blocks — are
+finished by damped Newton on Rw − b/w, its steps solved by conjugate
+gradients on a float32 copy of R with a low-rank + diagonal
+preconditioner (no factorisation, so n = 2000+ stays at about a hundred
+matrix-vector products). Converged when max_i |w_i (Rw)_i / b_i − 1| ≤
+CCD_TOL, checked in float64.
+
+Each slate warm-starts from the portfolio's previous-day weights (names
+new to it, or that changed side, start at the slate's mean), and all
+slates of one date are solved together as one padded batch.
+bench/bench_risk_parity.py times it at 2,000–3,000 names.
+
+Covariance: daily close-to-close returns over LOOKBACK_DAYS rows of
+prices, shrunk toward its diagonal by SHRINKAGE (2000+ names on a year of
+returns is singular otherwise). Names with fewer than MIN_OBS returns get
+no allocation.
+
+Tables (column names as used here):
+  portfolio.target_weights        portfolio_id, asof_date, model_version, symbol_id, raw_score
+  models.ensemble_output_daily    model_version, asof_date, symbol_id, score
+  market.prices_daily             symbol_id, asof_date, close
+  portfolio.portfolios            portfolio_id, status — CLOSED portfolios are never written
+
+    python workers/risk_parity.py --start 2026-10-01 --end 2026-10-16             # dry run
+    python workers/risk_parity.py --start 2026-10-01 --end 2026-10-16 --write
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+import db
+from lazy import lazy_import
+
+log = logging.getLogger("risk_parity")
+
+np = lazy_import("numpy")
+
+MODEL_VERSION   = "ensemble_v2"
+LOOKBACK_DAYS   = 252     # price rows per covariance estimate
+MIN_OBS         = 60      # returns a name needs to be allocated
+SHRINKAGE       = 0.2     # weight on the diagonal target
+CCD_MAX_SWEEPS  = 30      # then damped Newton for slates still off
+CCD_STALL       = 0.5     # a sweep that doesn't halve the error hands over to Newton
+NEWTON_MAX_ITER = 50
+PCG_MAX_ITER    = 200     # conjugate-gradient steps per Newton step
+PCG_RTOL_MIN    = 1e-4    # CG runs in float32; no point solving tighter than this
+SEARCH_ITER     = 30      # step halvings per Newton line search
+PRECOND_RANK    = 16      # top eigenpairs of R in the Newton preconditioner
+CCD_TOL         = 1e-8    # max relative risk-contribution error
+
+
+# ── Solver ───────────────────────────────────────────────────────────────
+
+def shrunk_covariance(returns: "np.ndarray", shrinkage: float = SHRINKAGE) -> "np.ndarray":
+    """T × N returns (NaN = missing, counted as 0 after demeaning) → N × N."""
+    obs = ~np.isnan(returns)
+    mean = np.divide(np.nansum(returns, axis=0), obs.sum(axis=0),
+                     out=np.zeros(returns.shape[1]), where=obs.any(axis=0))
+    x = np.where(obs, returns - mean, 0.0)
+    cov = x.T @ x / max(len(x) - 1, 1)
+    cov *= 1.0 - shrinkage
+    cov[np.diag_indices_from(cov)] /= 1.0 - shrinkage      # diagonal is its own target
+    return cov
+
+
+def solve_risk_budget(cov: "np.ndarray", budgets: "np.ndarray",
+                      w0: Optional["np.ndarray"] = None) -> tuple["np.ndarray", dict]:
+    """
+    Batched long-only risk budgeting. cov: B × n × n, budgets: B × n
+    (0 = padding, each row's real budgets sum to 1), w0: B × n starting
+    weights (0 = no guess for that name). Returns (weights B × n, each row
+    summing to 1, stats).
+    """
+    pad = budgets <= 0
+    n = budgets.shape[1]
+    sd = np.sqrt(np.where(pad, 1.0, np.diagonal(cov, axis1=1, axis2=2)))
+    inv = np.where(pad, 0.0, 1.0 / sd)
+    R = cov * inv[:, :, None]
+    R *= inv[:, None, :]
+    # Padding becomes an isolated identity block with unit budget (root w = 1).
+    R[:, range(n), range(n)] = 1.0
+    b = np.where(pad, 1.0, budgets)
+
+    def part(a, rows):                       # avoid copying B × n × n when all rows are live
+        return a if len(rows) == len(a) else a[rows]
+
+    w = initial_guess(R, b, pad, None if w0 is None else w0 * sd)
+    stats = {"ccd_sweeps": 0, "newton_iters": 0}
+    err = budget_error(R, b, w)
+    rows, err = np.flatnonzero(err > CCD_TOL), err[err > CCD_TOL]
+    stalled = []
+    for _ in range(CCD_MAX_SWEEPS):
+        if not len(rows):
+            break
+        stats["ccd_sweeps"] += 1
+        Rr, br = part(R, rows), b[rows]
+        swept = ccd_sweep(Rr, br, w[rows])
+        new = budget_error(Rr, br, swept)
+        worse = new > err                    # Newton starts from the better point
+        w[rows] = np.where(worse[:, None], w[rows], swept)
+        new = np.minimum(new, err)
+        slow = (new > CCD_TOL) & (new > CCD_STALL * err)
+        stalled.append(rows[slow])
+        going = (new > CCD_TOL) & ~slow
+        rows, err = rows[going], new[going]
+    rows = np.sort(np.concatenate([*stalled, rows]))
+    if len(rows):
+        R32 = part(R, rows).astype(np.float32)
+        U, lam = top_eigen(R32, min(PRECOND_RANK, n))
+    while len(rows) and stats["newton_iters"] < NEWTON_MAX_ITER:
+        stats["newton_iters"] += 1
+        Rr, br = part(R, rows), b[rows]
+        w[rows] = newton_step(Rr, R32, br, w[rows], U, lam)
+        going = budget_error(Rr, br, w[rows]) > CCD_TOL
+        rows = rows[going]
+        if not going.all():
+            R32, U, lam = R32[going], U[going], lam[going]
+    if len(rows):
+        log.warning(f"⚠️  {len(rows)} slates not converged after {CCD_MAX_SWEEPS} CCD sweeps "
+                    f"+ {NEWTON_MAX_ITER} Newton steps")
+    stats["unconverged"] = len(rows)
+
+    x = np.where(pad, 0.0, w / sd)
+    return x / x.sum(axis=1, keepdims=True), stats
+
+
+def initial_guess(R: "np.ndarray", b: "np.ndarray", pad: "np.ndarray",
+                  w0: Optional["np.ndarray"]) -> "np.ndarray":
+    """
+    Warm start in correlation space, scaled to wᵀRw = Σb. Names without a
+    guess take the mean of the slate's guesses — all of them, with no
+    warm start: Spinu's 1 / √(1ᵀR1) up to that scale. A warm start is only
+    kept where it beats that cold one on Spinu's objective — on the
+    wᵀRw = Σb scale that is −Σ b log w — since a slate where many names
+    changed side is often better off starting over.
+    """
+    cold = rescale(R, b, np.ones_like(b))
+    if w0 is None:
+        return cold
+    w = np.abs(w0)
+    known = (w > 0) & ~pad
+    fill = np.divide((w * known).sum(axis=1), known.sum(axis=1),
+                     out=np.ones(len(w)), where=known.any(axis=1))
+    w = rescale(R, b, np.where(pad, 1.0, np.where(known, w, fill[:, None])))
+    warmer = (b * np.log(w)).sum(axis=1) > (b * np.log(cold)).sum(axis=1)
+    return np.where(warmer[:, None], w, cold)
+
+
+def rescale(R: "np.ndarray", b: "np.ndarray", w: "np.ndarray") -> "np.ndarray":
+    quad = (w * _matvec(R, w)).sum(axis=1)
+    return w * np.sqrt(b.sum(axis=1) / quad)[:, None]
+
+
+def budget_error(R: "np.ndarray", b: "np.ndarray", w: "np.ndarray") -> "np.ndarray":
+    """max_i |w_i (Rw)_i / b_i − 1| per slate (0 at the risk-budget root)."""
+    return np.abs(w * _matvec(R, w) / b - 1.0).max(axis=1)
+
+
+def ccd_sweep(R: "np.ndarray", b: "np.ndarray", w: "np.ndarray") -> "np.ndarray":
+    """One improved-CCD sweep (exact root per coordinate), then the rescale."""
+    w = w.copy()
+    Rw = _matvec(R, w)
+    for i in range(w.shape[1]):
+        a = (Rw[:, i] - w[:, i]) / 2
+        new = np.sqrt(a * a + b[:, i]) - a
+        Rw += (new - w[:, i])[:, None] * R[:, i, :]
+        w[:, i] = new
+    return rescale(R, b, w)
+
+
+def newton_step(R: "np.ndarray", R32: "np.ndarray", b: "np.ndarray", w: "np.ndarray",
+                U: "np.ndarray", lam: "np.ndarray") -> "np.ndarray":
+    """
+    Damped inexact Newton on F(w) = Rw − b/w (Spinu): J = R + diag(b/w²) is
+    symmetric positive definite, so the step comes from preconditioned
+    conjugate gradients on R32 (matrix-vector products only, forcing term
+    √‖F‖ within [PCG_RTOL_MIN, ½]) and line_search damps it. Used where
+    CCD stalls — typically long/short slates, whose signed correlation
+    matrix has large negative blocks. F and the step length use the
+    float64 R, so float32 only ever makes a step less exact, not the root.
+
+    Preconditioner: J ≈ U·diag(λ)·Uᵀ + E with (U, λ) from top_eigen and E
+    the rest of J's diagonal, applied by Woodbury in O(n·k). The factor
+    eigenvalues of a few-thousand-name correlation matrix are in the
+    hundreds, which is what plain Jacobi leaves CG to grind through.
+    """
+    F = _matvec(R, w) - b / w
+    L = U * np.sqrt(lam)[:, None, :]
+    E = np.maximum(1.0 - (L * L).sum(axis=2), 0.0) + b / (w * w)     # diag(R) = 1
+    G = L / E[:, :, None]
+    K = np.linalg.inv(np.eye(L.shape[2]) + np.swapaxes(L, 1, 2) @ G)
+
+    def precondition(r):
+        return r / E - _matvec(G, _matvec(K, _matvec(np.swapaxes(G, 1, 2), r)))
+
+    rtol = np.clip(np.sqrt(np.linalg.norm(F, axis=1)), PCG_RTOL_MIN, 0.5)
+    dw = _pcg(R32, b / (w * w), -F, rtol, precondition)
+    return w + line_search(b, w, dw, (dw * (F + b / w)).sum(axis=1),
+                           (dw * _matvec(R, dw)).sum(axis=1))[:, None] * dw
+
+
+def line_search(b: "np.ndarray", w: "np.ndarray", d: "np.ndarray",
+                dRw: "np.ndarray", dRd: "np.ndarray") -> "np.ndarray":
+    """
+    Backtracking (Armijo) step along d for Spinu's convex objective
+    ½wᵀRw − Σ b log w, whose gradient is F. Along d its change is
+    η·dᵀRw + ½η²·dᵀRd − Σ b log(1 + η d/w), so trial steps cost no matrix
+    products beyond the one giving dᵀRd. Starts at the full step, or 99 %
+    of the way to the nearest zero weight.
+    """
+    ratio = d / w
+    slope = dRw - (b * ratio).sum(axis=1)                  # dᵀF < 0
+    eta = np.minimum(1.0, 0.99 / np.maximum(-ratio.min(axis=1), 1e-12))
+    for _ in range(SEARCH_ITER):
+        change = eta * dRw + 0.5 * eta * eta * dRd - (b * np.log1p(eta[:, None] * ratio)).sum(axis=1)
+        short = change > 1e-4 * eta * slope
+        if not short.any():
+            break
+        eta[short] /= 2
+    return eta
+
+
+def top_eigen(R: "np.ndarray", k: int) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Approximate top-k eigenpairs of each R (B × n × k vectors, B × k values ≥ 0):
+    randomized range finder with one power iteration, then Rayleigh–Ritz.
+    Three n × k block products — a few matrix-vector products' worth of
+    memory traffic.
+    """
+    omega = np.random.default_rng(0).standard_normal((R.shape[1], k), dtype=R.dtype)
+    Q, _ = np.linalg.qr(R @ omega)
+    Q, _ = np.linalg.qr(R @ Q)
+    lam, V = np.linalg.eigh(np.swapaxes(Q, 1, 2) @ (R @ Q))
+    return Q @ V, np.maximum(lam, 0.0)
+
+
+def _pcg(R: "np.ndarray", shift: "np.ndarray", rhs: "np.ndarray", rtol: "np.ndarray",
+         precondition) -> "np.ndarray":
+    """Solve (R + diag(shift)) x = rhs per row to ‖r‖ ≤ rtol · ‖rhs‖."""
+    x = np.zeros_like(rhs)
+    r = rhs.copy()
+    z = precondition(r)
+    p = z.copy()
+    rz = (r * z).sum(axis=1)
+    target = rtol * np.linalg.norm(rhs, axis=1)
+    for _ in range(PCG_MAX_ITER):
+        Ap = _matvec(R, p.astype(R.dtype)) + shift * p
+        pAp = (p * Ap).sum(axis=1)
+        alpha = np.divide(rz, pAp, out=np.zeros_like(rz), where=pAp > 0)
+        x += alpha[:, None] * p
+        r -= alpha[:, None] * Ap
+        if (np.linalg.norm(r, axis=1) <= target).all():
+            break
+        z = precondition(r)
+        rz_new = (r * z).sum(axis=1)
+        beta = np.divide(rz_new, rz, out=np.zeros_like(rz), where=rz > 0)
+        p = z + beta[:, None] * p
+        rz = rz_new
+    return x
+
+
+def _matvec(A: "np.ndarray", x: "np.ndarray") -> "np.ndarray":
+    return np.matmul(A, x[:, :, None])[:, :, 0]
+
+
+def risk_contributions(cov: "np.ndarray", w: "np.ndarray") -> "np.ndarray":
+    """Share of each name in wᵀΣw (B × n, rows sum to 1)."""
+    rc = w * _matvec(cov, w)
+    return rc / rc.sum(axis=1, keepdims=True)
+
+
+# ── Slates ───────────────────────────────────────────────────────────────
+
+@dataclass
+class Slate:
+    portfolio_id: object
+    asof_date:    date
+    symbol_ids:   list
+    scores:       list
+
+
+def allocate(slates: list[Slate], cov: "np.ndarray", col: dict, budget: str = "equal",
+             previous: Optional[dict] = None) -> tuple[list[dict], dict]:
+    """
+    One date's slates against that date's covariance (col: symbol_id → index).
+    previous: portfolio_id → {symbol_id: weight}. Returns ({symbol_id: weight}
+    per slate, solver stats); names without history or score get no weight.
+    """
+    diag = np.diagonal(cov)
+    picks = [
+        [(sym, sc) for sym, sc in zip(s.symbol_ids, s.scores)
+         if sc and sym in col and diag[col[sym]] > 0]
+        for s in slates
+    ]
+    n = max((len(k) for k in picks), default=0)
+    if n == 0:
+        return [{} for _ in slates], {"ccd_sweeps": 0, "newton_iters": 0, "unconverged": 0}
+
+    B = len(slates)
+    sub = np.zeros((B, n, n))
+    budgets = np.zeros((B, n))
+    w0 = np.zeros((B, n))
+    for b, keep in enumerate(picks):
+        if not keep:
+            continue
+        k = len(keep)
+        idx = np.array([col[sym] for sym, _ in keep])
+        score = np.array([sc for _, sc in keep])
+        sign = np.sign(score)
+        sub[b, :k, :k] = cov[np.ix_(idx, idx)] * np.outer(sign, sign)
+        raw = np.abs(score) if budget == "score" else np.ones(k)
+        budgets[b, :k] = raw / raw.sum()
+        prev = (previous or {}).get(slates[b].portfolio_id, {})
+        guess = np.array([prev.get(sym, 0.0) for sym, _ in keep])
+        w0[b, :k] = np.maximum(sign * guess, 0.0)        # a name that changed side starts fresh
+
+    w, stats = solve_risk_budget(sub, budgets, w0)
+    out = [
+        {sym: float(np.sign(sc) * w[b, j]) for j, (sym, sc) in enumerate(keep)}
+        for b, keep in enumerate(picks)
+    ]
+    return out, stats
+
+
+# ── Database ─────────────────────────────────────────────────────────────
+
+async def load_slates(conn, model_version: str, start: date, end: date) -> dict[date, list[Slate]]:
+    cols = await db.fetch_columns(
+        conn,
+        """
+        SELECT t.portfolio_id, t.asof_date, t.symbol_id, e.score::float8 AS score
+        FROM portfolio.target_weights t
+        LEFT JOIN models.ensemble_output_daily e
+          ON e.model_version = t.model_version AND e.asof_date = t.asof_date
+         AND e.symbol_id = t.symbol_id
+        WHERE t.model_version = $1 AND t.asof_date BETWEEN $2 AND $3
+        ORDER BY t.asof_date, t.portfolio_id, t.symbol_id
+        """,
+        model_version, start, end,
+    )
+    slates: dict[date, list[Slate]] = defaultdict(list)
+    for pid, day, sym, score in zip(*(cols.get(c, []) for c in
+                                      ("portfolio_id", "asof_date", "symbol_id", "score"))):
+        day_slates = slates[day]
+        if not day_slates or day_slates[-1].portfolio_id != pid:
+            day_slates.append(Slate(pid, day, [], []))
+        day_slates[-1].symbol_ids.append(sym)
+        day_slates[-1].scores.append(score)
+    return slates
+
+
+async def load_previous(conn, model_version: str, before: date) -> dict:
+    """Each portfolio's raw_score weights on its last slate before `before`."""
+    rows = await conn.fetch(
+        """
+        SELECT t.portfolio_id, t.symbol_id, t.raw_score::float8 AS raw_score
+        FROM portfolio.target_weights t
+        JOIN (
+            SELECT portfolio_id, max(asof_date) AS asof_date
+            FROM portfolio.target_weights
+            WHERE model_version = $1 AND asof_date < $2 AND raw_score IS NOT NULL
+            GROUP BY portfolio_id
+        ) last USING (portfolio_id, asof_date)
+        WHERE t.model_version = $1
+        """,
+        model_version, before,
+    )
+    previous: dict = defaultdict(dict)
+    for r in rows:
+        if r["raw_score"] is not None:
+            previous[r["portfolio_id"]][r["symbol_id"]] = r["raw_score"]
+    return previous
+
+
+async def load_prices(conn, symbol_ids: list, start: date, end: date) -> tuple["np.ndarray", "np.ndarray"]:
+    """(dates, closes dates × symbols, NaN = no print) for [start, end]."""
+    cols = await db.fetch_columns(
+        conn,
+        """
+        SELECT (p.asof_date - $1::date) AS d, (sym.ord - 1)::int AS s, p.close::float8 AS close
+        FROM market.prices_daily p
+        JOIN unnest($3::uuid[]) WITH ORDINALITY AS sym(symbol_id, ord) ON sym.symbol_id = p.symbol_id
+        WHERE p.asof_date BETWEEN $1 AND $2
+        """,
+        start, end, symbol_ids,
+        numpy=True,
+    )
+    closes = np.full(((end - start).days + 1, len(symbol_ids)), np.nan)
+    if cols:
+        closes[cols["d"], cols["s"]] = cols["close"]
+    traded = ~np.isnan(closes).all(axis=1)
+    dates = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    return dates[traded], closes[traded]
+
+
+def covariance_asof(dates: "np.ndarray", closes: "np.ndarray", day: date) -> "np.ndarray":
+    """Shrunk covariance of the LOOKBACK_DAYS price rows up to and including `day`."""
+    hi = int(np.searchsorted(dates, np.datetime64(day), side="right"))
+    window = closes[max(0, hi - LOOKBACK_DAYS - 1):hi]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.diff(np.log(window), axis=0)
+    cov = shrunk_covariance(returns)
+    thin = (~np.isnan(returns)).sum(axis=0) < MIN_OBS
+    cov[thin, :] = 0.0
+    cov[:, thin] = 0.0
+    return cov
+
+
+async def write_raw_scores(conn, model_version: str, rows: list[tuple]) -> int:
+    """(portfolio_id, asof_date, symbol_id, weight) → raw_score; CLOSED portfolios skipped."""
+    if not rows:
+        return 0
+    records = [(pid, day, model_version, sym, repr(w)) for pid, day, sym, w in rows]
+    async with conn.transaction():
+        await conn.execute(
+            """
+            CREATE TEMP TABLE stage_raw_score (
+                portfolio_id uuid, asof_date date, model_version text,
+                symbol_id uuid, raw_score numeric
+            ) ON COMMIT DROP
+            """
+        )
+        await conn.copy_records_to_table("stage_raw_score", records=records)
+        status = await conn.execute(
+            """
+            UPDATE portfolio.target_weights t
+            SET raw_score = s.raw_score
+            FROM stage_raw_score s
+            WHERE t.portfolio_id = s.portfolio_id AND t.asof_date = s.asof_date
+              AND t.model_version = s.model_version AND t.symbol_id = s.symbol_id
+              AND NOT EXISTS (
+                  SELECT 1 FROM portfolio.portfolios p
+                  WHERE p.portfolio_id = t.portfolio_id AND p.status = 'CLOSED'
+              )
+            """
+        )
+    return int(status.split()[-1])
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+
+async def run(args) -> int:
+    pool = await db.create_pool("risk_parity", session=True)
+    try:
+        async with pool.acquire() as conn:
+            slates = await load_slates(conn, args.version, args.start, args.end)
+            if not slates:
+                log.info("nothing to allocate")
+                return 0
+            symbols = sorted({s for day in slates.values() for sl in day for s in sl.symbol_ids})
+            col = {s: i for i, s in enumerate(symbols)}
+            # Calendar days comfortably covering LOOKBACK_DAYS trading rows.
+            dates, closes = await load_prices(conn, symbols,
+                                              args.start - timedelta(days=LOOKBACK_DAYS * 7 // 5 + 14),
+                                              args.end)
+            previous = await load_previous(conn, args.version, args.start)
+
+            rows, unconverged = [], 0
+            for day in sorted(slates):
+                t0 = time.perf_counter()
+                cov = covariance_asof(dates, closes, day)
+                t_cov = time.perf_counter() - t0
+                weights, stats = allocate(slates[day], cov, col, args.budget, previous)
+                unconverged += stats["unconverged"]
+                for sl, w in zip(slates[day], weights):
+                    previous[sl.portfolio_id] = w
+                    rows += [(sl.portfolio_id, day, sym, w.get(sym, 0.0)) for sym in sl.symbol_ids]
+                log.info(f"  ⚖️  {day} — {len(slates[day])} slates, ≤{max(len(s.symbol_ids) for s in slates[day])} names: "
+                         f"cov {t_cov * 1000:.0f} ms, solve {(time.perf_counter() - t0 - t_cov) * 1000:.0f} ms "
+                         f"({stats['ccd_sweeps']} CCD sweeps, {stats['newton_iters']} Newton steps)")
+
+            if args.write:
+                written = await write_raw_scores(conn, args.version, rows)
+                log.info(f"✅ {written:,} raw_score rows written")
+            else:
+                log.info(f"dry run — {len(rows):,} raw_score rows not written (--write)")
+    finally:
+        await pool.close()
+    return 1 if unconverged else 0
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s [risk_parity] %(levelname)s %(message)s")
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--start", type=date.fromisoformat, required=True)
+    ap.add_argument("--end", type=date.fromisoformat, required=True)
+    ap.add_argument("--version", default=MODEL_VERSION)
+    ap.add_argument("--budget", choices=("equal", "score"), default="equal",
+                    help="risk budget per name: equal, or proportional to |ensemble score|")
+    ap.add_argument("--write", action="store_true", help="write raw_score (default: dry run)")
+    args = ap.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
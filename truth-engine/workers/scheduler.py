@@ -0,0 +1,239 @@
+"""
+scheduler.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Wall-clock Scheduler for Daily / Weekly Workers
+
+Replaces `sleep(POLL_INTERVAL)` loops, which re-ran the full job on every
+restart and drifted by the job's own runtime. A job has:
+
+  schedule     5-field cron expression in an IANA timezone
+               ("0 8 * * 1-5", "America/New_York" = 08:00 ET weekdays)
+  catch_up     a slot missed while the process was down runs once on
+               start; otherwise a missed slot is skipped unless within
+               ON_TIME_GRACE
+  fresh_for    skip-if-fresh — never start if the last success is newer
+               than this, whatever the schedule says
+  retry_after  a failed run is retried after this, not on the next slot
+
+Last success is read from market.ingest_run_log_v1 (max completed_at
+for source_name, run_status = 'COMPLETED') before every decision, so the
+state survives restarts and is shared with whatever wrote the log. Each
+job's run function must write that COMPLETED row itself (log_run).
+
+    job = ScheduledJob(WORKER_VERSION, CronSchedule("0 3 * * *", "America/New_York"),
+                       fresh_for=timedelta(hours=12))
+    await run_async(job, lambda: run_once(pool), lambda: last_success_pg(pool, job.name))
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+from zoneinfo import ZoneInfo
+
+from metrics import RUN_SECONDS
+
+log = logging.getLogger("scheduler")
+
+ON_TIME_GRACE  = timedelta(minutes=15)
+MAX_SLEEP_SECS = 3600        # re-check at least hourly (clock jumps, suspended hosts)
+MAX_SCAN_DAYS  = 4 * 366     # long enough to reach any Feb 29 slot
+
+
+def _parse_field(field: str, lo: int, hi: int) -> set[int]:
+    out = set()
+    for part in field.split(","):
+        rng, _, step = part.partition("/")
+        if rng == "*":
+            a, b = lo, hi
+        elif "-" in rng:
+            a, b = (int(x) for x in rng.split("-"))
+        else:
+            a = b = int(rng)
+            if step:
+                b = hi
+        if not (lo <= a <= b <= hi):
+            raise ValueError(f"cron field {field!r} out of range {lo}-{hi}")
+        out.update(range(a, b + 1, int(step) if step else 1))
+    return out
+
+
+class CronSchedule:
+    """Standard cron semantics: day-of-month and day-of-week are OR'ed when both are restricted."""
+
+    def __init__(self, expr: str, tz: str = "UTC"):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+        self.expr = expr
+        self.tz = ZoneInfo(tz)
+        minutes = _parse_field(fields[0], 0, 59)
+        hours   = _parse_field(fields[1], 0, 23)
+        self.dom    = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.dow    = {d % 7 for d in _parse_field(fields[4], 0, 7)}     # 0 and 7 = Sunday
+        self.dom_any = fields[2] == "*"
+        self.dow_any = fields[4] == "*"
+        self.times = sorted((h, m) for h in hours for m in minutes)
+
+    def __repr__(self) -> str:
+        return f"CronSchedule({self.expr!r}, {self.tz.key!r})"
+
+    def _day_matches(self, d: date) -> bool:
+        if d.month not in self.months:
+            return False
+        dom_ok = d.day in self.dom
+        dow_ok = d.isoweekday() % 7 in self.dow
+        if self.dom_any or self.dow_any:
+            return dom_ok and dow_ok
+        return dom_ok or dow_ok
+
+    def _slots(self, d: date, reverse: bool):
+        times = reversed(self.times) if reverse else self.times
+        for h, m in times:
+            yield datetime(d.year, d.month, d.day, h, m, tzinfo=self.tz)
+
+    def next_after(self, dt: datetime) -> datetime:
+        """First slot strictly after dt."""
+        start = dt.astimezone(self.tz).date()
+        for i in range(MAX_SCAN_DAYS):
+            d = start + timedelta(days=i)
+            if self._day_matches(d):
+                for slot in self._slots(d, reverse=False):
+                    if slot > dt:
+                        return slot
+        raise ValueError(f"{self!r} has no slot after {dt}")
+
+    def prev_at_or_before(self, dt: datetime) -> Optional[datetime]:
+        """Most recent slot <= dt."""
+        start = dt.astimezone(self.tz).date()
+        for i in range(MAX_SCAN_DAYS):
+            d = start - timedelta(days=i)
+            if self._day_matches(d):
+                for slot in self._slots(d, reverse=True):
+                    if slot <= dt:
+                        return slot
+        return None
+
+
+@dataclass
+class ScheduledJob:
+    name:        str                          # source_name in ingest_run_log_v1
+    schedule:    CronSchedule
+    catch_up:    bool = True
+    fresh_for:   Optional[timedelta] = None
+    retry_after: timedelta = timedelta(minutes=30)
+
+    def plan(self, now: datetime, last_success: Optional[datetime]) -> tuple[bool, datetime]:
+        """(run now?, when to look again)."""
+        nxt = self.schedule.next_after(now)
+        if last_success and self.fresh_for and now - last_success < self.fresh_for:
+            return False, nxt
+        slot = self.schedule.prev_at_or_before(now)
+        if slot is None or (last_success and last_success >= slot):
+            return False, nxt
+        if not self.catch_up and now - slot > ON_TIME_GRACE:
+            return False, nxt
+        return True, now
+
+
+# ── Last-success readers ─────────────────────────────────────────────────
+
+async def last_success_pg(pool, source_name: str) -> Optional[datetime]:
+    return await pool.fetchval(
+        """
+        SELECT max(completed_at) FROM market.ingest_run_log_v1
+        WHERE source_name = $1 AND run_status = 'COMPLETED'
+        """,
+        source_name,
+    )
+
+
+def last_success_supabase(supabase, source_name: str) -> Optional[datetime]:
+    res = (
+        supabase.schema("market").table("ingest_run_log_v1")
+        .select("completed_at")
+        .eq("source_name", source_name)
+        .eq("run_status", "COMPLETED")
+        .order("completed_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    if not res.data or not res.data[0].get("completed_at"):
+        return None
+    return datetime.fromisoformat(res.data[0]["completed_at"])
+
+
+# ── Loops ────────────────────────────────────────────────────────────────
+
+class _JobState:
+    def __init__(self, job: ScheduledJob):
+        self.job = job
+        self.known_success: Optional[datetime] = None   # covers a lagging / unreadable run log
+        self.announced: Optional[datetime] = None
+
+    def decide(self, persisted: Optional[datetime]) -> tuple[bool, float]:
+        now = datetime.now(timezone.utc)
+        last = max((t for t in (persisted, self.known_success) if t), default=None)
+        due, wake = self.job.plan(now, last)
+        if due:
+            log.info(f"⏰ {self.job.name} due (last success: {last or 'never'})")
+        elif wake != self.announced:
+            self.announced = wake
+            log.info(f"💤 {self.job.name} next run {wake.isoformat()} (last success: {last or 'never'})")
+        return due, min(max((wake - now).total_seconds(), 1), MAX_SLEEP_SECS)
+
+    def succeeded(self):
+        self.known_success = datetime.now(timezone.utc)
+
+
+async def run_async(job: ScheduledJob,
+                    run: Callable[[], Awaitable[None]],
+                    last_success: Callable[[], Awaitable[Optional[datetime]]]) -> None:
+    state = _JobState(job)
+    while True:
+        try:
+            persisted = await last_success()
+        except Exception as e:
+            log.warning(f"{job.name}: could not read last success ({e}) — using in-process state")
+            persisted = None
+        due, wait = state.decide(persisted)
+        if due:
+            t0 = time.perf_counter()
+            try:
+                await run()
+                RUN_SECONDS.labels(job.name, "completed").observe(time.perf_counter() - t0)
+                state.succeeded()
+                continue
+            except Exception as e:
+                RUN_SECONDS.labels(job.name, "failed").observe(time.perf_counter() - t0)
+                log.error(f"{job.name} run failed: {e} — retrying in {job.retry_after}", exc_info=True)
+                wait = job.retry_after.total_seconds()
+        await asyncio.sleep(wait)
+
+
+def run_blocking(job: ScheduledJob,
+                 run: Callable[[], None],
+                 last_success: Callable[[], Optional[datetime]]) -> None:
+    state = _JobState(job)
+    while True:
+        try:
+            persisted = last_success()
+        except Exception as e:
+            log.warning(f"{job.name}: could not read last success ({e}) — using in-process state")
+            persisted = None
+        due, wait = state.decide(persisted)
+        if due:
+            t0 = time.perf_counter()
+            try:
+                run()
+                RUN_SECONDS.labels(job.name, "completed").observe(time.perf_counter() - t0)
+                state.succeeded()
+                continue
+            except Exception as e:
+                RUN_SECONDS.labels(job.name, "failed").observe(time.perf_counter() - t0)
+                log.error(f"{job.name} run failed: {e} — retrying in {job.retry_after}")
+                wait = job.retry_after.total_seconds()
+        time.sleep(wait)
@@ -1,54 +1,32 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncio
+import logging
 import os
-import time
 
-DB_URL = os.getenv("DATABASE_URL")
+from nav_feed import NavFeed
 
+# LISTEN needs a session connection (direct / Session Pooler :5432)
+DB_URL = os.getenv("NAV_FEED_DSN") or os.getenv("DB_SESSION_URL") or os.getenv("DATABASE_URL")
 
-def get_connection():
-    return psycopg2.connect(DB_URL, cursor_factory=RealDictCursor)
 
+def print_nav(snap):
+    print(
+        f"NAV → fund={snap.fund_id} | "
+        f"value={snap.nav_value} | "
+        f"date={snap.nav_date}"
+    )
 
-def fetch_latest_nav(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT
-                fund_id,
-                nav_total AS nav_value,
-                nav_asof  AS nav_date
-            FROM capital.nav_snapshots_v1
-            ORDER BY nav_asof DESC
-            LIMIT 1;
-        """)
-        return cur.fetchone()
 
+async def run_nav_sensor():
+    print("NAV SENSOR STARTED")
+    feed = NavFeed(DB_URL, on_change=print_nav)
+    await feed.run()
 
-def run_nav_sensor():
-    print("NAV SENSOR LOOP STARTED")
 
-    conn = get_connection()
-
-    while True:
-        try:
-            row = fetch_latest_nav(conn)
-
-            if row:
-                print(
-                    f"NAV → fund={row['fund_id']} | "
-                    f"value={row['nav_value']} | "
-                    f"date={row['nav_date']}"
-                )
-            else:
-                print("NAV → no rows found")
-
-            time.sleep(5)
-
-        except Exception as e:
-            print("NAV SENSOR ERROR:", e)
-            time.sleep(5)
+async def main():
+    await run_nav_sensor()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(name)s] %(levelname)s %(message)s")
     print("Truth Engine booting...")
-    run_nav_sensor()
\ No newline at end of file
+    asyncio.run(main())
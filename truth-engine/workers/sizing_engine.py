@@ -0,0 +1,378 @@
+"""
+sizing_engine.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Batch Risk-Capped Sizing
+
+Python twin of risk.size_weights_basic / risk.apply_sizing_basic for the
+cases SQL is slow at: historical re-sizing and what-if caps across every
+portfolio and date at once.
+
+Every (portfolio_id, asof_date) slate of portfolio.target_weights is one
+row of a padded batch. Raw scores are scaled to the gross cap and then
+projected (least-squares) onto the portfolio's risk set:
+
+    |w_i| ≤ max_position        Σ|w_i| ≤ gross_cap        |Σ w_i| ≤ net_cap
+
+The position box ∩ gross ball has an exact projection (soft-threshold,
+clipped at max_position, threshold found by safeguarded Newton). The net
+cap adds one multiplier per slate — a uniform shift of the scores —
+solved by a bracketed secant search. Every step runs on all unconverged
+slates at once.
+
+Tables (column names as used here):
+  portfolio.target_weights        portfolio_id, asof_date, model_version, symbol_id,
+                                  raw_score, target_weight
+  risk.portfolio_risk_settings    portfolio_id, max_position, gross_cap, net_cap
+  portfolio.portfolios            portfolio_id, status — CLOSED portfolios are never written
+
+A NULL raw_score sizes to 0. Slates whose portfolio has no risk settings
+are not sized at all (Portfolio Canon: no execution without settings).
+
+    python workers/sizing_engine.py --start 2025-01-01 --end 2026-10-16                 # dry run
+    python workers/sizing_engine.py --start 2025-01-01 --end 2026-10-16 --write
+    python workers/sizing_engine.py --start 2026-10-01 --end 2026-10-16 --max-position 0.03
+    python workers/sizing_engine.py --start 2026-10-01 --end 2026-10-16 --parity 50
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Optional
+
+import db
+from lazy import lazy_import
+
+log = logging.getLogger("sizing_engine")
+
+np = lazy_import("numpy")
+
+MODEL_VERSION      = "ensemble_v2"
+THRESHOLD_MAX_ITER = 100    # safeguarded Newton, box ∩ gross projection
+THRESHOLD_TOL      = 1e-13   # |gross − cap|, relative to max(cap, 1)
+NET_MAX_ITER       = 100     # regula falsi on the net-cap multiplier
+NET_TOL            = 1e-12   # |net − cap|, relative to max(cap, 1)
+FEASIBLE_TOL       = 1e-9      # cap check / parity tolerance
+
+
+# ── Batch ────────────────────────────────────────────────────────────────
+
+@dataclass
+class SizingBatch:
+    """B slates of up to n names each; padding has mask False and score 0."""
+    portfolio_ids: list                  # B
+    asof_dates:    list                  # B
+    symbol_ids:    list                  # B lists, in column order
+    scores:        "np.ndarray"          # B × n raw_score (NaN → 0, masked out)
+    mask:          "np.ndarray"          # B × n
+    max_position:  "np.ndarray"          # B
+    gross_cap:     "np.ndarray"          # B
+    net_cap:       "np.ndarray"          # B
+
+    def __len__(self) -> int:
+        return len(self.portfolio_ids)
+
+    def with_caps(self, max_position: Optional[float] = None, gross_cap: Optional[float] = None,
+                  net_cap: Optional[float] = None) -> "SizingBatch":
+        """What-if copy with some caps overridden for every slate."""
+        caps = {}
+        for name, v in (("max_position", max_position), ("gross_cap", gross_cap), ("net_cap", net_cap)):
+            if v is not None:
+                caps[name] = np.full(len(self), float(v))
+        return replace(self, **caps)
+
+
+async def load_batch(conn, model_version: str, start: date, end: date,
+                     portfolio_ids: Optional[list] = None) -> SizingBatch:
+    """Every slate in [start, end] with risk settings, padded to one matrix."""
+    cols = await db.fetch_columns(
+        conn,
+        """
+        SELECT (dense_rank() OVER (ORDER BY t.portfolio_id, t.asof_date) - 1)::int      AS g,
+               (row_number() OVER (PARTITION BY t.portfolio_id, t.asof_date
+                                   ORDER BY t.symbol_id) - 1)::int                       AS j,
+               t.portfolio_id, t.asof_date, t.symbol_id,
+               t.raw_score::float8     AS raw_score,
+               s.max_position::float8  AS max_position,
+               s.gross_cap::float8     AS gross_cap,
+               s.net_cap::float8       AS net_cap
+        FROM portfolio.target_weights t
+        JOIN risk.portfolio_risk_settings s ON s.portfolio_id = t.portfolio_id
+        WHERE t.model_version = $1
+          AND t.asof_date BETWEEN $2 AND $3
+          AND ($4::uuid[] IS NULL OR t.portfolio_id = ANY($4::uuid[]))
+        ORDER BY 1, 2
+        """,
+        model_version, start, end, portfolio_ids,
+        numpy=True,
+    )
+    if not cols:
+        empty = np.zeros(0)
+        return SizingBatch([], [], [], np.zeros((0, 0)), np.zeros((0, 0), dtype=bool),
+                           empty, empty, empty)
+
+    g, j = cols["g"], cols["j"]
+    B, n = int(g[-1]) + 1, int(j.max()) + 1
+    scores = np.zeros((B, n))
+    mask = np.zeros((B, n), dtype=bool)
+    raw = cols["raw_score"]
+    mask[g, j] = ~np.isnan(raw)
+    scores[g, j] = np.nan_to_num(raw)
+
+    first = np.flatnonzero(j == 0)                         # one row per slate, in g order
+    bounds = np.append(first, len(g))
+    symbol_ids = cols["symbol_id"]
+    return SizingBatch(
+        portfolio_ids=[cols["portfolio_id"][i] for i in first],
+        asof_dates=[cols["asof_date"][i] for i in first],
+        symbol_ids=[symbol_ids[a:b] for a, b in zip(bounds[:-1], bounds[1:])],
+        scores=scores,
+        mask=mask,
+        max_position=cols["max_position"][first],
+        gross_cap=cols["gross_cap"][first],
+        net_cap=cols["net_cap"][first],
+    )
+
+
+# ── Projection ───────────────────────────────────────────────────────────
+
+def initial_weights(batch: SizingBatch) -> "np.ndarray":
+    """Raw scores scaled so each slate's gross equals its gross cap."""
+    gross = np.abs(batch.scores).sum(axis=1)
+    scale = np.divide(batch.gross_cap, gross, out=np.zeros_like(gross), where=gross > 0)
+    return batch.scores * scale[:, None]
+
+
+def project_box_gross(v: "np.ndarray", mask: "np.ndarray", max_position: "np.ndarray",
+                      gross_cap: "np.ndarray") -> "np.ndarray":
+    """
+    Row-wise Euclidean projection onto {|w_i| ≤ m, Σ|w_i| ≤ G}:
+    w_i = sign(v_i) · clip(|v_i| − τ, 0, m), with τ = 0 if that already fits.
+
+    gross(τ) is piecewise linear, so a Newton step from the current free set
+    lands exactly on the root once that set is right; steps leaving the
+    bracket fall back to bisection.
+    """
+    a = np.where(mask, np.abs(v), 0.0)
+    m = max_position[:, None]
+    tau = np.zeros(len(a))
+    lo = np.zeros(len(a))
+    hi = a.max(axis=1, initial=0.0)
+    rows = np.flatnonzero(np.clip(a, 0.0, m).sum(axis=1) > gross_cap)
+    for _ in range(THRESHOLD_MAX_ITER):
+        if not len(rows):
+            break
+        s = a[rows] - tau[rows, None]
+        f = np.clip(s, 0.0, m[rows]).sum(axis=1) - gross_cap[rows]
+        n_free = ((s > 0) & (s < m[rows])).sum(axis=1)
+        lo[rows] = np.where(f > 0, tau[rows], lo[rows])
+        hi[rows] = np.where(f > 0, hi[rows], tau[rows])
+        step = tau[rows] + np.divide(f, n_free, out=np.full(len(rows), np.inf), where=n_free > 0)
+        inside = (step > lo[rows]) & (step < hi[rows])
+        nxt = np.where(inside, step, (lo[rows] + hi[rows]) / 2)
+        done = (np.abs(f) <= THRESHOLD_TOL * np.maximum(gross_cap[rows], 1.0)) | (hi[rows] - lo[rows] <= 0)
+        tau[rows] = np.where(done, tau[rows], nxt)
+        rows = rows[~done]
+    return np.sign(v) * np.clip(a - tau[:, None], 0.0, m)
+
+
+def size_batch(batch: SizingBatch, w0: Optional["np.ndarray"] = None) -> tuple["np.ndarray", int]:
+    """
+    Capped weights for every slate (B × n) and the μ iterations used.
+
+    The net cap is one linear constraint, so the projection onto the whole
+    risk set is P(v − μ·1) for the box ∩ gross projection P and a scalar
+    multiplier μ per slate (0 while the net cap is slack). net(μ) is
+    monotone, so μ is found by Illinois regula falsi inside a bracket.
+    """
+    v = initial_weights(batch) if w0 is None else w0
+    mask, m, G, N = batch.mask, batch.max_position, batch.gross_cap, batch.net_cap
+
+    def net_gap(rows, mu):
+        w = project_box_gross(np.where(mask[rows], v[rows] - mu[:, None], 0.0),
+                              mask[rows], m[rows], G[rows])
+        return w, w.sum(axis=1) - target[rows]
+
+    w = project_box_gross(v, mask, m, G)
+    net = w.sum(axis=1)
+    target = np.clip(net, -N, N)
+    rows = np.flatnonzero(np.abs(net - target) > NET_TOL * np.maximum(N, 1.0))
+    if not len(rows):
+        return w, 0
+
+    # Bracket: long-heavy slates need μ in [0, max v], short-heavy in [min v, 0].
+    vmax = np.where(mask[rows], v[rows], -np.inf).max(axis=1)
+    vmin = np.where(mask[rows], v[rows], np.inf).min(axis=1)
+    long_heavy = net[rows] > target[rows]
+    lo = np.where(long_heavy, 0.0, vmin)                   # f(lo) ≥ 0
+    hi = np.where(long_heavy, vmax, 0.0)                   # f(hi) ≤ 0
+    f_lo = np.where(long_heavy, net[rows] - target[rows], net_gap(rows, lo)[1])
+    f_hi = np.where(long_heavy, net_gap(rows, hi)[1], net[rows] - target[rows])
+    side = np.zeros(len(rows))
+
+    iters = 0
+    while len(rows) and iters < NET_MAX_ITER:
+        iters += 1
+        denom = f_lo - f_hi
+        mu = np.where(denom > 0, hi + f_hi * (hi - lo) / np.where(denom > 0, denom, 1.0), (lo + hi) / 2)
+        wr, f = net_gap(rows, mu)
+        w[rows] = wr
+        done = np.abs(f) <= NET_TOL * np.maximum(N[rows], 1.0)
+
+        pos = f > 0
+        # Illinois: halve the stale end's value when the same side moves twice.
+        f_hi = np.where(pos & (side == 1), f_hi / 2, f_hi)
+        f_lo = np.where(~pos & (side == -1), f_lo / 2, f_lo)
+        lo, f_lo = np.where(pos, mu, lo), np.where(pos, f, f_lo)
+        hi, f_hi = np.where(pos, hi, mu), np.where(pos, f_hi, f)
+        side = np.where(pos, 1, -1)
+
+        keep = ~done
+        rows, lo, hi, f_lo, f_hi, side = (x[keep] for x in (rows, lo, hi, f_lo, f_hi, side))
+    if len(rows):
+        log.warning(f"⚠️  {len(rows)} slates hit NET_MAX_ITER={NET_MAX_ITER}")
+    return w, iters
+
+
+def cap_violations(batch: SizingBatch, w: "np.ndarray", tol: float = FEASIBLE_TOL) -> "np.ndarray":
+    """Per-slate flag: does w break max position, gross cap or net cap?"""
+    wm = np.where(batch.mask, w, 0.0)
+    return (
+        (np.abs(wm).max(axis=1, initial=0.0) > batch.max_position + tol)
+        | (np.abs(wm).sum(axis=1) > batch.gross_cap + tol)
+        | (np.abs(wm.sum(axis=1)) > batch.net_cap + tol)
+    )
+
+
+# ── Database ─────────────────────────────────────────────────────────────
+
+async def write_weights(conn, batch: SizingBatch, w: "np.ndarray", model_version: str) -> int:
+    """target_weight for every sized row, via one COPY + UPDATE; CLOSED portfolios skipped."""
+    records = [
+        (batch.portfolio_ids[b], batch.asof_dates[b], model_version, s, repr(x))
+        for b, symbols in enumerate(batch.symbol_ids)
+        for s, x in zip(symbols, w[b, :len(symbols)].tolist())
+    ]
+    if not records:
+        return 0
+    async with conn.transaction():
+        await conn.execute(
+            """
+            CREATE TEMP TABLE stage_target_weight (
+                portfolio_id uuid, asof_date date, model_version text,
+                symbol_id uuid, target_weight numeric
+            ) ON COMMIT DROP
+            """
+        )
+        await conn.copy_records_to_table("stage_target_weight", records=records)
+        status = await conn.execute(
+            """
+            UPDATE portfolio.target_weights t
+            SET target_weight = s.target_weight
+            FROM stage_target_weight s
+            WHERE t.portfolio_id = s.portfolio_id AND t.asof_date = s.asof_date
+              AND t.model_version = s.model_version AND t.symbol_id = s.symbol_id
+              AND NOT EXISTS (
+                  SELECT 1 FROM portfolio.portfolios p
+                  WHERE p.portfolio_id = t.portfolio_id AND p.status = 'CLOSED'
+              )
+            """
+        )
+    return int(status.split()[-1])
+
+
+async def parity(conn, batch: SizingBatch, w: "np.ndarray", model_version: str,
+                 sample: int) -> dict:
+    """Compare up to `sample` slates with risk.size_weights_basic; max |Δw| per slate."""
+    picks = random.Random(0).sample(range(len(batch)), min(sample, len(batch)))
+    worst, failed = 0.0, []
+    for b in picks:
+        rows = await conn.fetch(
+            "SELECT symbol_id, target_weight::float8 AS target_weight "
+            "FROM risk.size_weights_basic($1, $2, $3)",
+            batch.portfolio_ids[b], batch.asof_dates[b], model_version,
+        )
+        sql_w = {r["symbol_id"]: r["target_weight"] or 0.0 for r in rows}
+        ours = dict(zip(batch.symbol_ids[b], w[b].tolist()))
+        diff = max((abs(ours.get(s, 0.0) - sql_w.get(s, 0.0)) for s in ours.keys() | sql_w.keys()),
+                   default=0.0)
+        worst = max(worst, diff)
+        if diff > FEASIBLE_TOL:
+            failed.append((batch.portfolio_ids[b], batch.asof_dates[b], diff))
+    for pid, day, diff in failed[:10]:
+        log.warning(f"  ≠ {pid} {day} — max |Δw| {diff:.3g}")
+    return {"slates": len(picks), "mismatched": len(failed), "max_abs_diff": worst}
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────
+
+async def run(args) -> int:
+    pool = await db.create_pool("sizing_engine", session=True)
+    try:
+        async with pool.acquire() as conn:
+            t0 = time.perf_counter()
+            batch = await load_batch(conn, args.version, args.start, args.end,
+                                     args.portfolio or None)
+            t_load = time.perf_counter() - t0
+            what_if = any(v is not None for v in (args.max_position, args.gross_cap, args.net_cap))
+            if what_if:
+                batch = batch.with_caps(args.max_position, args.gross_cap, args.net_cap)
+
+            t0 = time.perf_counter()
+            w, iters = size_batch(batch)
+            t_size = time.perf_counter() - t0
+            bad = cap_violations(batch, w)
+            log.info(f"📐 {len(batch):,} slates × ≤{batch.scores.shape[1]} names — "
+                     f"load {t_load:.2f}s, size {t_size * 1000:.0f} ms ({iters} net iterations), "
+                     f"{int(bad.sum())} cap violations")
+            wm = np.where(batch.mask, w, 0.0)
+            if len(batch):
+                log.info(f"   gross mean {np.abs(wm).sum(axis=1).mean():.4f}, "
+                         f"net mean {wm.sum(axis=1).mean():+.4f}, "
+                         f"max position {np.abs(wm).max():.4f}")
+
+            if args.parity:
+                result = await parity(conn, batch, w, args.version, args.parity)
+                log.info(f"🔁 parity vs risk.size_weights_basic: {result}")
+                if result["mismatched"]:
+                    return 1
+            if args.write:
+                if what_if:
+                    log.error("❌ refusing to --write what-if caps — drop the overrides")
+                    return 2
+                written = await write_weights(conn, batch, w, args.version)
+                log.info(f"✅ {written:,} target_weight rows written")
+    finally:
+        await pool.close()
+    return 0
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s [sizing_engine] %(levelname)s %(message)s")
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--start", type=date.fromisoformat, required=True)
+    ap.add_argument("--end", type=date.fromisoformat, required=True)
+    ap.add_argument("--version", default=MODEL_VERSION)
+    ap.add_argument("--portfolio", action="append", default=[], type=uuid.UUID, help="portfolio_id (repeatable)")
+    ap.add_argument("--max-position", type=float, help="what-if: override for every portfolio")
+    ap.add_argument("--gross-cap", type=float, help="what-if: override for every portfolio")
+    ap.add_argument("--net-cap", type=float, help="what-if: override for every portfolio")
+    ap.add_argument("--parity", type=int, default=0, metavar="N",
+                    help="compare N random slates with risk.size_weights_basic; exit 1 on mismatch "
+                         "(not with what-if caps)")
+    ap.add_argument("--write", action="store_true", help="write target_weight (default: dry run)")
+    args = ap.parse_args(argv)
+    if args.parity and any(v is not None for v in (args.max_position, args.gross_cap, args.net_cap)):
+        log.error("❌ --parity compares against the stored caps — drop the what-if overrides")
+        return 2
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+spill_journal.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Memory-mapped Spill Journal
+
+Durable local buffer for ticks and bars that could not be written while
+the database is unreachable. One preallocated file, memory-mapped,
+append-only between compactions:
+
+  header (64 B)  magic | version | capacity | write_off | read_off | dropped
+  records        [u32 count][u8 kind] + count × fixed-size struct
+
+Rows are fixed-size structs keyed by asset id (not registry slot), so a
+journal written by one process replays correctly after a restart with a
+different symbol list. append() msyncs the pages it touched before
+returning. advance() moves read_off only after the caller has committed
+a batch, and a crash in between just replays that batch again — writers
+must be idempotent (ON CONFLICT DO NOTHING). When the journal is fully
+drained both offsets reset to 0.
+
+The file never grows past header + capacity. An append that does not fit
+is refused and counted in `dropped`.
+"""
+
+import mmap
+import os
+import struct
+import uuid
+from typing import Iterator
+
+MAGIC       = b"NTSPILL1"
+VERSION     = 1
+HEADER      = struct.Struct("<8sIIQQQQ")   # magic, version, pad, capacity, write, read, dropped
+HEADER_SIZE = 64
+REC_HEAD    = struct.Struct("<IB")         # row count, kind
+
+KIND_TRADE = 1
+KIND_BAR   = 2
+ROW_STRUCT = {
+    KIND_TRADE: struct.Struct("<16sqqdd?"),   # asset, trade_id, ts_ms, price, size, maker
+    KIND_BAR:   struct.Struct("<16siq6dq"),   # asset, tf_s, bucket_ms, o, h, l, c, volume, vwap, count
+}
+
+
+class SpillJournal:
+    def __init__(self, path: str, capacity_bytes: int):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fresh = not os.path.exists(path) or os.path.getsize(path) < HEADER_SIZE
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        if not fresh:
+            with open(path, "rb") as f:
+                magic, version, _, cap, w, r, dropped = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise RuntimeError(f"{path} is not a v{VERSION} spill journal")
+            if w > r and cap != capacity_bytes:
+                capacity_bytes = cap    # keep unreplayed data addressable; resize once drained
+        else:
+            w = r = dropped = 0
+
+        self.capacity = capacity_bytes
+        os.ftruncate(self._fd, HEADER_SIZE + capacity_bytes)
+        self._mm = mmap.mmap(self._fd, HEADER_SIZE + capacity_bytes)
+        self.write_off, self.read_off, self.dropped = w, r, dropped
+        self._write_header()
+
+    # ── State ────────────────────────────────────────────────────────────
+
+    @property
+    def pending_bytes(self) -> int:
+        return self.write_off - self.read_off
+
+    def _write_header(self):
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, self.capacity,
+                         self.write_off, self.read_off, self.dropped)
+        self._mm.flush(0, mmap.PAGESIZE)
+
+    def _sync(self, start: int, end: int):
+        lo = start - start % mmap.PAGESIZE
+        self._mm.flush(lo, end - lo)
+
+    # ── Append ───────────────────────────────────────────────────────────
+
+    def append(self, kind: int, rows: list[tuple]) -> bool:
+        """rows are ROW_STRUCT[kind] tuples with the asset id as a uuid string."""
+        if not rows:
+            return True
+        st = ROW_STRUCT[kind]
+        size = REC_HEAD.size + st.size * len(rows)
+        if self.write_off + size > self.capacity:
+            self.dropped += len(rows)
+            self._write_header()
+            return False
+
+        base = HEADER_SIZE + self.write_off
+        REC_HEAD.pack_into(self._mm, base, len(rows), kind)
+        off = base + REC_HEAD.size
+        pack_into = st.pack_into
+        asset_bytes: dict[str, bytes] = {}
+        for row in rows:
+            asset = row[0]
+            b = asset_bytes.get(asset)
+            if b is None:
+                b = asset_bytes[asset] = uuid.UUID(asset).bytes
+            pack_into(self._mm, off, b, *row[1:])
+            off += st.size
+        self._sync(base, base + size)
+        self.write_off += size
+        self._write_header()
+        return True
+
+    # ── Replay ───────────────────────────────────────────────────────────
+
+    def read_batches(self, max_rows: int) -> Iterator[tuple[int, list[tuple], int]]:
+        """
+        Yield (kind, rows, end_offset) in journal order, merging consecutive
+        records of the same kind up to max_rows. Asset ids come back as
+        uuid.UUID. Call advance(end_offset) once a batch is committed.
+        """
+        off = self.read_off
+        kind_cur, rows_cur = None, []
+        while off < self.write_off:
+            count, kind = REC_HEAD.unpack_from(self._mm, HEADER_SIZE + off)
+            st = ROW_STRUCT[kind]
+            if kind_cur is not None and (kind != kind_cur or len(rows_cur) + count > max_rows):
+                yield kind_cur, rows_cur, off
+                rows_cur = []
+            kind_cur = kind
+            start = HEADER_SIZE + off + REC_HEAD.size
+            for row in st.iter_unpack(self._mm[start:start + st.size * count]):
+                rows_cur.append((uuid.UUID(bytes=row[0]),) + row[1:])
+            off += REC_HEAD.size + st.size * count
+        if rows_cur:
+            yield kind_cur, rows_cur, off
+
+    def advance(self, end_offset: int):
+        self.read_off = end_offset
+        if self.read_off >= self.write_off:
+            self.read_off = self.write_off = 0
+        self._write_header()
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        os.close(self._fd)
@@ -0,0 +1,194 @@
+"""
+supabase_sink.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Buffered Supabase Sink
+
+Shared write path for the Supabase REST workers (trace_worker, cot_worker).
+Rows are buffered per target (schema, table, mode, on_conflict) and sent as
+multi-row inserts / upserts instead of one HTTP request per row.
+
+  - A target flushes once it holds batch_size rows, on flush(), on close()
+    and at interpreter exit.
+  - Upsert buffers are de-duplicated on the on_conflict key (last row wins);
+    Postgres rejects a batch that touches the same conflict row twice.
+  - A batch that fails on the connection, a 5xx / 429 or a transient
+    Postgres error (connection, resources, timeout, serialization) is
+    retried whole, RETRY_ATTEMPTS times with exponential backoff, then
+    dropped. Any other failure (4xx, a bad row) splits the batch in half
+    and retries each half, down to single rows; a single row that still
+    fails is logged, counted and dropped.
+  - Counters are exposed via stats for the worker's cycle log, and dropped
+    rows via dropped_rows() for callers whose later writes depend on them.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+from metrics import ROWS
+
+log = logging.getLogger("supabase_sink")
+
+DEFAULT_BATCH_SIZE = 500    # rows per request — keeps PostgREST bodies small
+RETRY_ATTEMPTS     = 4      # tries per batch on transient errors
+RETRY_BACKOFF      = 1.0    # seconds before the first retry, doubling
+
+# SQLSTATE classes worth retrying as-is: connection exception, insufficient
+# resources, operator intervention (statement timeout), transaction rollback.
+_TRANSIENT_SQLSTATE = ("08", "53", "57", "40")
+_TRANSIENT_PGRST    = ("PGRST000", "PGRST001", "PGRST002")     # PostgREST → DB connection
+
+
+@dataclass(frozen=True)
+class _Target:
+    schema:      str
+    table:       str
+    mode:        str             # "insert" | "upsert"
+    on_conflict: Optional[str]
+
+
+class SupabaseSink:
+    def __init__(self, supabase: Client, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_on_exit: bool = True):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.supabase   = supabase
+        self.batch_size = batch_size
+        self._buffers: dict[_Target, list[dict]] = {}
+        self._dropped: dict[tuple[str, str], list[dict]] = {}
+        self.stats = {
+            "rows_queued":     0,
+            "rows_written":    0,
+            "rows_failed":     0,
+            "requests":        0,
+            "failed_requests": 0,
+            "retries":         0,
+            "splits":          0,
+        }
+        self._exit_hook = flush_on_exit
+        if flush_on_exit:
+            atexit.register(self.close)
+
+    # ── Public API ───────────────────────────────────────────────────────
+
+    def insert(self, schema: str, table: str, rows: Union[dict, Iterable[dict]]):
+        self._add(_Target(schema, table, "insert", None), rows)
+
+    def upsert(self, schema: str, table: str, rows: Union[dict, Iterable[dict]],
+               on_conflict: str):
+        self._add(_Target(schema, table, "upsert", on_conflict), rows)
+
+    def dropped_rows(self, schema: str, table: str) -> list[dict]:
+        """Rows for schema.table given up on so far (after retries / splitting)."""
+        return self._dropped.get((schema, table), [])
+
+    def pending(self) -> int:
+        return sum(len(b) for b in self._buffers.values())
+
+    def flush(self):
+        for target in list(self._buffers):
+            self._flush_target(target)
+
+    def close(self):
+        self.flush()
+        if self._exit_hook:
+            atexit.unregister(self.close)
+            self._exit_hook = False
+
+    def __enter__(self) -> "SupabaseSink":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── Internals ────────────────────────────────────────────────────────
+
+    def _add(self, target: _Target, rows: Union[dict, Iterable[dict]]):
+        if isinstance(rows, dict):
+            rows = [rows]
+        buf = self._buffers.setdefault(target, [])
+        before = len(buf)
+        buf.extend(rows)
+        self.stats["rows_queued"] += len(buf) - before
+        if len(buf) >= self.batch_size:
+            self._flush_target(target)
+
+    def _flush_target(self, target: _Target):
+        rows = self._buffers.pop(target, None)
+        if not rows:
+            return
+        if target.mode == "upsert" and target.on_conflict:
+            rows = _dedupe(rows, target.on_conflict.split(","))
+        for i in range(0, len(rows), self.batch_size):
+            self._send(target, rows[i:i + self.batch_size])
+
+    def _send(self, target: _Target, rows: list[dict]):
+        name = f"{target.schema}.{target.table}"
+        for attempt in range(RETRY_ATTEMPTS):
+            self.stats["requests"] += 1
+            try:
+                table = self.supabase.schema(target.schema).table(target.table)
+                if target.mode == "upsert":
+                    table.upsert(rows, on_conflict=target.on_conflict).execute()
+                else:
+                    table.insert(rows).execute()
+                self.stats["rows_written"] += len(rows)
+                ROWS.labels(name, "write").inc(len(rows))
+                return
+            except Exception as e:
+                self.stats["failed_requests"] += 1
+                if not _transient(e):
+                    error = e
+                    break
+                if attempt + 1 == RETRY_ATTEMPTS:
+                    self._drop(target, rows)
+                    log.error(f"{name} {target.mode} dropped batch of {len(rows)} after "
+                              f"{RETRY_ATTEMPTS} attempts: {e}")
+                    return
+                delay = RETRY_BACKOFF * 2 ** attempt * random.uniform(0.8, 1.2)
+                self.stats["retries"] += 1
+                log.warning(f"{name} {target.mode} batch of {len(rows)} failed — "
+                            f"retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+        if len(rows) == 1:
+            self._drop(target, rows)
+            log.warning(f"{name} {target.mode} dropped row: {error}")
+            return
+        self.stats["splits"] += 1
+        mid = len(rows) // 2
+        log.warning(f"{name} {target.mode} batch of {len(rows)} failed — splitting: {error}")
+        self._send(target, rows[:mid])
+        self._send(target, rows[mid:])
+
+    def _drop(self, target: _Target, rows: list[dict]):
+        self.stats["rows_failed"] += len(rows)
+        self._dropped.setdefault((target.schema, target.table), []).extend(rows)
+
+
+def _transient(e: Exception) -> bool:
+    """Worth retrying unchanged: no response, a 5xx / 429, or a transient DB error."""
+    if any(c.__name__ in ("TransportError", "ConnectionError", "TimeoutError")
+           for c in type(e).__mro__):                  # httpx / builtin network errors
+        return True
+    code = getattr(e, "code", None)
+    if isinstance(code, int):                           # non-JSON body: proxy / gateway status
+        return code >= 500 or code == 429
+    code = str(code or "")
+    return code in _TRANSIENT_PGRST or code[:2] in _TRANSIENT_SQLSTATE
+
+
+def _dedupe(rows: list[dict], key_cols: list[str]) -> list[dict]:
+    """Keep the last row per conflict key, preserving first-seen order."""
+    by_key: dict[tuple, dict] = {}
+    for row in rows:
+        by_key[tuple(row.get(c.strip()) for c in key_cols)] = row
+    return list(by_key.values())
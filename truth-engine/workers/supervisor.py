@@ -0,0 +1,275 @@
+"""
+supervisor.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Single-process Worker Supervisor
+
+Replaces the per-worker `while true` loops in start.sh. One interpreter
+hosts every worker, so shared imports (supabase, asyncpg, numpy) and the
+interpreter itself are paid for once:
+
+  task     async main() run as an asyncio task on the shared loop
+  thread   blocking main() (time.sleep loops) on a daemon thread
+  process  `python workers/<name>.py` subprocess — for workers not yet
+           safe to host in-process, or whose CPU-bound runs would stall
+           the shared loop; skipped (state MISSING) if absent
+
+Every worker is isolated: an exception, a non-zero exit or a clean return
+is logged and the worker is restarted per its policy with exponential
+backoff (reset once it has stayed up for `reset_after` seconds).
+ops_worker is critical — if it stops for any reason the supervisor exits
+non-zero so Render restarts the whole service, as start.sh did.
+
+Lifecycle and restart counts are logged every STATUS_LOG_SECS and, if
+SUPERVISOR_STATUS_FILE is set, written there as JSON.
+
+  SUPERVISOR_WORKERS=ops_worker,trace_worker   run only these
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import metrics
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(name)s] %(levelname)s %(message)s",
+)
+log = logging.getLogger("supervisor")
+
+# ── Config ───────────────────────────────────────────────────────────────
+
+WORKERS_DIR     = Path(__file__).resolve().parent
+STATUS_LOG_SECS = 300
+STATUS_FILE     = os.getenv("SUPERVISOR_STATUS_FILE")
+ONLY            = {w for w in os.getenv("SUPERVISOR_WORKERS", "").split(",") if w}
+
+
+@dataclass
+class WorkerSpec:
+    name:        str
+    mode:        str                 # task | thread | process
+    critical:    bool = False
+    restart:     str = "always"      # always | on-failure | never
+    backoff:     float = 5.0         # first restart delay, doubles per consecutive failure
+    backoff_max: float = 600.0
+    reset_after: float = 600.0       # uptime that counts as healthy again
+
+
+WORKERS = [
+    WorkerSpec("ops_worker",               "task", critical=True),
+    WorkerSpec("panel_aggregation_worker", "task", backoff=30),
+    WorkerSpec("earnings_nowcast_worker",  "task", backoff=30),
+    WorkerSpec("earnings_accuracy_worker", "task", backoff=30),
+
+    # Blocking loops — weekly / slow
+    WorkerSpec("cot_worker",               "thread", backoff=60),
+    WorkerSpec("trace_worker",             "thread", backoff=60),
+
+    # numpy-heavy runs — own interpreter, off ops_worker's loop and GIL
+    WorkerSpec("retention_worker",         "process", backoff=60),
+    WorkerSpec("ensemble_engine",          "process", backoff=60),
+
+    # Not yet in this tree / not yet hosted in-process
+    WorkerSpec("portfolio_sync",             "process"),
+    WorkerSpec("micro_features_worker",      "process"),
+    WorkerSpec("edge_signals_worker",        "process"),
+    WorkerSpec("control_plane_worker",       "process", backoff=2),
+    WorkerSpec("commodity_ingest_worker",    "process"),
+    WorkerSpec("kalshi_ingest_worker",       "process"),
+    WorkerSpec("gdelt_ingest_worker",        "process"),
+    WorkerSpec("treasury_yield_worker",      "process"),
+    WorkerSpec("comtrade_worker",            "process", backoff=60),
+    WorkerSpec("manifest_worker",            "process", backoff=60),
+    WorkerSpec("ipo_worker",                 "process", backoff=60),
+    WorkerSpec("options_flow_worker",        "process", backoff=60),
+    WorkerSpec("ais_stream_worker",          "process", backoff=10),
+    WorkerSpec("supply_chain_signal_worker", "process", backoff=30),
+    WorkerSpec("news_nlp_worker",            "process", backoff=30),
+    WorkerSpec("regime_cartographer_worker", "process", backoff=60),
+    # nautilus_worker — SUSPENDED pending bandwidth audit
+]
+
+
+@dataclass
+class WorkerState:
+    spec:        WorkerSpec
+    state:       str = "PENDING"     # PENDING | RUNNING | BACKOFF | STOPPED | MISSING
+    restarts:    int = 0
+    failures:    int = 0             # consecutive
+    started_at:  Optional[float] = None
+    last_exit:   Optional[str] = None
+    next_start:  Optional[float] = None
+    proc:        Optional[asyncio.subprocess.Process] = field(default=None, repr=False)
+
+    def summary(self) -> dict:
+        up = time.time() - self.started_at if self.state == "RUNNING" and self.started_at else 0
+        return {
+            "mode": self.spec.mode,
+            "state": self.state,
+            "restarts": self.restarts,
+            "consecutive_failures": self.failures,
+            "uptime_s": round(up),
+            "last_exit": self.last_exit,
+        }
+
+
+class CriticalWorkerExit(Exception):
+    pass
+
+
+# ── Runners ──────────────────────────────────────────────────────────────
+
+async def _run_task(spec: WorkerSpec, ws: WorkerState):
+    module = importlib.import_module(spec.name)
+    await module.main()
+
+
+async def _run_thread(spec: WorkerSpec, ws: WorkerState):
+    # Daemon thread, not run_in_executor: blocking loops never return, and
+    # executor threads would hold up interpreter exit on shutdown.
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def target():
+        try:
+            module = importlib.import_module(spec.name)
+            module.main()
+        except BaseException as e:
+            loop.call_soon_threadsafe(lambda e=e: done.done() or done.set_exception(e))
+        else:
+            loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+
+    threading.Thread(target=target, name=spec.name, daemon=True).start()
+    await done
+
+
+async def _run_process(spec: WorkerSpec, ws: WorkerState):
+    ws.proc = await asyncio.create_subprocess_exec(
+        sys.executable, str(WORKERS_DIR / f"{spec.name}.py"), cwd=WORKERS_DIR.parent,
+        env={**os.environ, "METRICS_PORT": "0"},     # the supervisor owns the endpoint
+    )
+    code = await ws.proc.wait()
+    ws.proc = None
+    if code:
+        raise RuntimeError(f"exit code {code}")
+
+
+RUNNERS = {"task": _run_task, "thread": _run_thread, "process": _run_process}
+
+
+# ── Supervisor ───────────────────────────────────────────────────────────
+
+class Supervisor:
+    def __init__(self, specs: list[WorkerSpec]):
+        self.states = {s.name: WorkerState(s) for s in specs}
+        self.fatal: asyncio.Future = None
+
+    async def supervise(self, ws: WorkerState):
+        spec = ws.spec
+        if spec.mode == "process" and not (WORKERS_DIR / f"{spec.name}.py").exists():
+            ws.state = "MISSING"
+            log.warning(f"{spec.name}: workers/{spec.name}.py not found — not started")
+            return
+
+        while True:
+            ws.state, ws.started_at = "RUNNING", time.time()
+            log.info(f"▶ {spec.name} started ({spec.mode})")
+            failed = True
+            try:
+                await RUNNERS[spec.mode](spec, ws)
+                failed = False
+                ws.last_exit = "returned"
+            except asyncio.CancelledError:
+                ws.state = "STOPPED"
+                raise
+            except BaseException as e:        # SystemExit from a worker must not kill the host
+                ws.last_exit = f"{type(e).__name__}: {e}"
+                log.error(f"✖ {spec.name} crashed: {ws.last_exit}", exc_info=not isinstance(e, SystemExit))
+
+            if spec.critical:
+                ws.state = "STOPPED"
+                if not self.fatal.done():
+                    self.fatal.set_exception(CriticalWorkerExit(f"{spec.name} stopped: {ws.last_exit}"))
+                return
+            if spec.restart == "never" or (spec.restart == "on-failure" and not failed):
+                ws.state = "STOPPED"
+                log.info(f"■ {spec.name} stopped ({ws.last_exit})")
+                return
+
+            uptime = time.time() - ws.started_at
+            ws.failures = 1 if uptime >= spec.reset_after else ws.failures + 1
+            delay = min(spec.backoff * 2 ** (ws.failures - 1), spec.backoff_max)
+            delay *= random.uniform(0.9, 1.1)
+            ws.restarts += 1
+            ws.state, ws.next_start = "BACKOFF", time.time() + delay
+            log.info(f"↻ {spec.name} restart #{ws.restarts} in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+    def collect_metrics(self):
+        states = list(self.states.values())
+        yield ("noterminal_worker_up", "gauge", "1 while the worker is running",
+               [({"worker": ws.spec.name, "mode": ws.spec.mode}, int(ws.state == "RUNNING")) for ws in states])
+        yield ("noterminal_worker_restarts_total", "counter", "Supervisor restarts per worker",
+               [({"worker": ws.spec.name}, ws.restarts) for ws in states])
+
+    def status(self) -> dict:
+        return {name: ws.summary() for name, ws in self.states.items()}
+
+    async def reporter(self):
+        while True:
+            await asyncio.sleep(STATUS_LOG_SECS)
+            status = self.status()
+            running = sum(1 for s in status.values() if s["state"] == "RUNNING")
+            restarts = {n: s["restarts"] for n, s in status.items() if s["restarts"]}
+            log.info(f"📊 {running}/{len(status)} running, restarts: {restarts or 'none'}")
+            if STATUS_FILE:
+                Path(STATUS_FILE).write_text(json.dumps(status, indent=2))
+
+    async def shutdown(self, tasks: list[asyncio.Task]):
+        for ws in self.states.values():
+            if ws.proc and ws.proc.returncode is None:
+                ws.proc.terminate()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self) -> int:
+        loop = asyncio.get_running_loop()
+        self.fatal = loop.create_future()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, lambda: self.fatal.done() or self.fatal.set_result(None))
+
+        log.info(f"🚀 supervisor starting — {len(self.states)} workers")
+        metrics.register_collector(self.collect_metrics)
+        metrics.serve()
+        tasks = [asyncio.create_task(self.supervise(ws), name=n) for n, ws in self.states.items()]
+        tasks.append(asyncio.create_task(self.reporter()))
+        try:
+            await self.fatal
+            log.info("Shutdown requested")
+            return 0
+        except CriticalWorkerExit as e:
+            log.critical(f"💀 {e} — exiting for service restart")
+            return 1
+        finally:
+            await self.shutdown(tasks)
+
+
+def main():
+    specs = [s for s in WORKERS if not ONLY or s.name in ONLY]
+    sys.exit(asyncio.run(Supervisor(specs).run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+symbol_registry.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Market Symbol Registry + Last-Value State
+
+Maps exchange symbols to Noterminal asset ids and gives every symbol a
+dense slot index, so per-symbol state lives in flat arrays instead of
+per-symbol objects or tasks.
+
+Config (first match wins):
+  OPS_SYMBOLS_FILE   path to JSON {"btcusdt": "<asset uuid>", ...}
+  OPS_SYMBOLS        "btcusdt=<asset uuid>,ethusdt=<asset uuid>"
+  default            passed in by the caller
+"""
+
+import json
+import os
+from array import array
+from typing import Optional
+
+
+class SymbolRegistry:
+    def __init__(self, mapping: dict[str, str]):
+        if not mapping:
+            raise ValueError("symbol registry is empty")
+        self.symbols:   list[str] = [s.lower() for s in mapping]
+        self.asset_ids: list[str] = list(mapping.values())
+        self._slot: dict[str, int] = {}
+        for i, sym in enumerate(self.symbols):
+            self._slot[sym] = i
+            self._slot[sym.upper()] = i     # trade payloads carry "s":"BTCUSDT"
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def slot(self, symbol: str) -> Optional[int]:
+        return self._slot.get(symbol)
+
+    def streams(self, kind: str = "trade") -> list[str]:
+        return [f"{s}@{kind}" for s in self.symbols]
+
+    @classmethod
+    def from_env(cls, default: dict[str, str]) -> "SymbolRegistry":
+        path = os.getenv("OPS_SYMBOLS_FILE")
+        if path:
+            with open(path) as f:
+                return cls(json.load(f))
+        spec = os.getenv("OPS_SYMBOLS")
+        if spec:
+            mapping = {}
+            for item in spec.split(","):
+                sym, _, asset_id = item.strip().partition("=")
+                if not sym or not asset_id:
+                    raise ValueError(f"bad OPS_SYMBOLS entry: {item!r}")
+                mapping[sym.strip()] = asset_id.strip()
+            return cls(mapping)
+        return cls(default)
+
+
+class LastValueState:
+    """
+    Latest trade per symbol slot in parallel arrays (~25 bytes/symbol).
+    Prices stay float until flush; dirty marks slots changed since the
+    last drain().
+    """
+
+    def __init__(self, n: int):
+        self.price = array("d", bytes(8 * n))
+        self.size  = array("d", bytes(8 * n))
+        self.ts_ms = array("q", bytes(8 * n))
+        self.dirty = bytearray(n)
+
+    def update(self, slot: int, price: float, size: float, ts_ms: int):
+        if ts_ms >= self.ts_ms[slot]:
+            self.price[slot] = price
+            self.size[slot]  = size
+            self.ts_ms[slot] = ts_ms
+            self.dirty[slot] = 1
+
+    def drain(self) -> list[int]:
+        slots = [i for i, d in enumerate(self.dirty) if d]
+        for i in slots:
+            self.dirty[i] = 0
+        return slots
@@ -0,0 +1,305 @@
+"""
+tick_archive.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Columnar Tick Archive
+
+Aged tick history leaves the hot tables as one compressed NumPy archive
+per table per UTC day (np.savez_compressed, one array per column), under
+a JSON manifest:
+
+  <root>/manifest.json                       parts: table, day, rows, ts range,
+                                             sha256, deleted
+  <root>/trades_v1/2026/10/2026-10-12.0.npz  part 0 of that day; later parts
+                                             hold rows that arrived after it
+
+Columns are the table's key (symbol_id as 16 raw bytes, |V16), ts_us
+(int64 µs since epoch, UTC) and the value columns as float64 / int64 /
+bool — NULL numerics are NaN. Files and the manifest are written to a
+temp name, fsynced and renamed, so a reader never sees a partial part.
+
+A part is `deleted: false` until retention_worker has removed its rows
+from the hot table; rows are only ever deleted by key from a part whose
+checksum verified, so an interrupted run re-deletes from the same file.
+
+read_range() answers a time range from the archive parts that overlap it
+plus the live table, de-duplicated on the key (a part can overlap the
+hot table until its delete finishes):
+
+    archive = TickArchive(ARCHIVE_DIR)
+    batch = await read_range(conn, archive, TRADES, start, end, symbol_ids=[btc_id])
+    batch["event_ts"]          # datetime64[us], ascending
+"""
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+import db
+from columnar import RecordBatch
+from lazy import lazy_import
+
+log = logging.getLogger("tick_archive")
+
+np = lazy_import("numpy")
+
+MANIFEST_VERSION = 1
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# ── Archived tables ──────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class ArchiveSpec:
+    name:   str                           # archive directory / manifest table name
+    table:  str
+    ts:     str                           # timestamptz column the hot window is measured on
+    key:    tuple[tuple[str, str], ...]   # unique key (column, pg type), may include ts
+    values: tuple[str, ...]
+    where:  str = "TRUE"                  # rows of `table` this spec owns
+
+    @property
+    def key_columns(self) -> list[str]:
+        """Archive key columns: the key with ts replaced by ts_us."""
+        return ["ts_us" if c == self.ts else c for c, _ in self.key]
+
+    @property
+    def columns(self) -> list[str]:
+        return [c for c, _ in self.key if c != self.ts] + ["ts_us", *self.values]
+
+
+TRADES = ArchiveSpec(
+    "trades_v1", "market.trades_v1", "event_ts",
+    key=(("symbol_id", "uuid"), ("trade_id", "bigint")),
+    values=("price", "size", "is_buyer_maker"),
+)
+BARS_1S = ArchiveSpec(
+    "bars_v1_1s", "market.bars_v1", "bucket_ts",
+    key=(("symbol_id", "uuid"), ("timeframe_s", "int"), ("bucket_ts", "timestamptz")),
+    values=("open", "high", "low", "close", "volume", "vwap", "trade_count"),
+    where="timeframe_s = 1",
+)
+SPECS = {s.name: s for s in (TRADES, BARS_1S)}
+
+
+def to_us(dt: datetime) -> int:
+    """µs since epoch; naive datetimes are UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def uuid_column(values: Iterable[uuid.UUID]) -> "np.ndarray":
+    return np.frombuffer(b"".join(v.bytes for v in values), dtype="V16")
+
+
+def uuids(column: "np.ndarray") -> list[uuid.UUID]:
+    return [uuid.UUID(bytes=v.tobytes()) for v in column]
+
+
+# ── Hot-table SQL ────────────────────────────────────────────────────────
+
+def select_sql(spec: ArchiveSpec, symbols: bool = False) -> str:
+    """Rows of spec in [$1, $2) as archive columns (optionally symbol_id = ANY($3))."""
+    cols = [c for c, _ in spec.key if c != spec.ts]
+    return f"""
+        SELECT {", ".join(cols)},
+               (extract(epoch FROM {spec.ts}) * 1000000)::bigint AS ts_us,
+               {", ".join(spec.values)}
+        FROM {spec.table}
+        WHERE {spec.where}
+          AND {spec.ts} >= $1 AND {spec.ts} < $2
+          {"AND symbol_id = ANY($3::uuid[])" if symbols else ""}
+        ORDER BY {spec.ts}, {", ".join(cols)}
+    """
+
+
+def delete_sql(spec: ArchiveSpec) -> str:
+    """DELETE by archived key: one array argument per key column, ts as µs."""
+    args = ", ".join(f"${i}::{'bigint' if c == spec.ts else t}[]"
+                     for i, (c, t) in enumerate(spec.key, 1))
+    names = [c for c, _ in spec.key]
+    match = " AND ".join(
+        f"t.{c} = timestamptz 'epoch' + k.{c} * interval '1 microsecond'" if c == spec.ts
+        else f"t.{c} = k.{c}"
+        for c in names
+    )
+    return f"DELETE FROM {spec.table} t USING unnest({args}) AS k({', '.join(names)}) WHERE {match}"
+
+
+async def fetch_window(conn, spec: ArchiveSpec, start: datetime, end: datetime,
+                       symbol_ids: Optional[list[uuid.UUID]] = None) -> dict[str, "np.ndarray"]:
+    """Hot-table rows in [start, end) as archive columns ({} when empty)."""
+    args = (start, end, symbol_ids) if symbol_ids is not None else (start, end)
+    cols = await db.fetch_columns(conn, select_sql(spec, symbol_ids is not None), *args, numpy=True)
+    if not cols:
+        return {}
+    out = {}
+    for name in spec.columns:
+        values = cols[name]
+        if name == "symbol_id":
+            out[name] = uuid_column(values)
+        elif isinstance(values, np.ndarray):
+            out[name] = values
+        elif all(isinstance(v, bool) for v in values):
+            out[name] = np.array(values, dtype=bool)
+        else:                                   # numeric NULLs mixed with ints
+            out[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return out
+
+
+# ── Archive ──────────────────────────────────────────────────────────────
+
+def _fsync_write(path: Path, write) -> None:
+    """write(f) into path via a temp file + fsync + rename."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class TickArchive:
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+        self.parts: list[dict] = []
+        if self.manifest_path.exists():
+            manifest = json.loads(self.manifest_path.read_text())
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise RuntimeError(f"{self.manifest_path}: unsupported manifest version {manifest.get('version')}")
+            self.parts = manifest["parts"]
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        body = json.dumps({"version": MANIFEST_VERSION, "parts": self.parts}, indent=1).encode()
+        _fsync_write(self.manifest_path, lambda f: f.write(body))
+
+    def find(self, table: str, start_us: Optional[int] = None,
+             end_us: Optional[int] = None) -> list[dict]:
+        """Parts of table whose rows overlap [start_us, end_us)."""
+        return [
+            p for p in self.parts
+            if p["table"] == table
+            and (start_us is None or p["max_ts_us"] >= start_us)
+            and (end_us is None or p["min_ts_us"] < end_us)
+        ]
+
+    def pending(self) -> list[dict]:
+        """Parts whose rows may still be in the hot table."""
+        return [p for p in self.parts if not p["deleted"]]
+
+    def write_part(self, table: str, day: date, columns: dict[str, "np.ndarray"]) -> dict:
+        n = sum(1 for p in self.parts if p["table"] == table and p["day"] == day.isoformat())
+        rel = Path(table) / f"{day:%Y/%m}" / f"{day.isoformat()}.{n}.npz"
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _fsync_write(path, lambda f: np.savez_compressed(f, **columns))
+
+        ts = columns["ts_us"]
+        part = {
+            "table": table,
+            "day": day.isoformat(),
+            "part": n,
+            "path": str(rel),
+            "rows": int(len(ts)),
+            "min_ts_us": int(ts.min()),
+            "max_ts_us": int(ts.max()),
+            "bytes": path.stat().st_size,
+            "sha256": hashlib.sha256(path.read_bytes()).hexdigest(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "deleted": False,
+        }
+        self.parts.append(part)
+        self._save()
+        log.info(f"📦 {rel} — {part['rows']:,} rows, {part['bytes'] / 1e6:.1f} MB")
+        return part
+
+    def load(self, part: dict) -> dict[str, "np.ndarray"]:
+        """Columns of a part; raises if the file does not match its manifest checksum."""
+        path = self.root / part["path"]
+        raw = path.read_bytes()
+        if hashlib.sha256(raw).hexdigest() != part["sha256"]:
+            raise RuntimeError(f"{path}: checksum mismatch — refusing to use this part")
+        with np.load(path, allow_pickle=False) as z:
+            return {name: z[name] for name in z.files}
+
+    def mark_deleted(self, part: dict, rows_deleted: int):
+        part["deleted"] = True
+        part["rows_deleted"] = rows_deleted
+        self._save()
+
+
+# ── Reader ───────────────────────────────────────────────────────────────
+
+def _concat(chunks: list[dict], names: list[str]) -> dict[str, "np.ndarray"]:
+    return {n: np.concatenate([c[n] for c in chunks]) for n in names}
+
+
+def _key_order(cols: dict, key: list[str]) -> "np.ndarray":
+    """lexsort keys for the archive key columns (V16 split into two uint64s)."""
+    keys = []
+    for name in key:
+        col = cols[name]
+        if col.dtype.kind == "V":
+            halves = col.view(">u8").reshape(-1, 2)
+            keys += [halves[:, 0], halves[:, 1]]
+        else:
+            keys.append(col)
+    return keys
+
+
+def _dedupe(cols: dict, key: list[str]) -> "np.ndarray":
+    """Indices of the first occurrence of each key, in ts order."""
+    keys = _key_order(cols, key)
+    order = np.lexsort(keys[::-1])
+    same = np.ones(len(order), dtype=bool)
+    same[0] = False
+    for k in keys:
+        s = k[order]
+        same[1:] &= s[1:] == s[:-1]
+    keep = order[~same]
+    return keep[np.argsort(cols["ts_us"][keep], kind="stable")]
+
+
+async def read_range(conn, archive: TickArchive, spec: ArchiveSpec,
+                     start: datetime, end: datetime,
+                     symbol_ids: Optional[list[uuid.UUID]] = None) -> RecordBatch:
+    """
+    spec rows with ts in [start, end) from archive parts and the hot table,
+    one row per key, ascending by ts. symbol_id stays |V16 (see uuids());
+    the ts column comes back as datetime64[us] (UTC).
+    """
+    lo, hi = to_us(start), to_us(end)
+    wanted = uuid_column(symbol_ids) if symbol_ids is not None else None
+    chunks = []
+    for part in archive.find(spec.name, lo, hi):
+        cols = archive.load(part)
+        mask = (cols["ts_us"] >= lo) & (cols["ts_us"] < hi)
+        if wanted is not None:
+            mask &= np.isin(cols["symbol_id"], wanted)
+        if mask.any():
+            chunks.append({n: c[mask] for n, c in cols.items()})
+    live = await fetch_window(conn, spec, start, end, symbol_ids)
+    if live:
+        chunks.append(live)
+    if not chunks:
+        return RecordBatch({})
+
+    cols = _concat(chunks, spec.columns)
+    if len(chunks) > 1:
+        keep = _dedupe(cols, spec.key_columns)
+        cols = {n: c[keep] for n, c in cols.items()}
+    ts = cols.pop("ts_us").astype("datetime64[us]")
+    return RecordBatch({**cols, spec.ts: ts})
@@ -0,0 +1,101 @@
+"""
+tick_buffer.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Preallocated Trade Ring
+
+Fixed-capacity ring of trades held column-wise in flat arrays
+(~45 bytes/trade), so a burst never allocates per-trade objects and
+memory never grows past capacity.
+
+  push()          O(1) append; when full, the oldest trade is overwritten
+                  and counted in `dropped`
+  take(n)         copy the oldest n trades out as columns (no advance)
+  commit(start,n) advance past a batch once it is durably written
+
+Sequence numbers are monotonic; index = seq & mask (capacity is a power
+of two).
+"""
+
+from array import array
+from typing import NamedTuple
+
+
+class TradeBatch(NamedTuple):
+    start:    int                # sequence number of the first trade
+    slot:     list[int]
+    trade_id: list[int]
+    ts_ms:    list[int]
+    price:    list[float]
+    size:     list[float]
+    maker:    bytes
+    recv_us:  list[int]          # local receive time, for receive→commit latency
+
+    def __len__(self) -> int:
+        return len(self.slot)
+
+
+class TradeRing:
+    def __init__(self, capacity: int = 1 << 17):
+        if capacity < 1 or capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.capacity = capacity
+        self.mask     = capacity - 1
+        self.slot     = array("i", bytes(4 * capacity))
+        self.trade_id = array("q", bytes(8 * capacity))
+        self.ts_ms    = array("q", bytes(8 * capacity))
+        self.price    = array("d", bytes(8 * capacity))
+        self.size     = array("d", bytes(8 * capacity))
+        self.maker    = bytearray(capacity)
+        self.recv_us  = array("q", bytes(8 * capacity))
+        self.head     = 0        # next sequence to write
+        self.tail     = 0        # oldest unflushed sequence
+        self.dropped  = 0
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def push(self, slot: int, trade_id: int, ts_ms: int,
+             price: float, size: float, maker: bool, recv_us: int = 0):
+        if self.head - self.tail == self.capacity:
+            self.tail += 1
+            self.dropped += 1
+        i = self.head & self.mask
+        self.slot[i]     = slot
+        self.trade_id[i] = trade_id
+        self.ts_ms[i]    = ts_ms
+        self.price[i]    = price
+        self.size[i]     = size
+        self.maker[i]    = maker
+        self.recv_us[i]  = recv_us
+        self.head += 1
+
+    def take(self, n: int) -> TradeBatch:
+        n = min(n, len(self))
+        start = self.tail
+        lo = start & self.mask
+        hi = lo + n
+        if hi <= self.capacity:
+            parts = (slice(lo, hi),)
+        else:
+            parts = (slice(lo, self.capacity), slice(0, hi - self.capacity))
+
+        def col(a):
+            out = a[parts[0]]
+            for p in parts[1:]:
+                out += a[p]
+            return out
+
+        return TradeBatch(
+            start,
+            col(self.slot).tolist(),
+            col(self.trade_id).tolist(),
+            col(self.ts_ms).tolist(),
+            col(self.price).tolist(),
+            col(self.size).tolist(),
+            bytes(col(self.maker)),
+            col(self.recv_us).tolist(),
+        )
+
+    def commit(self, batch: TradeBatch):
+        # tail may already be past batch.start if push() overwrote during the write
+        self.tail = max(self.tail, batch.start + len(batch))
@@ -4,18 +4,23 @@ Source: FINRA TRACE public EOD API — no auth required
 Target: credit.trace_bond_signals, credit.trace_rolling_baseline
 Emits: market.edge_signals_v1 (BOND_FLOW_PRESSURE)
 Schedule: Nightly, runs at 08:00 ET (after FINRA publishes prior day)
-Canon: restart-loop managed by start.sh
+Canon: hosted by supervisor.py; 08:00 ET slot + last success in ingest_run_log_v1 via scheduler.py
 """
 
-import os
+from __future__ import annotations
+
 import time
+import uuid
 import logging
-import requests
 import json
 from datetime import datetime, timezone, date, timedelta
 from math import sqrt
+from typing import TYPE_CHECKING
 
-from supabase import create_client, Client
+from lazy import lazy_import, supabase_client
+from metrics import EXTERNAL_SECONDS, serve as serve_metrics
+from scheduler import CronSchedule, ScheduledJob, last_success_supabase, run_blocking
+from supabase_sink import SupabaseSink
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,10 +28,14 @@ logging.basicConfig(
 )
 log = logging.getLogger("trace_worker")
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
+requests = lazy_import("requests")
+if TYPE_CHECKING:
+    from supabase import Client
 
 WORKER_VERSION = "2.0.0"
+SOURCE_NAME    = "trace_worker_v2"          # ingest_run_log_v1.source_name
+SCHEDULE       = CronSchedule("0 8 * * 1-5", "America/New_York")   # after FINRA publishes prior day
+FRESH_FOR      = timedelta(hours=12)
 WINDOW_DAYS    = 20
 
 # BFP composite weights
@@ -43,7 +52,7 @@ FINRA_BASE = "https://api.finra.org/data/group/otcMarket/name/tradesAgg"
 
 
 def get_supabase() -> Client:
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    return supabase_client()
 
 
 # ── Math helpers ─────────────────────────────────────────────────────────
@@ -106,19 +115,24 @@ def fetch_trace_agg(cusip_prefix: str, trade_date: str, session: requests.Sessio
         "dateRangeFilters": date_filter,
     }
 
+    t0 = time.perf_counter()
+    status = "error"
     try:
         resp = session.get(FINRA_BASE, params=params, timeout=30,
                            headers={"Accept": "application/json"})
+        status = str(resp.status_code)
         if resp.status_code == 404:
             return []  # No trades on this date (weekend/holiday)
         if not resp.ok:
-            log.warning(f"FINRA fetch failed {cusip_prefix}/{trade_date}: {resp.status}")
+            log.warning(f"FINRA fetch failed {cusip_prefix}/{trade_date}: {resp.status_code}")
             return []
         data = resp.json()
         return data if isinstance(data, list) else []
     except Exception as e:
         log.warning(f"FINRA fetch error {cusip_prefix}: {e}")
         return []
+    finally:
+        EXTERNAL_SECONDS.labels("finra_trace", status).observe(time.perf_counter() - t0)
 
 
 # ── Historical baseline ──────────────────────────────────────────────────
@@ -145,51 +159,55 @@ def fetch_historical(supabase: Client, equity_symbol: str, before_date: str) ->
 
 # ── Emit to market.edge_signals_v1 ───────────────────────────────────────
 
-def emit_edge_signal(supabase: Client, equity_symbol: str, trade_date: str,
+def emit_edge_signal(sink: SupabaseSink, equity_symbol: str, trade_date: str,
                      score: float, direction: int, confidence: str):
     if direction == 0:
         return
-    import uuid
     strength = min(abs(score), 1.0) if score else 0.0
-    try:
-        supabase.schema("market").table("edge_signals_v1").insert({
-            "signal_id":         str(uuid.uuid4()),
-            "instrument_symbol": equity_symbol,
-            "bucket_ts":         f"{trade_date}T08:00:00+00:00",
-            "emitted_at":        datetime.now(timezone.utc).isoformat(),
-            "edge_label":        "BOND_FLOW_PRESSURE",
-            "edge_score":        int(strength * 100),
-            "edge_direction":    direction,
-            "net_flow":          None,
-            "net_flow_z":        score,
-            "ofi_normalised":    None,
-            "ofi_z":             None,
-            "toxicity_ratio":    None,
-            "flow_momentum":     strength,
-            "momentum_direction": direction,
-            "persistence_seconds": 86400,
-            "flow_direction":    direction,
-            "is_flow_dominant":  strength > 0.6,
-            "is_toxic_entry":    False,
-            "is_exhausted":      False,
-            "is_high_confidence": confidence == "HIGH",
-            "trade_count":       None,
-            "total_vol":         None,
-            "vwap":              None,
-            "mid_price":         None,
-            "worker_version":    WORKER_VERSION,
-            "run_id":            str(uuid.uuid4()),
-            "meta":              {"confidence": confidence, "source": "FINRA_TRACE"},
-        }).execute()
-        log.info(f"BOND_FLOW_PRESSURE emitted: {equity_symbol} dir={direction:+d} score={score:.3f} [{confidence}]")
-    except Exception as e:
-        log.warning(f"Edge signal emit failed {equity_symbol}: {e}")
+    sink.insert("market", "edge_signals_v1", {
+        "signal_id":         str(uuid.uuid4()),
+        "instrument_symbol": equity_symbol,
+        "bucket_ts":         f"{trade_date}T08:00:00+00:00",
+        "emitted_at":        datetime.now(timezone.utc).isoformat(),
+        "edge_label":        "BOND_FLOW_PRESSURE",
+        "edge_score":        int(strength * 100),
+        "edge_direction":    direction,
+        "net_flow":          None,
+        "net_flow_z":        score,
+        "ofi_normalised":    None,
+        "ofi_z":             None,
+        "toxicity_ratio":    None,
+        "flow_momentum":     strength,
+        "momentum_direction": direction,
+        "persistence_seconds": 86400,
+        "flow_direction":    direction,
+        "is_flow_dominant":  strength > 0.6,
+        "is_toxic_entry":    False,
+        "is_exhausted":      False,
+        "is_high_confidence": confidence == "HIGH",
+        "trade_count":       None,
+        "total_vol":         None,
+        "vwap":              None,
+        "mid_price":         None,
+        "worker_version":    WORKER_VERSION,
+        "run_id":            str(uuid.uuid4()),
+        "meta":              {"confidence": confidence, "source": "FINRA_TRACE"},
+    })
+    log.info(f"BOND_FLOW_PRESSURE queued: {equity_symbol} dir={direction:+d} score={score:.3f} [{confidence}]")
 
 
 # ── Main cycle ───────────────────────────────────────────────────────────
 
 def run_once(supabase: Client, session: requests.Session, trade_date: str):
     log.info(f"TRACE cycle for trade_date={trade_date}")
+    with SupabaseSink(supabase) as sink:
+        _run_cycle(supabase, sink, session, trade_date)
+    log.info(f"TRACE sink: {sink.stats}")
+    return sink.stats
+
+
+def _run_cycle(supabase: Client, sink: SupabaseSink,
+               session: requests.Session, trade_date: str):
 
     # Load CUSIP map
     cusip_map = supabase.schema("credit").table("trace_cusip_map").select(
@@ -298,20 +316,18 @@ def run_once(supabase: Client, session: requests.Session, trade_date: str):
         })
 
         if direction != 0:
-            emit_edge_signal(supabase, symbol, trade_date, score, direction, confidence)
+            emit_edge_signal(sink, symbol, trade_date, score, direction, confidence)
 
     # Upsert baselines
     if baseline_rows:
-        supabase.schema("credit").table("trace_rolling_baseline").upsert(
-            baseline_rows, on_conflict="equity_symbol,window_days"
-        ).execute()
+        sink.upsert("credit", "trace_rolling_baseline", baseline_rows,
+                    on_conflict="equity_symbol,window_days")
 
     # Upsert signals
     if signal_rows:
-        supabase.schema("credit").table("trace_bond_signals").upsert(
-            signal_rows, on_conflict="signal_date,equity_symbol"
-        ).execute()
-        log.info(f"TRACE upserted {len(signal_rows)} signal rows for {trade_date}")
+        sink.upsert("credit", "trace_bond_signals", signal_rows,
+                    on_conflict="signal_date,equity_symbol")
+        log.info(f"TRACE queued {len(signal_rows)} signal rows for {trade_date}")
 
 
 def last_business_day() -> str:
@@ -322,32 +338,38 @@ def last_business_day() -> str:
     return d.isoformat()
 
 
-def already_ran(supabase: Client, trade_date: str) -> bool:
-    result = supabase.schema("credit").table("trace_bond_signals").select(
-        "signal_date", count="exact"
-    ).eq("signal_date", trade_date).execute()
-    return (result.count or 0) > 0
+def log_run(supabase: Client, status: str, meta: dict):
+    supabase.schema("market").table("ingest_run_log_v1").insert({
+        "ingest_run_id": str(uuid.uuid4()),
+        "source_name":   SOURCE_NAME,
+        "run_status":    status,
+        "meta":          meta,
+        "completed_at":  datetime.now(timezone.utc).isoformat(),
+    }).execute()
 
 
 def main():
-    log.info(f"TRACE Worker v{WORKER_VERSION} starting")
+    log.info(f"TRACE Worker v{WORKER_VERSION} starting (schedule={SCHEDULE!r})")
+    serve_metrics()
     supabase = get_supabase()
     session  = requests.Session()
     session.headers["User-Agent"] = "Noterminal-TRACE/2.0"
 
-    while True:
-        try:
-            trade_date = last_business_day()
-            if not already_ran(supabase, trade_date):
-                run_once(supabase, session, trade_date)
-            else:
-                log.info(f"TRACE already ingested for {trade_date} — skipping")
-        except Exception as e:
-            log.error(f"TRACE cycle error: {e}")
-
-        # Sleep until next morning check (6 hours)
-        log.info("Sleeping 6h")
-        time.sleep(6 * 3600)
+    def run():
+        trade_date = last_business_day()
+        stats = run_once(supabase, session, trade_date)
+        if stats["rows_failed"]:
+            # Not a success: run_blocking retries after retry_after and the
+            # upserts rewrite the whole date.
+            log_run(supabase, "PARTIAL", {"trade_date": trade_date, "sink": stats})
+            raise RuntimeError(f"{stats['rows_failed']} rows dropped by the sink for {trade_date}")
+        log_run(supabase, "COMPLETED", {"trade_date": trade_date, "sink": stats})
+
+    run_blocking(
+        ScheduledJob(SOURCE_NAME, SCHEDULE, fresh_for=FRESH_FOR),
+        run,
+        lambda: last_success_supabase(supabase, SOURCE_NAME),
+    )
 
 
 if __name__ == "__main__":
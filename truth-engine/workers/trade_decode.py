@@ -0,0 +1,59 @@
+"""
+trade_decode.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Binance Trade Frame Decoder
+
+Pulls only the fields ops_worker needs out of a combined-stream trade
+frame by splitting on '"' and reading fixed token positions — no
+json.loads dict, no Decimal, no datetime. Prices stay float and times stay integer milliseconds until
+flush time.
+
+    {"stream":"btcusdt@trade","data":{"e":"trade","E":1700000000123,
+     "s":"BTCUSDT","t":12345,"p":"37000.10","q":"0.005",
+     "T":1700000000120,"m":true,"M":true}}
+
+Frames the fast path cannot read (SUBSCRIBE acks, errors, unexpected
+layouts) fall back to json.loads; non-trade frames return None.
+"""
+
+import json
+from typing import Optional
+
+
+# decode_trade() returns a plain tuple — NamedTuple construction costs more
+# than the split itself on the hot path:
+#   (symbol, trade_id, price, size, trade_ms, event_ms, maker)
+#   trade_ms = "T" (trade time), event_ms = "E" (exchange send time)
+Trade = tuple[str, int, float, float, int, int, bool]
+
+
+def decode_trade(msg: str) -> Optional[Trade]:
+    # Splitting on '"' is one C call; keys and values then sit at fixed
+    # token positions. Every key is checked before a value is trusted.
+    p = msg.split('"')
+    if len(p) < 33 or p[7] != "e" or p[9] != "trade" or p[11] != "E" \
+            or p[13] != "s" or p[17] != "t" or p[19] != "p" or p[23] != "q":
+        return _decode_slow(msg)
+    k = 27 if p[27] == "T" else 31     # Binance.US may add "b","a" order ids
+    if p[k] != "T" or p[k + 2] != "m":
+        return _decode_slow(msg)
+    return (
+        p[15],
+        int(p[18][1:-1]),
+        float(p[21]),
+        float(p[25]),
+        int(p[k + 1][1:-1]),
+        int(p[12][1:-1]),
+        p[k + 3][1] == "t",
+    )
+
+
+def _decode_slow(msg: str) -> Optional[Trade]:
+    frame = json.loads(msg)
+    trade = frame.get("data", frame) if isinstance(frame, dict) else None
+    if not isinstance(trade, dict) or trade.get("e") != "trade":
+        return None
+    return (
+        trade["s"], int(trade["t"]), float(trade["p"]), float(trade["q"]),
+        int(trade["T"]), int(trade.get("E", trade["T"])), bool(trade.get("m")),
+    )
@@ -0,0 +1,186 @@
+"""
+trade_shock_detector.py
+─────────────────────────────────────────────────────────────────────────────
+Noterminal — Vectorized Comtrade Trade-Shock Detector
+
+Loads BASELINE_MONTHS+ of macro.trade_flows_v1 once per run into a dense
+reporter × commodity × flow × period cube (NaN = no data) and scores every
+series in one pass:
+
+  baseline_mean[t] = mean of the prior BASELINE_MONTHS observed values
+  baseline_std[t]  = sample std of the same window
+  z[t]             = (value[t] - baseline_mean[t]) / baseline_std[t]
+  pct[t]           = (value[t] - baseline_mean[t]) / baseline_mean[t]
+
+Rolling windows are cumulative-sum differences along the period axis, so
+cost is O(cells) no matter how many reporters or commodities are added.
+A cell is a shock when it has ≥ MIN_BASELINE_OBS prior observations,
+|pct| ≥ PCT_THRESHOLD and |z| ≥ Z_THRESHOLD.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from lazy import lazy_import
+from metrics import ROWS
+
+np = lazy_import("numpy")
+if TYPE_CHECKING:
+    from supabase import Client
+
+log = logging.getLogger("trade_shock_detector")
+
+BASELINE_MONTHS  = 12
+MIN_BASELINE_OBS = 6
+PCT_THRESHOLD    = 0.25     # <25% change = not a shock
+Z_THRESHOLD      = 2.0
+FLOWS            = ("EXPORT", "IMPORT")
+PAGE_SIZE        = 1000
+
+
+@dataclass
+class FlowCube:
+    reporters:   list[str]
+    commodities: list[str]
+    periods:     list[str]          # contiguous YYYYMM months
+    values:      np.ndarray         # float64 [R, C, F, P], NaN where missing
+
+
+@dataclass
+class ShockScan:
+    mean:  np.ndarray               # [R, C, F, P]
+    std:   np.ndarray
+    n_obs: np.ndarray
+    z:     np.ndarray
+    pct:   np.ndarray
+    shock: np.ndarray               # bool
+
+
+def month_range(first: str, last: str) -> list[str]:
+    y, m = int(first[:4]), int(first[4:6])
+    end = int(last[:4]) * 12 + int(last[4:6])
+    out = []
+    while y * 12 + m <= end:
+        out.append(f"{y:04d}{m:02d}")
+        m += 1
+        if m > 12:
+            y, m = y + 1, 1
+    return out
+
+
+# ── Load ─────────────────────────────────────────────────────────────────
+
+def load_flow_cube(supabase: Client, min_period: str) -> Optional[FlowCube]:
+    """One paginated read of world-aggregate Comtrade flows since min_period."""
+    rows = []
+    offset = 0
+    while True:
+        result = supabase.schema("macro").table("trade_flows_v1").select(
+            "reporter_country, commodity_code, trade_flow, period, value_usd"
+        ).eq("source", "UN_COMTRADE").eq("partner_country", "0").gte(
+            "period", min_period
+        ).order("record_id").range(offset, offset + PAGE_SIZE - 1).execute()
+        page = result.data or []
+        rows.extend(page)
+        ROWS.labels("macro.trade_flows_v1", "read").inc(len(page))
+        if len(page) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+
+    if not rows:
+        return None
+
+    reporters   = sorted({r["reporter_country"] for r in rows})
+    commodities = sorted({r["commodity_code"] for r in rows})
+    periods     = month_range(min(r["period"] for r in rows), max(r["period"] for r in rows))
+    r_idx = {v: i for i, v in enumerate(reporters)}
+    c_idx = {v: i for i, v in enumerate(commodities)}
+    f_idx = {v: i for i, v in enumerate(FLOWS)}
+    p_idx = {v: i for i, v in enumerate(periods)}
+
+    values = np.full((len(reporters), len(commodities), len(FLOWS), len(periods)), np.nan)
+    for r in rows:
+        f = f_idx.get(r["trade_flow"])
+        if f is None or r["value_usd"] is None:
+            continue
+        values[r_idx[r["reporter_country"]], c_idx[r["commodity_code"]],
+               f, p_idx[r["period"]]] = float(r["value_usd"])
+
+    log.info(f"Loaded flow cube {values.shape} from {len(rows)} rows")
+    return FlowCube(reporters, commodities, periods, values)
+
+
+# ── Scan ─────────────────────────────────────────────────────────────────
+
+def _trailing_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """Sum of the `window` periods strictly before t, along the last axis."""
+    cs = np.cumsum(x, axis=-1)
+    cs = np.concatenate([np.zeros(x.shape[:-1] + (1,)), cs], axis=-1)   # cs[..., t] = sum(x[..., :t])
+    t = np.arange(x.shape[-1])
+    return cs[..., t] - cs[..., np.maximum(t - window, 0)]
+
+
+def scan(values: np.ndarray, window: int = BASELINE_MONTHS) -> ShockScan:
+    observed = ~np.isnan(values)
+    v = np.where(observed, values, 0.0)
+
+    n  = _trailing_sum(observed.astype(np.float64), window)
+    s  = _trailing_sum(v, window)
+    ss = _trailing_sum(v * v, window)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s / n
+        var  = (ss - n * mean * mean) / (n - 1)
+        std  = np.sqrt(np.clip(var, 0.0, None))
+        z    = (values - mean) / std
+        pct  = (values - mean) / mean
+
+    shock = (
+        observed
+        & (n >= MIN_BASELINE_OBS)
+        & (mean > 0)
+        & (std > 0)
+        & (np.abs(pct) >= PCT_THRESHOLD)
+        & (np.abs(z) >= Z_THRESHOLD)
+    )
+    return ShockScan(mean, std, n, z, pct, shock)
+
+
+def shock_cells(cube: FlowCube, result: ShockScan,
+                only: Optional[Iterable[tuple[str, str, str, str]]] = None) -> list[dict]:
+    """
+    Flatten shock cells into dicts. `only` restricts output to
+    (reporter, commodity, flow, period) keys — e.g. the rows that changed
+    this run — so reruns do not re-emit old shocks.
+    """
+    mask = result.shock
+    if only is not None:
+        keep = np.zeros_like(mask)
+        r_idx = {v: i for i, v in enumerate(cube.reporters)}
+        c_idx = {v: i for i, v in enumerate(cube.commodities)}
+        f_idx = {v: i for i, v in enumerate(FLOWS)}
+        p_idx = {v: i for i, v in enumerate(cube.periods)}
+        for reporter, commodity, flow, period in only:
+            idx = (r_idx.get(reporter), c_idx.get(commodity), f_idx.get(flow), p_idx.get(period))
+            if None not in idx:
+                keep[idx] = True
+        mask = mask & keep
+
+    out = []
+    for r, c, f, p in zip(*np.nonzero(mask)):
+        out.append({
+            "reporter":     cube.reporters[r],
+            "commodity":    cube.commodities[c],
+            "flow":         FLOWS[f],
+            "period":       cube.periods[p],
+            "value_usd":    float(cube.values[r, c, f, p]),
+            "baseline_usd": float(result.mean[r, c, f, p]),
+            "baseline_std": float(result.std[r, c, f, p]),
+            "n_obs":        int(result.n_obs[r, c, f, p]),
+            "z_score":      float(result.z[r, c, f, p]),
+            "pct_change":   float(result.pct[r, c, f, p]),
+        })
+    return out